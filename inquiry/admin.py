@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.utils.decorators import method_decorator
 
 from .models import Inquiry
+from .query_budget import query_budget
 
 
 @admin.register(Inquiry)
@@ -11,9 +13,19 @@ class InquiryAdmin(admin.ModelAdmin):
         'address',
         'created_at',
     )
+    # the client and address of each row in the changelist query
+    list_select_related = ('client__user', 'address')
 
     def has_add_permission(self, request):
         return False
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+    @method_decorator(query_budget(10, name='inquiry:admin_changelist'))
+    def changelist_view(self, request, extra_context=None):
+        return super().changelist_view(request, extra_context)
+
+    @method_decorator(query_budget(15, name='inquiry:admin_change'))
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        return super().change_view(request, object_id, form_url, extra_context)
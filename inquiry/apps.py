@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class InquiryConfig(AppConfig):
     name = 'inquiry'
+
+    def ready(self):
+        from inquiry import signals  # noqa: F401
+        from inquiry.forecast import ForecastValidationError
+        from inquiry.utils import prepare_zip_code_forecast
+        # fail the startup rather than every request with a bad forecast
+        try:
+            prepare_zip_code_forecast()
+        except ForecastValidationError as e:
+            raise ImproperlyConfigured('Invalid ZIP_CODE_FORECAST: {0}'.format(e))
+        # run gunicorn with --preload so that this happens once, before the workers are forked
+        if getattr(settings, 'INQUIRY_PRELOAD', False):
+            from inquiry.preload import preload
+            preload()
@@ -0,0 +1,102 @@
+"""
+Build-time asset pipeline for the inquiry wizard.
+
+The build_inquiry_assets management command compiles the SCSS bundles to compressed CSS, bundles
+and minifies the wizard JS and writes them with content-hashed filenames to
+inquiry/static/inquiry/build/, along with a manifest mapping bundle names to the built files.
+Because the filenames change whenever the content changes, the built files can be served with
+far-future cache headers.
+
+The templates reference bundles through the inquiry_assets template tags, which fall back to the
+source files (compiled by django-compressor) when the assets have not been built.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+APP_STATIC_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+BUILD_DIR = 'inquiry/build'
+MANIFEST_NAME = 'manifest.json'
+
+# Map of bundle names to the static source files they are built from. CSS bundles are compiled
+# from SCSS, JS bundles are concatenated in order.
+CSS_BUNDLES = OrderedDict([
+    ('address', ['inquiry/scss/address.scss']),
+    ('home', ['inquiry/scss/home.scss']),
+    ('signup', ['inquiry/scss/signup.scss']),
+    ('inquiry_outcome', ['inquiry/scss/inquiry_outcome.scss']),
+])
+JS_BUNDLES = OrderedDict([
+    ('wizard', ['inquiry/js/demo.js', 'inquiry/js/signup.js']),
+])
+
+_manifest_cache = {}
+
+
+def get_manifest_path(static_root=APP_STATIC_ROOT):
+    return os.path.join(static_root, BUILD_DIR, MANIFEST_NAME)
+
+
+def get_hashed_name(bundle_name, extension, content):
+    """ returns the static path of a built bundle, including a hash of its content """
+    content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()[:12]
+    return '{0}/{1}.{2}.{3}'.format(BUILD_DIR, bundle_name, content_hash, extension)
+
+
+def load_manifest(static_root=APP_STATIC_ROOT):
+    """
+    returns the manifest of built bundles as a dict of 'css'/'js' to {bundle name: static path}
+    or None if the assets have not been built
+
+    the manifest is read once per process because it only changes on deploy
+    """
+    manifest_path = get_manifest_path(static_root)
+    if manifest_path not in _manifest_cache:
+        try:
+            with open(manifest_path) as manifest_file:
+                _manifest_cache[manifest_path] = json.load(manifest_file)
+        except FileNotFoundError:
+            _manifest_cache[manifest_path] = None
+    return _manifest_cache[manifest_path]
+
+
+def _read_sources(sources, static_root):
+    contents = []
+    for source in sources:
+        with open(os.path.join(static_root, source)) as source_file:
+            contents.append(source_file.read())
+    return contents
+
+
+def _write_bundle(static_root, hashed_name, content):
+    path = os.path.join(static_root, hashed_name)
+    with open(path, 'w') as bundle_file:
+        bundle_file.write(content)
+
+
+def build_assets(compile_scss, minify_js, static_root=APP_STATIC_ROOT):
+    """
+    builds every CSS and JS bundle and writes the manifest, returns the manifest
+
+    compile_scss and minify_js are callables taking and returning source text, passed in so that
+    the optional libsass and rjsmin dependencies are only needed at build time
+    """
+    os.makedirs(os.path.join(static_root, BUILD_DIR), exist_ok=True)
+    manifest = {'css': {}, 'js': {}}
+    for bundle_name, sources in CSS_BUNDLES.items():
+        content = '\n'.join(compile_scss(source) for source in _read_sources(sources, static_root))
+        hashed_name = get_hashed_name(bundle_name, 'css', content)
+        _write_bundle(static_root, hashed_name, content)
+        manifest['css'][bundle_name] = hashed_name
+    for bundle_name, sources in JS_BUNDLES.items():
+        # the semicolon guards against sources that don't terminate their last statement
+        content = minify_js(';\n'.join(_read_sources(sources, static_root)))
+        hashed_name = get_hashed_name(bundle_name, 'js', content)
+        _write_bundle(static_root, hashed_name, content)
+        manifest['js'][bundle_name] = hashed_name
+
+    with open(get_manifest_path(static_root), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    _manifest_cache.pop(get_manifest_path(static_root), None)
+    return manifest
@@ -0,0 +1,106 @@
+"""
+Online backfills of denormalized Inquiry columns.
+
+Backfills walk the table in primary key order with keyset pagination (pk > last pk of the
+previous batch, which uses the primary key index however far along the walk is) and update each
+batch in its own short transaction, pausing between batches, so that they can run against the
+live table without holding locks on many rows or for long.
+"""
+import time
+from collections import defaultdict
+
+from django.db import transaction
+
+from inquiry.models import Inquiry
+from inquiry.utils import get_geography
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE = 0.1
+
+
+def iter_pk_batches(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """ yields lists of the primary keys of the queryset in primary key order """
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def _backfill_geography_batch(pks):
+    """ sets the state and zip5 of the given inquiries from their addresses """
+    updated = 0
+    with transaction.atomic():
+        rows = Inquiry.objects.filter(pk__in=pks).select_for_update(of=('self', )).values_list(
+            'pk', 'address__state', 'address__zip_code'
+        )
+        # one update per distinct geography rather than per row
+        pks_by_geography = defaultdict(list)
+        for pk, state, zip_code in rows:
+            pks_by_geography[get_geography(state, zip_code)].append(pk)
+        for (state, zip5), geography_pks in pks_by_geography.items():
+            updated += Inquiry.objects.filter(pk__in=geography_pks).update_without_save(
+                state=state, zip5=zip5
+            )
+    return updated
+
+
+def backfill_inquiry_geography(
+    batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE, only_missing=True, progress=None
+):
+    """
+    fills the state and zip5 of the inquiries saved before the columns were added, or of every
+    inquiry unless only_missing, returns the number of updated inquiries
+    """
+    queryset = Inquiry.objects.filter(address__isnull=False)
+    if only_missing:
+        queryset = queryset.filter(state__isnull=True)
+    updated = 0
+    for pks in iter_pk_batches(queryset, batch_size):
+        updated += _backfill_geography_batch(pks)
+        if progress is not None:
+            progress(updated)
+        time.sleep(pause)
+    return updated
+
+
+def _backfill_fingerprints_batch(pks):
+    """ sets the address and name fingerprints of the given inquiries """
+    with transaction.atomic():
+        inquiries = Inquiry.objects.filter(pk__in=pks).select_related('address').select_for_update(
+            of=('self', )
+        ).only(
+            'pk', 'first_name', 'last_name', 'address__street', 'address__unit', 'address__city',
+            'address__state', 'address__zip_code'
+        )
+        for inquiry in inquiries:
+            inquiry.sync_fingerprints()
+            Inquiry.objects.filter(pk=inquiry.pk).update_without_save(
+                address_fingerprint=inquiry.address_fingerprint,
+                name_fingerprint=inquiry.name_fingerprint,
+            )
+    return len(pks)
+
+
+def backfill_inquiry_fingerprints(
+    batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE, only_missing=True, progress=None
+):
+    """
+    computes the fingerprints of the inquiries saved before the columns were added, or of every
+    inquiry unless only_missing, returns the number of updated inquiries
+    """
+    queryset = Inquiry.objects.filter(address__isnull=False)
+    if only_missing:
+        queryset = queryset.filter(address_fingerprint__isnull=True)
+    updated = 0
+    for pks in iter_pk_batches(queryset, batch_size):
+        updated += _backfill_fingerprints_batch(pks)
+        if progress is not None:
+            progress(updated)
+        time.sleep(pause)
+    return updated
@@ -0,0 +1,127 @@
+"""
+Columnar loading of inquiries for analytics.
+
+InquiryQuerySet.to_arrays() and to_dataframe() stream the selected fields of the queryset with a
+chunked values_list() and convert each chunk of rows to typed numpy arrays, without instantiating
+a model or building a dict per row. Fields with choices (e.g. property_type and rent_type) are
+encoded as codes into their choices, -1 for a missing or unknown value, in the smallest signed
+integer dtype holding them (int8 up to 128 choices), and become pandas categoricals in
+to_dataframe().
+"""
+import numpy as np
+import pandas as pd
+
+from django.db import models
+
+DEFAULT_CHUNK_SIZE = 10000
+# fields of Inquiry and its address loaded by default
+DEFAULT_FIELDS = (
+    'id',
+    'created_at',
+    'property_type',
+    'rent_type',
+    'primary_residence',
+    'ten_year_duration_prediction',
+    'home_value',
+    'household_debt',
+    'address__city',
+    'address__state',
+    'address__zip_code',
+)
+
+INTEGER_FIELDS = (
+    models.IntegerField,
+    models.BigIntegerField,
+    models.PositiveIntegerField,
+    models.PositiveSmallIntegerField,
+    models.SmallIntegerField,
+)
+
+
+def get_field(model, path):
+    """ returns the model field of a values_list() path such as 'address__state' """
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def get_categories(field):
+    return [value for value, _ in field.flatchoices]
+
+
+def get_codes_dtype(categories):
+    """ returns the smallest signed integer dtype of the codes into categories and -1 """
+    return np.min_scalar_type(-max(len(categories), 1))
+
+
+class ColumnConverter:
+    """ converts the values of a field in a chunk of rows to a numpy array """
+
+    def __init__(self, field):
+        self.field = field
+        self.categories = get_categories(field) if field.choices else None
+        if self.categories is not None:
+            self.codes = {value: code for code, value in enumerate(self.categories)}
+            self.codes_dtype = get_codes_dtype(self.categories)
+
+    def convert(self, values):
+        field = self.field
+        if self.categories is not None:
+            return np.array([self.codes.get(value, -1) for value in values], dtype=self.codes_dtype)
+        if isinstance(field, models.DateTimeField):
+            # datetimes are stored as naive UTC
+            return pd.to_datetime(list(values), utc=True).tz_localize(None).values
+        if isinstance(field, models.BooleanField) and not field.null:
+            return np.array(values, dtype='bool')
+        if isinstance(field, INTEGER_FIELDS):
+            if field.null:
+                return np.array([np.nan if value is None else value for value in values])
+            return np.array(values, dtype='int64')
+        if isinstance(field, models.FloatField):
+            return np.array(values, dtype='float64')
+        if isinstance(field, models.UUIDField):
+            return np.array([None if value is None else str(value) for value in values])
+        return np.array(values, dtype='object')
+
+
+def iter_column_chunks(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ yields a list of numpy arrays, one per field, for each chunk of rows of the queryset """
+    converters = [ColumnConverter(get_field(queryset.model, path)) for path in fields]
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield [converter.convert(column) for converter, column in zip(converters, zip(*chunk))]
+            chunk = []
+    if chunk:
+        yield [converter.convert(column) for converter, column in zip(converters, zip(*chunk))]
+
+
+def to_arrays(queryset, fields=DEFAULT_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    returns a dict of field path to numpy array of the values of the queryset, fields with
+    choices as codes into get_categories(field)
+    """
+    chunks = list(iter_column_chunks(queryset, fields, chunk_size))
+    arrays = {}
+    for index, path in enumerate(fields):
+        if chunks:
+            arrays[path] = np.concatenate([chunk[index] for chunk in chunks])
+        else:
+            arrays[path] = ColumnConverter(get_field(queryset.model, path)).convert([])
+    return arrays
+
+
+def to_dataframe(queryset, fields=DEFAULT_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ returns a dataframe of the values of the queryset, fields with choices as categoricals """
+    arrays = to_arrays(queryset, fields, chunk_size)
+    columns = {}
+    for path in fields:
+        field = get_field(queryset.model, path)
+        if field.choices:
+            columns[path] = pd.Categorical.from_codes(arrays[path], get_categories(field))
+        else:
+            columns[path] = arrays[path]
+    return pd.DataFrame(columns, columns=list(fields))
@@ -0,0 +1,203 @@
+"""
+Append-only log of the first step vetting decisions.
+
+With settings.INQUIRY_DECISION_LOG_DIR set, log_decision() puts each decision on an in-memory
+queue without blocking (a decision is dropped, and counted, if the queue is full) and a
+background thread of the process appends the queued decisions in batches to JSONL segment files
+in that directory. Each process writes its own segments, named after its pid and the time the
+segment was started, so workers never share a file. A segment is closed and a new one started
+once it reaches settings.INQUIRY_DECISION_LOG_SEGMENT_BYTES. When the process exits, the
+decisions still queued are written, waiting at most settings.INQUIRY_DECISION_LOG_FLUSH_TIMEOUT
+seconds (2 by default) so that a stuck disk doesn't hold up the shutdown.
+
+read_decisions() loads the segments into a dataframe for analysis.
+"""
+import atexit
+import glob
+import json
+import logging as logging_
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from django.conf import settings
+
+from inquiry.utils import get_zip5
+
+logger = logging_.getLogger('portals.apps.' + __name__)
+
+DECISION_FIELDS = (
+    'timestamp', 'state', 'zip5', 'outcome_key', 'forecast_value', 'forecast_version'
+)
+SEGMENT_PATTERN = 'decisions-*.jsonl'
+DEFAULT_SEGMENT_BYTES = 64 * 2**20
+QUEUE_SIZE = 10000
+# seconds the writer waits for more decisions before writing a batch
+BATCH_WAIT = 1.0
+MAX_BATCH = 1000
+DEFAULT_FLUSH_TIMEOUT = 2.0
+# queued by flush() so that the writer writes its batch without waiting for more decisions
+FLUSH = object()
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class DecisionLogWriter(threading.Thread):
+    def __init__(self, log_dir, segment_bytes):
+        super().__init__(name='inquiry-decision-log', daemon=True)
+        self.log_dir = log_dir
+        self.segment_bytes = segment_bytes
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.pid = os.getpid()
+        self.dropped = 0
+        self._segment = None
+
+    def log(self, decision):
+        try:
+            self.queue.put_nowait(decision)
+        except queue.Full:
+            self.dropped += 1
+
+    def _open_segment(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        name = 'decisions-{0}-{1}.jsonl'.format(self.pid, int(time.time() * 1000))
+        self._segment = open(os.path.join(self.log_dir, name), 'a')
+
+    def _write(self, batch):
+        if self._segment is None or self._segment.tell() >= self.segment_bytes:
+            if self._segment is not None:
+                self._segment.close()
+            self._open_segment()
+        self._segment.write(''.join(json.dumps(decision) + '\n' for decision in batch))
+        self._segment.flush()
+
+    def _get_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + BATCH_WAIT
+        while len(batch) < MAX_BATCH and batch[-1] is not FLUSH:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self, timeout):
+        """
+        waits at most timeout seconds for the queued decisions to be written, returns the number
+        of decisions still unwritten
+        """
+        flushes = 1
+        try:
+            self.queue.put_nowait(FLUSH)
+        except queue.Full:
+            # the writer doesn't wait for more decisions with a full batch
+            flushes = 0
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.queue.all_tasks_done.wait(remaining)
+            return max(self.queue.unfinished_tasks - flushes, 0)
+
+    def run(self):
+        while True:
+            batch = self._get_batch()
+            decisions = [decision for decision in batch if decision is not FLUSH]
+            try:
+                if decisions:
+                    self._write(decisions)
+            except Exception as e:
+                logger.error('Decision log write failed {0}'.format(e))
+            for _ in batch:
+                self.queue.task_done()
+
+
+def get_writer():
+    """ returns the writer of this process or None if the decision log is disabled """
+    global _writer
+    log_dir = getattr(settings, 'INQUIRY_DECISION_LOG_DIR', None)
+    if not log_dir:
+        return None
+    # a forked worker doesn't inherit the writer thread of its parent
+    if _writer is None or _writer.pid != os.getpid() or _writer.log_dir != log_dir:
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid() or _writer.log_dir != log_dir:
+                _writer = DecisionLogWriter(
+                    log_dir,
+                    getattr(settings, 'INQUIRY_DECISION_LOG_SEGMENT_BYTES', DEFAULT_SEGMENT_BYTES)
+                )
+                _writer.start()
+    return _writer
+
+
+def log_decision(state, zip_code, vetting_record):
+    """ logs a vetting decision, see inquiry.outcomes.get_vetting_record() """
+    writer = get_writer()
+    if writer is None:
+        return
+    writer.log({
+        'timestamp': time.time(),
+        'state': state,
+        'zip5': get_zip5(zip_code),
+        'outcome_key': vetting_record['outcome_key'],
+        'forecast_value': vetting_record['forecast_value'],
+        'forecast_version': vetting_record['forecast_version'],
+    })
+
+
+def wait_for_decisions():
+    """ blocks until the queued decisions of this process are written """
+    if _writer is not None and _writer.pid == os.getpid():
+        _writer.queue.join()
+
+
+def flush_at_exit():
+    """ writes the queued decisions of this process when it exits, see the module docstring """
+    if _writer is None or _writer.pid != os.getpid():
+        return
+    unwritten = _writer.flush(
+        getattr(settings, 'INQUIRY_DECISION_LOG_FLUSH_TIMEOUT', DEFAULT_FLUSH_TIMEOUT)
+    )
+    if unwritten:
+        logger.warning('{0} decisions not written at exit'.format(unwritten))
+
+
+atexit.register(flush_at_exit)
+
+
+def get_segment_paths(log_dir):
+    return sorted(glob.glob(os.path.join(log_dir, SEGMENT_PATTERN)))
+
+
+def read_decisions(log_dir, since=None):
+    """
+    returns a dataframe of the logged decisions, with a datetime64 timestamp and the outcome key,
+    state and forecast version as categoricals, optionally only those logged since the given
+    unix time
+    """
+    frames = []
+    for path in get_segment_paths(log_dir):
+        if since is not None and os.path.getmtime(path) < since:
+            # the segment was last written before since
+            continue
+        frame = pd.read_json(path, lines=True, dtype=False, convert_dates=False)
+        if not frame.empty:
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=DECISION_FIELDS)
+    decisions = pd.concat(frames, ignore_index=True)[list(DECISION_FIELDS)]
+    if since is not None:
+        decisions = decisions[decisions['timestamp'] >= since]
+    decisions['timestamp'] = pd.to_datetime(decisions['timestamp'], unit='s')
+    for col in ('state', 'outcome_key', 'forecast_version'):
+        decisions[col] = decisions[col].astype('category')
+    return decisions.sort_values('timestamp').reset_index(drop=True)
@@ -0,0 +1,73 @@
+"""
+Clustering of historical duplicate inquiries.
+
+Instead of comparing every pair of inquiries, the database groups the inquiries by each indexed
+fingerprint and returns the members of the groups with more than one inquiry. Groups sharing an
+inquiry (the same house under another name, or the same person at another address) are then
+merged into clusters with a union-find over the members, keyed by fingerprint in dicts.
+"""
+from collections import defaultdict
+
+from django.db.models import Count
+
+from inquiry.models import Inquiry
+
+FINGERPRINT_FIELDS = ('address_fingerprint', 'name_fingerprint')
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parents = {}
+
+    def find(self, item):
+        parent = self.parents.setdefault(item, item)
+        if parent != item:
+            parent = self.parents[item] = self.find(parent)
+        return parent
+
+    def union(self, item, other):
+        self.parents[self.find(item)] = self.find(other)
+
+
+def get_duplicate_clusters():
+    """
+    returns the clusters of possible duplicate inquiries as lists of (id, created_at) tuples
+    sorted by creation, the clusters sorted by their earliest inquiry
+    """
+    union_find = _UnionFind()
+    created_at = {}
+    for field in FINGERPRINT_FIELDS:
+        duplicated = Inquiry.objects.filter(**{field + '__isnull': False}).values(field).annotate(
+            count=Count('id')
+        ).filter(count__gt=1).values(field)
+        members = Inquiry.objects.filter(**{field + '__in': duplicated}).values_list(
+            'id', 'created_at', field
+        )
+        first_by_fingerprint = {}
+        for inquiry_id, inquiry_created_at, fingerprint in members.iterator():
+            created_at[inquiry_id] = inquiry_created_at
+            first_id = first_by_fingerprint.setdefault(fingerprint, inquiry_id)
+            union_find.union(inquiry_id, first_id)
+
+    clusters = defaultdict(list)
+    for inquiry_id in created_at:
+        clusters[union_find.find(inquiry_id)].append((inquiry_id, created_at[inquiry_id]))
+    return sorted(
+        (sorted(cluster, key=lambda member: member[1]) for cluster in clusters.values()),
+        key=lambda cluster: cluster[0][1]
+    )
+
+
+def mark_possible_duplicates(clusters):
+    """
+    points the inquiries of each cluster that aren't marked yet to the earliest inquiry of the
+    cluster, returns the number of marked inquiries
+    """
+    marked = 0
+    for cluster in clusters:
+        first_id = cluster[0][0]
+        marked += Inquiry.objects.filter(
+            pk__in=[inquiry_id for inquiry_id, _ in cluster[1:]],
+            possible_duplicate_of__isnull=True,
+        ).update_without_save(possible_duplicate_of=first_id)
+    return marked
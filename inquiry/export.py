@@ -0,0 +1,111 @@
+"""
+Incremental export of inquiries for the warehouse sync.
+
+Each named export keeps an ExportWatermark: the (modified_at, id) of the last inquiry it
+exported. A run exports the inquiries created or changed since then, with their address, in
+(modified_at, id) order using keyset pagination on the matching index, and writes them as gzipped
+JSONL or CSV chunk files. The watermark is saved after each chunk is written, so an interrupted
+run resumes after the last complete chunk.
+
+Inquiries modified in the last settings.INQUIRY_EXPORT_LAG seconds are left to the next run, so
+that rows of transactions still in flight when the run starts, which can't be seen yet, don't
+end up behind the watermark.
+"""
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from core.models import Address
+from inquiry.models import ExportWatermark, Inquiry
+from inquiry.utils import write_file_atomically
+
+EXPORT_FORMATS = ('jsonl', 'csv')
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_LAG = 60
+
+
+def get_export_fields():
+    """ returns the values() paths of the exported inquiry and address fields """
+    return [field.attname for field in Inquiry._meta.concrete_fields] + [
+        'address__' + field.attname for field in Address._meta.concrete_fields
+        if not field.primary_key
+    ]
+
+
+def _to_csv_value(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return '' if value is None else value
+
+
+def serialize_chunk(rows, fields, file_format):
+    """ returns the gzipped JSONL or CSV of the given rows of values """
+    text = io.StringIO()
+    if file_format == 'jsonl':
+        for row in rows:
+            text.write(json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder))
+            text.write('\n')
+    elif file_format == 'csv':
+        writer = csv.writer(text)
+        writer.writerow(fields)
+        writer.writerows([_to_csv_value(value) for value in row] for row in rows)
+    else:
+        raise ValueError('Unknown export format {0}'.format(file_format))
+    return gzip.compress(text.getvalue().encode('utf-8'))
+
+
+def get_changed_inquiries(watermark, until):
+    """ returns the inquiries changed after the watermark and before until in keyset order """
+    inquiries = Inquiry.objects.filter(modified_at__lt=until)
+    if watermark.last_modified_at is not None:
+        # (modified_at, id) > watermark, as a range on the leading column of the index
+        inquiries = inquiries.filter(modified_at__gte=watermark.last_modified_at).exclude(
+            modified_at=watermark.last_modified_at, id__lte=watermark.last_id
+        )
+    return inquiries.order_by('modified_at', 'id')
+
+
+def export_inquiries(
+    output_dir, name, file_format='jsonl', chunk_size=DEFAULT_CHUNK_SIZE, full=False,
+    progress=None
+):
+    """
+    exports the inquiries changed since the last run of the named export to chunk files in
+    output_dir, returns the paths of the written chunks
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    watermark, _ = ExportWatermark.objects.get_or_create(name=name)
+    if full:
+        watermark.last_modified_at = watermark.last_id = None
+    lag = getattr(settings, 'INQUIRY_EXPORT_LAG', DEFAULT_LAG)
+    until = timezone.now() - datetime.timedelta(seconds=lag)
+    fields = get_export_fields()
+    modified_at_index, id_index = fields.index('modified_at'), fields.index('id')
+    # unique per run, so that runs in the same second don't overwrite each other's chunks
+    run = '{0}-{1}'.format(timezone.now().strftime('%Y%m%dT%H%M%S'), uuid.uuid4().hex[:8])
+    paths = []
+    while True:
+        rows = list(get_changed_inquiries(watermark, until).values_list(*fields)[:chunk_size])
+        if not rows:
+            break
+        path = os.path.join(
+            output_dir, '{0}-{1}-{2:05d}.{3}.gz'.format(name, run, len(paths), file_format)
+        )
+        write_file_atomically(path, serialize_chunk(rows, fields, file_format))
+        paths.append(path)
+        watermark.last_modified_at = rows[-1][modified_at_index]
+        watermark.last_id = rows[-1][id_index]
+        watermark.save()
+        if progress is not None:
+            progress(path, len(rows))
+    return paths
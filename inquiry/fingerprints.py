@@ -0,0 +1,84 @@
+"""
+Fingerprints of the address and name of an inquiry, used to find possible duplicate leads.
+
+The parts of an address or name are normalized (case, punctuation, whitespace, common street
+suffix and unit designator abbreviations) before they are hashed, so that '20 University Road,
+Suite 100' and '20 university rd. #100' have the same fingerprint. The name fingerprint includes
+the 5 digit zip code because a name alone matches many unrelated people.
+"""
+import hashlib
+import re
+
+from inquiry.utils import get_zip5
+
+# USPS standard abbreviations of the most common street suffixes and directionals
+STREET_ABBREVIATIONS = {
+    'avenue': 'ave',
+    'boulevard': 'blvd',
+    'circle': 'cir',
+    'court': 'ct',
+    'drive': 'dr',
+    'highway': 'hwy',
+    'lane': 'ln',
+    'parkway': 'pkwy',
+    'place': 'pl',
+    'road': 'rd',
+    'square': 'sq',
+    'street': 'st',
+    'terrace': 'ter',
+    'north': 'n',
+    'south': 's',
+    'east': 'e',
+    'west': 'w',
+    'northeast': 'ne',
+    'northwest': 'nw',
+    'southeast': 'se',
+    'southwest': 'sw',
+}
+UNIT_DESIGNATORS = {'apartment', 'apt', 'unit', 'suite', 'ste', 'number', 'no', 'floor', 'fl'}
+NON_ALPHANUMERIC_RE = re.compile(r'[^a-z0-9]+')
+
+
+def _get_words(value):
+    return NON_ALPHANUMERIC_RE.sub(' ', (value or '').lower()).split()
+
+
+def normalize_street(street):
+    return ' '.join(STREET_ABBREVIATIONS.get(word, word) for word in _get_words(street))
+
+
+def normalize_unit(unit):
+    """ returns the unit without its designator, e.g. '100' for 'Suite #100' """
+    return ' '.join(word for word in _get_words(unit) if word not in UNIT_DESIGNATORS)
+
+
+def normalize_name(name):
+    return ''.join(_get_words(name))
+
+
+def _hash(parts):
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def get_address_fingerprint(street, unit, city, state, zip_code):
+    """ returns the fingerprint of an address or None without a street """
+    street = normalize_street(street)
+    if not street:
+        return None
+    zip5 = get_zip5(zip_code)
+    return _hash([
+        street,
+        normalize_unit(unit),
+        ' '.join(_get_words(city)),
+        (state or '').lower(),
+        '' if zip5 is None else str(zip5),
+    ])
+
+
+def get_name_fingerprint(first_name, last_name, zip_code):
+    """ returns the fingerprint of a name in a 5 digit zip code or None without both """
+    first_name, last_name = normalize_name(first_name), normalize_name(last_name)
+    zip5 = get_zip5(zip_code)
+    if not first_name or not last_name or zip5 is None:
+        return None
+    return _hash([first_name, last_name, str(zip5)])
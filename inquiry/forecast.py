@@ -0,0 +1,131 @@
+"""
+Validation and cleaning of the data science zip code forecast.
+
+The forecast CSVs are exported from a spreadsheet and carry spreadsheet artifacts: unnamed
+trailing columns holding stray values, embedded side tables (e.g. 'total' and '>6.7%' cells) and
+floats formatted as times of day (e.g. '1899-12-30 0:55:09' for 0.0383 in 'risk 12 month loss').
+clean_zip_code_forecast() turns such a dataframe into a typed forecast with an int64 zip code
+column, float64 forecast columns, a datetime64 CREATED column and one row per zip code, or
+raises ForecastValidationError if the file can't be used.
+"""
+import logging as logging_
+
+import pandas as pd
+
+from django.conf import settings
+
+logger = logging_.getLogger(__name__)
+
+# forecast columns other than the zip code and forecast columns named in the settings
+OTHER_NUMERIC_COLUMNS = [
+    '1 year CAGR',
+    '2 year CAGR',
+    '3 year CAGR',
+    '1 year returns',
+    '2 year returns',
+    '3 year returns',
+    'max 12 month loss',
+    'risk 12 month loss',
+]
+CREATED_COL = 'CREATED'
+# spreadsheets store times as fractions of a day since this date
+SPREADSHEET_EPOCH = pd.Timestamp('1899-12-30')
+MAX_ZIP_CODE = 99999
+
+
+class ForecastValidationError(ValueError):
+    pass
+
+
+def _to_float(series):
+    """
+    coerces a forecast column to float64, converting values formatted as spreadsheet times back
+    to the fractions of a day they stand for, anything else that isn't a number becomes NaN
+    """
+    as_text = series.astype(str).str.strip()
+    values = pd.to_numeric(as_text, errors='coerce')
+    is_time = as_text.str.startswith(str(SPREADSHEET_EPOCH.date()))
+    if is_time.any():
+        times = pd.to_datetime(as_text[is_time], errors='coerce')
+        values[is_time] = (times - SPREADSHEET_EPOCH).dt.total_seconds() / (24 * 60 * 60)
+    return values.astype('float64')
+
+
+def clean_zip_code_forecast(df, zip_code_col=None, forecast_col=None):
+    """
+    returns a tuple of the cleaned forecast dataframe and a list of notes describing what was
+    cleaned, raises ForecastValidationError if the forecast is unusable
+
+    the column names default to settings.ZIP_CODE_COL and settings.ZIP_FORECAST_COL
+    """
+    zip_code_col = zip_code_col or settings.ZIP_CODE_COL
+    forecast_col = forecast_col or settings.ZIP_FORECAST_COL
+    notes = []
+
+    missing = [col for col in (zip_code_col, forecast_col) if col not in df.columns]
+    if missing:
+        raise ForecastValidationError('Missing forecast columns: {0}'.format(', '.join(missing)))
+
+    # only keep the known columns, which drops unnamed columns and embedded tables (pandas
+    # renames their duplicated headers, e.g. 'Zip Code.1')
+    numeric_cols = [zip_code_col, forecast_col] + [
+        col for col in OTHER_NUMERIC_COLUMNS if col in df.columns and col != forecast_col
+    ]
+    keep_cols = numeric_cols + ([CREATED_COL] if CREATED_COL in df.columns else [])
+    dropped_cols = [col for col in df.columns if col not in keep_cols]
+    if dropped_cols:
+        notes.append('dropped columns: {0}'.format(', '.join(str(col) for col in dropped_cols)))
+    clean = pd.DataFrame(index=df.index)
+
+    for col in numeric_cols:
+        clean[col] = _to_float(df[col])
+        coerced = int((clean[col].isnull() & df[col].notnull()).sum())
+        if coerced:
+            notes.append('{0}: {1} non-numeric values set to NaN'.format(col, coerced))
+    if CREATED_COL in df.columns:
+        clean[CREATED_COL] = pd.to_datetime(df[CREATED_COL], errors='coerce')
+
+    zip_codes = clean[zip_code_col]
+    valid_zip_codes = (zip_codes % 1 == 0) & (zip_codes > 0) & (zip_codes <= MAX_ZIP_CODE)
+    if not valid_zip_codes.any():
+        raise ForecastValidationError('The forecast has no valid zip codes')
+    invalid_count = int((~valid_zip_codes).sum())
+    if invalid_count:
+        notes.append('dropped {0} rows without a valid zip code'.format(invalid_count))
+    clean = clean[valid_zip_codes].copy()
+    clean[zip_code_col] = clean[zip_code_col].astype('int64')
+
+    forecasts = clean[forecast_col].dropna()
+    if forecasts.empty:
+        raise ForecastValidationError('The forecast column {0} has no values'.format(forecast_col))
+    if ((forecasts <= -1) | (forecasts >= 1)).any():
+        raise ForecastValidationError(
+            'The forecast column {0} has values outside of (-1, 1)'.format(forecast_col)
+        )
+
+    # keep the most recently created row of each zip code
+    if CREATED_COL in clean.columns:
+        clean = clean.sort_values(CREATED_COL, kind='mergesort', na_position='first')
+    row_count = len(clean)
+    clean = clean.drop_duplicates(subset=zip_code_col, keep='last')
+    if len(clean) < row_count:
+        notes.append('dropped {0} duplicate zip code rows'.format(row_count - len(clean)))
+
+    clean = clean.sort_values(zip_code_col).reset_index(drop=True)
+    return (clean, notes)
+
+
+def load_zip_code_forecast(path, zip_code_col=None, forecast_col=None):
+    """
+    reads, validates and cleans the forecast CSV at the given path
+
+    the column names can be given so that this can be called while the settings are loading
+    """
+    try:
+        df = pd.read_csv(path, dtype=str)
+    except (OSError, ValueError) as e:
+        raise ForecastValidationError('Unable to read the forecast {0}: {1}'.format(path, e))
+    clean, notes = clean_zip_code_forecast(df, zip_code_col, forecast_col)
+    for note in notes:
+        logger.info('Zip code forecast {0}: {1}'.format(path, note))
+    return clean
@@ -0,0 +1,119 @@
+"""
+Incrementally maintained funnel counters of the inquiry wizard.
+
+The wizard records funnel events (a step submitted, a first step vetted with an outcome, an
+account created) with record_funnel_event(), which only increments an in-memory counter. The
+counters of each process are flushed to InquiryFunnelCounter rows, one per day, step and outcome,
+with a batched upsert at most every settings.INQUIRY_FUNNEL_FLUSH_INTERVAL seconds, when a later
+event is recorded, and when the process exits.
+"""
+import atexit
+import logging as logging_
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from inquiry.models import InquiryFunnelCounter
+
+logger = logging_.getLogger('portals.apps.' + __name__)
+
+DEFAULT_FLUSH_INTERVAL = 10
+SUBMITTED = 'submitted'
+ACCOUNT_CREATED = 'account_created'
+DONE_STEP = 'done'
+
+_pending = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record_funnel_event(step, outcome):
+    """ counts a funnel event of today, flushing the counters if the flush interval elapsed """
+    global _last_flush
+    key = (timezone.localdate(), step, outcome)
+    with _lock:
+        _pending[key] += 1
+        interval = getattr(settings, 'INQUIRY_FUNNEL_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        if time.monotonic() - _last_flush < interval:
+            return
+        _last_flush = time.monotonic()
+    flush_funnel_events()
+
+
+def _upsert_postgresql(counts):
+    # a single statement for the whole batch
+    table = InquiryFunnelCounter._meta.db_table
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(counts))
+    params = [value for (day, step, outcome), count in counts.items()
+              for value in (day, step, outcome, count)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {0} (day, step, outcome, count) VALUES {1} '
+            'ON CONFLICT (day, step, outcome) DO UPDATE SET count = {0}.count + EXCLUDED.count'
+            .format(table, values), params
+        )
+
+
+def _upsert(counts):
+    for (day, step, outcome), count in counts.items():
+        counters = InquiryFunnelCounter.objects.filter(day=day, step=step, outcome=outcome)
+        if counters.update(count=F('count') + count):
+            continue
+        try:
+            with transaction.atomic():
+                InquiryFunnelCounter.objects.create(
+                    day=day, step=step, outcome=outcome, count=count
+                )
+        except IntegrityError:
+            # another process created the counter in the meantime
+            counters.update(count=F('count') + count)
+
+
+def flush_funnel_events():
+    """ adds the counted events of this process to the database """
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+    if not counts:
+        return
+    try:
+        # a savepoint when called in a transaction, e.g. of the request, which a failed upsert
+        # would otherwise leave broken
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                _upsert_postgresql(counts)
+            else:
+                _upsert(counts)
+    except Exception as e:
+        logger.error('Funnel counters flush failed {0}'.format(e))
+        # keep the counts for the next flush
+        with _lock:
+            _pending.update(counts)
+
+
+atexit.register(flush_funnel_events)
+
+
+def get_funnel(start_day, end_day):
+    """
+    returns an OrderedDict of (step, outcome) to the number of events from start_day to end_day
+    inclusive, ordered by step and outcome
+    """
+    rows = InquiryFunnelCounter.objects.filter(day__range=(start_day, end_day)).values(
+        'step', 'outcome'
+    ).annotate(total=Sum('count')).order_by('step', 'outcome')
+    return OrderedDict(((row['step'], row['outcome']), row['total']) for row in rows)
+
+
+def get_daily_funnel(start_day, end_day):
+    """ returns (day, step, outcome, count) tuples from start_day to end_day inclusive """
+    return list(
+        InquiryFunnelCounter.objects.filter(day__range=(start_day, end_day)).order_by(
+            'day', 'step', 'outcome'
+        ).values_list('day', 'step', 'outcome', 'count')
+    )
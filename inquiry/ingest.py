@@ -0,0 +1,228 @@
+"""
+Bulk ingestion of partner leads.
+
+A lead is a flat dict of the fields of the first three wizard steps (InquiryFirstForm,
+InquiryHomeForm and InquiryHomeownerForm, without the form prefixes) plus an optional
+phone_number. Leads are validated with the wizard forms, the phone number with the one of the
+signup step, vetted against the zip code forecast in a single batch and created in chunked
+transactions. Rejected leads are recorded as InquiryRejection rows, as the wizard records
+rejected steps. Partner clients are created with an unusable password and without SMS consent or
+agreement to the terms; they complete those when they claim their account.
+"""
+import csv
+import io
+import json
+import logging as logging_
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms.utils import ErrorList
+
+from core.models import Address, UseCaseModel
+from custom_auth.models import User
+from stages import transitions
+from inquiry.forms import (
+    InquiryFirstForm, InquiryHomeForm, InquiryHomeownerForm, WizardClientUserCreationForm
+)
+from inquiry.models import Inquiry, InquiryRejection
+from inquiry.outcomes import get_state_zip_code_outcome_keys, get_vetting_record
+from inquiry.utils import get_vetting_snapshot, send_bulk_inquiry_email
+
+logger = logging_.getLogger('portals.apps.' + __name__)
+
+# same step names as InquiryApplyWizard.form_list
+LEAD_FORMS = (
+    ('first', InquiryFirstForm),
+    ('home', InquiryHomeForm),
+    ('homeowner', InquiryHomeownerForm),
+)
+LEAD_FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 500
+
+
+class Lead:
+    """ a validated lead, split the same way InquiryApplyWizard.done() splits the step data """
+
+    def __init__(self, row_number, step_cleaned_data):
+        self.row_number = row_number
+        self.phone_number = step_cleaned_data['signup']['phone_number']
+        self.inquiry_data = {}
+        self.inquiry_data.update(step_cleaned_data['home'])
+        self.inquiry_data.update(step_cleaned_data['homeowner'])
+        first_data = dict(step_cleaned_data['first'])
+        self.email = first_data.pop('email')
+        for field in UseCaseModel._meta.fields:
+            self.inquiry_data[field.name] = first_data.pop(field.name)
+        # what remains of the first step is the address
+        self.address_data = first_data
+
+
+class IngestReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        # lists of (row number, outcome key) and (row number, {field: [messages]})
+        self.rejected = []
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'rejected': [{'row': row, 'outcome_key': key} for row, key in self.rejected],
+            'errors': [{'row': row, 'errors': errors} for row, errors in self.errors],
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def read_leads(stream, file_format):
+    """ yields the leads of a CSV or JSONL text stream as dicts """
+    if file_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield row
+    elif file_format == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError('Unknown lead format {0}'.format(file_format))
+
+
+def read_leads_from_bytes(content, file_format):
+    return read_leads(io.StringIO(content.decode('utf-8-sig')), file_format)
+
+
+def validate_lead(row):
+    """
+    returns the cleaned data of the given lead by step and the errors of every step by field
+
+    the optional phone number is cleaned by the phone number field of the signup step
+    """
+    step_cleaned_data = {}
+    errors = {}
+    for step, form_class in LEAD_FORMS:
+        form = form_class(data=row)
+        if form.is_valid():
+            step_cleaned_data[step] = form.cleaned_data
+        else:
+            errors.update(form.errors.get_json_data())
+    phone_number = str(row.get('phone_number') or '').strip()
+    if phone_number:
+        try:
+            phone_number = WizardClientUserCreationForm().fields['phone_number'].clean(phone_number)
+        except ValidationError as e:
+            errors['phone_number'] = ErrorList(e.error_list).get_json_data()
+    step_cleaned_data['signup'] = {'phone_number': phone_number}
+    return (step_cleaned_data, errors)
+
+
+def _create_leads(leads):
+    """ creates the client, address and inquiry of each lead in a single transaction """
+    with transaction.atomic():
+        clients = [
+            User.objects.create_client(
+                email=lead.email,
+                password=None,
+                first_name=lead.inquiry_data['first_name'],
+                last_name=lead.inquiry_data['last_name'],
+                phone_number=lead.phone_number,
+                state=lead.address_data['state'],
+                ip_address=None,
+                sms_opt_in=False,
+                agree_to_terms=False,
+                email_confirmed=False
+            ) for lead in leads
+        ]
+        # bulk_create doesn't call Inquiry.save() so no reviewer email is sent per lead
+        addresses = Address.objects.bulk_create([Address(**lead.address_data) for lead in leads])
+        inquiries = [
+            Inquiry(client=client, address=address, ip_address=None, **lead.inquiry_data)
+            for lead, client, address in zip(leads, clients, addresses)
+        ]
+        # earliest inquiry of the chunk by fingerprint, the ones of the chunk aren't saved yet
+        first_by_fingerprint = {}
+        for inquiry in inquiries:
+            inquiry.sync_geography()
+            inquiry.sync_fingerprints()
+            fingerprints = [
+                fingerprint for fingerprint in (
+                    ('address', inquiry.address_fingerprint), ('name', inquiry.name_fingerprint)
+                ) if fingerprint[1]
+            ]
+            inquiry.possible_duplicate_of = inquiry.find_possible_duplicate() or next(
+                (first_by_fingerprint[fingerprint]
+                 for fingerprint in fingerprints if fingerprint in first_by_fingerprint), None
+            )
+            for fingerprint in fingerprints:
+                first_by_fingerprint.setdefault(fingerprint, inquiry)
+        inquiries = Inquiry.objects.bulk_create(inquiries)
+        for client, inquiry in zip(clients, inquiries):
+            transitions.ClientSubmitInquiry(client=client).execute(inquiry=inquiry)
+
+
+def _create_leads_in_chunks(leads, chunk_size, report):
+    for start in range(0, len(leads), chunk_size):
+        chunk = leads[start:start + chunk_size]
+        try:
+            _create_leads(chunk)
+            report.created += len(chunk)
+            continue
+        except Exception as e:
+            logger.warning('Lead chunk failed, retrying leads one by one {0}'.format(e))
+        # isolate the failing leads
+        for lead in chunk:
+            try:
+                _create_leads([lead])
+                report.created += 1
+            except Exception as e:
+                report.errors.append((lead.row_number, {'__all__': [{'message': str(e)}]}))
+
+
+def ingest_leads(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ validates, vets and creates the given leads, returns an IngestReport """
+    report = IngestReport()
+    start = time.perf_counter()
+    leads = []
+    seen_emails = set()
+    for row_number, row in enumerate(rows, start=1):
+        report.rows += 1
+        step_cleaned_data, errors = validate_lead(row)
+        email = '' if errors else step_cleaned_data['first']['email'].lower()
+        if email in seen_emails:
+            errors = {'email': [{'message': 'Duplicate email in this batch.', 'code': 'unique'}]}
+        if errors:
+            report.errors.append((row_number, errors))
+            continue
+        seen_emails.add(email)
+        leads.append(Lead(row_number, step_cleaned_data))
+
+    # the whole batch is vetted and recorded against the same forecast
+    snapshot = get_vetting_snapshot()
+    outcomes = get_state_zip_code_outcome_keys(
+        ((lead.address_data['state'], lead.address_data['zip_code']) for lead in leads), snapshot
+    )
+    vetted_leads = []
+    rejections = []
+    for lead, (outcome_key, _) in zip(leads, outcomes):
+        state, zip_code = lead.address_data['state'], lead.address_data['zip_code']
+        vetting_record = get_vetting_record(state, zip_code, outcome_key, snapshot)
+        if outcome_key is None:
+            lead.inquiry_data.update(vetting_record)
+            vetted_leads.append(lead)
+        else:
+            rejections.append(InquiryRejection(state=state, zip_code=zip_code, **vetting_record))
+            report.rejected.append((lead.row_number, outcome_key))
+    InquiryRejection.objects.bulk_create(rejections)
+
+    _create_leads_in_chunks(vetted_leads, chunk_size, report)
+    report.elapsed = time.perf_counter() - start
+    if report.created:
+        send_bulk_inquiry_email(report.created)
+    return report
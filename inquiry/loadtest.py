@@ -0,0 +1,270 @@
+"""
+Concurrent load on the inquiry wizard.
+
+run_stress() drives simulated applicants through the four wizard steps and the done step over
+HTTP against a running server, from a number of concurrent workers, each applicant with its own
+cookies (session and CSRF) and email. On PostgreSQL, the lock waits of the database (ungranted
+locks in pg_locks) are sampled while the applicants run.
+
+start_stand_in_server() starts a local HTTP server standing in for Segment, whose latency and
+status can be changed to inject faults, see the stress_inquiry_wizard command for running the
+wizard in-process against it.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.db import connection, connections
+
+# the step data of the applicants, the same as the wizard forms get from the templates
+WIZARD_STEPS = (
+    (
+        'first', {
+            'first-street': '20 University Rd',
+            'first-unit': 'Suite 100',
+            'first-city': 'Cambridge',
+            'first-state': 'MA',
+            'first-zip_code': '02138',
+            'first-use_case_debts': 'on',
+            'first-use_case_renovate': 'on',
+            'first-use_case_other': '',
+        }
+    ),
+    (
+        'home', {
+            'home-property_type': 'sf',
+            'home-rent_type': 'no',
+            'home-primary_residence': 'True',
+            'home-ten_year_duration_prediction': 'over_10',
+            'home-home_value': '1000000',
+            'home-household_debt': '500000',
+        }
+    ),
+    (
+        'homeowner', {
+            'homeowner-first_name': 'Load',
+            'homeowner-last_name': 'Test',
+            'homeowner-referrer_name': '',
+            'homeowner-notes': '',
+            'homeowner-when_interested': '7_to_12_months',
+        }
+    ),
+    (
+        'signup', {
+            'signup-phone_number': '617-399-0604',
+            'signup-password1': 'loadtestpassword1',
+            'signup-password2': 'loadtestpassword1',
+            'signup-sms_opt_in': 'on',
+            'signup-agree_to_terms': 'on',
+        }
+    ),
+)
+DONE_STEP = 'done'
+CSRF_COOKIE_NAME = 'csrftoken'
+LOCK_SAMPLE_INTERVAL = 0.1
+TIMEOUT = 30
+
+
+class _NoRedirectHandler(HTTPRedirectHandler):
+    # the wizard answers each valid step with a redirect, which is the response to measure
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Applicant:
+    """ a simulated applicant with its own cookies """
+
+    def __init__(self, base_url, email):
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _NoRedirectHandler)
+        self.last_headers = None
+
+    def _get_csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == CSRF_COOKIE_NAME:
+                return cookie.value
+        return ''
+
+    def request(self, path, data=None):
+        """
+        returns the status of the request to the given path, a POST with data (values or lists
+        of values), its headers are kept in last_headers
+        """
+        headers = {}
+        body = None
+        if data is not None:
+            headers['X-CSRFToken'] = self._get_csrf_token()
+            body = urlencode(data, doseq=True).encode('utf-8')
+        request = Request(self.base_url + path, data=body, headers=headers)
+        try:
+            with self.opener.open(request, timeout=TIMEOUT) as response:
+                response.read()
+                self.last_headers = response.headers
+                return response.getcode()
+        except HTTPError as e:
+            # including the redirects
+            self.last_headers = e.headers
+            return e.code
+
+    def apply(self):
+        """
+        returns the (step, status, seconds) of each request to apply, stopping at the first
+        unexpected status
+        """
+        timings = []
+
+        def timed(step, path, data=None):
+            start = time.perf_counter()
+            try:
+                status = self.request(path, data)
+            except (URLError, OSError):
+                status = None
+            timings.append((step, status, time.perf_counter() - start))
+            return status
+
+        # gets the CSRF cookie
+        if timed('get', '/inquiry/data/first/') != 200:
+            return timings
+        for step, step_data in WIZARD_STEPS:
+            data = dict(step_data, **{'inquiry_apply_wizard-current_step': step})
+            if step == 'first':
+                data['first-email'] = self.email
+            if timed(step, '/inquiry/data/{0}/'.format(step), data) != 302:
+                return timings
+        timed(DONE_STEP, '/inquiry/data/{0}/'.format(DONE_STEP))
+        return timings
+
+
+class LockWaitSampler(threading.Thread):
+    """ samples the number of ungranted PostgreSQL locks until stopped """
+
+    def __init__(self):
+        super().__init__(name='inquiry-lock-sampler', daemon=True)
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            with connection.cursor() as cursor:
+                while not self._stop_event.is_set():
+                    cursor.execute('SELECT count(*) FROM pg_locks WHERE NOT granted')
+                    self.samples.append(cursor.fetchone()[0])
+                    self._stop_event.wait(LOCK_SAMPLE_INTERVAL)
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def get_percentile(values, percentile):
+    """ returns the nearest-rank percentile of the values or None if there are none """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, int(round(percentile / 100 * len(values))) - 1))]
+
+
+class StressResult:
+    def __init__(self, concurrency, timings, elapsed, lock_samples):
+        self.concurrency = concurrency
+        self.elapsed = elapsed
+        self.applicants = len(timings)
+        # applicants who didn't get through the done step
+        self.errors = sum(
+            1 for applicant in timings
+            if not applicant or applicant[-1][:2] != (DONE_STEP, 302)
+        )
+        self.completed = self.applicants - self.errors
+        requests = [timing for applicant in timings for timing in applicant]
+        self.requests = len(requests)
+        self.seconds_by_step = {}
+        for step, _, seconds in requests:
+            self.seconds_by_step.setdefault(step, []).append(seconds)
+        self.seconds = [seconds for _, _, seconds in requests]
+        self.lock_samples = lock_samples
+
+    @property
+    def applicants_per_second(self):
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def requests_per_second(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def error_rate(self):
+        return self.errors / self.applicants if self.applicants else 0.0
+
+    def get_latency(self, percentile, step=None):
+        seconds = self.seconds if step is None else self.seconds_by_step.get(step, [])
+        return get_percentile(seconds, percentile)
+
+    @property
+    def max_lock_waits(self):
+        return max(self.lock_samples) if self.lock_samples else None
+
+    @property
+    def mean_lock_waits(self):
+        return sum(self.lock_samples) / len(self.lock_samples) if self.lock_samples else None
+
+
+def _apply(base_url, run, index):
+    return Applicant(base_url, 'loadtest+{0}-{1}@hometap.com'.format(run, index)).apply()
+
+
+def run_stress(base_url, concurrency, applicants):
+    """ runs the given number of applicants from concurrency workers, returns a StressResult """
+    run = uuid.uuid4().hex[:8]
+    sampler = LockWaitSampler() if connection.vendor == 'postgresql' else None
+    if sampler is not None:
+        sampler.start()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings = list(
+                executor.map(lambda index: _apply(base_url, run, index), range(applicants))
+            )
+        elapsed = time.perf_counter() - start
+    finally:
+        if sampler is not None:
+            sampler.stop()
+    return StressResult(concurrency, timings, elapsed, sampler.samples if sampler else [])
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    stands in for Segment, answering with the status of its server after the latency of its
+    server, which can be changed while it runs to inject faults
+    """
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(self.server.latency)
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_stand_in_server(latency, status=200):
+    """ returns a started stand-in server answering after latency seconds and its URL """
+    server = ThreadedHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.latency, server.status = latency, status
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return (server, 'http://127.0.0.1:{0}/'.format(server.server_address[1]))
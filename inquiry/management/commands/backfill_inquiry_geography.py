@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from inquiry.backfill import DEFAULT_BATCH_SIZE, DEFAULT_PAUSE, backfill_inquiry_geography
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills the state and zip5 columns of inquiries from their addresses in small batched '
+        'transactions, safe to run against the live table'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--pause', type=float, default=DEFAULT_PAUSE, help='seconds to wait between batches'
+        )
+        parser.add_argument(
+            '--all', action='store_true', help='recompute every inquiry, not only the missing ones'
+        )
+
+    def handle(self, *args, **options):
+        updated = backfill_inquiry_geography(
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            only_missing=not options['all'],
+            progress=lambda updated: self.stdout.write('{0} inquiries updated'.format(updated)),
+        )
+        self.stdout.write('Backfilled {0} inquiries'.format(updated))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.forms.models import model_to_dict
+
+from inquiry.models import Inquiry
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads the inquiries with their addresses through model instances and as_dict, and '
+        'through Inquiry.objects.to_dataframe(), and reports the time of each'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='number of inquiries, defaults to all')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        queryset = Inquiry.objects.order_by('pk')
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+
+        def load_instances():
+            rows = []
+            for inquiry in queryset.select_related('address').iterator():
+                row = inquiry.as_dict
+                row.update(model_to_dict(inquiry.address) if inquiry.address else {})
+                rows.append(row)
+            return len(rows)
+
+        def load_columnar():
+            return len(queryset.to_dataframe(chunk_size=options['chunk_size']))
+
+        self.stdout.write('{0:<12}{1:>10}{2:>12}'.format('path', 'rows', 'seconds'))
+        for name, load in (('instances', load_instances), ('columnar', load_columnar)):
+            start = time.perf_counter()
+            rows = load()
+            self.stdout.write(
+                '{0:<12}{1:>10}{2:>12.2f}'.format(name, rows, time.perf_counter() - start)
+            )
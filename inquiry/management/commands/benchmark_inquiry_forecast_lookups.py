@@ -0,0 +1,65 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inquiry.utils import (
+    get_desirable_zip_codes, get_zip_code_forecast_snapshot, undesirable_zip_code
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Looks up whether zip codes are undesirable from increasing numbers of threads, with '
+        'boolean indexing of the forecast dataframe and with undesirable_zip_code(), which looks '
+        'the immutable forecast snapshot up and counts the lookup in the metrics, and reports the '
+        'lookups per second of each'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+        parser.add_argument(
+            '--lookups', type=int, default=20000, help='snapshot lookups per thread'
+        )
+        parser.add_argument(
+            '--dataframe-lookups', type=int, default=200,
+            help='dataframe lookups per thread, which are much slower'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        snapshot = get_zip_code_forecast_snapshot()
+        if snapshot is None:
+            raise CommandError('No zip code forecast')
+        df = snapshot.source
+        # zip codes with data and a few without
+        candidates = ['{0:05d}'.format(int(zip_code)) for zip_code in snapshot.zip_codes]
+        candidates += ['00000', '99999']
+        zip_codes = random.Random(options['seed']).choices(candidates, k=options['lookups'])
+        dataframe_zip_codes = zip_codes[:options['dataframe_lookups']]
+
+        def dataframe_lookups():
+            # the lookup of undesirable_zip_code() before the snapshot
+            for zip_code in dataframe_zip_codes:
+                if len(df.loc[df[settings.ZIP_CODE_COL] == int(zip_code)]):
+                    zip_code not in get_desirable_zip_codes(df)
+
+        def snapshot_lookups():
+            # the production path of the wizard, with the metrics of settings.INQUIRY_METRICS_DIR
+            for zip_code in zip_codes:
+                undesirable_zip_code(zip_code)
+
+        self.stdout.write('{0:<12}{1:>10}{2:>14}'.format('lookup', 'threads', 'lookups/s'))
+        for name, lookups, count in (
+            ('dataframe', dataframe_lookups, len(dataframe_zip_codes)),
+            ('snapshot', snapshot_lookups, len(zip_codes)),
+        ):
+            for threads in options['threads']:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    for future in [executor.submit(lookups) for _ in range(threads)]:
+                        future.result()
+                throughput = threads * count / (time.perf_counter() - start)
+                self.stdout.write('{0:<12}{1:>10}{2:>14.0f}'.format(name, threads, throughput))
@@ -0,0 +1,106 @@
+import glob
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from inquiry.loadtest import get_percentile, start_stand_in_server
+from inquiry.management.commands.benchmark_inquiry_side_effects import FIRST_STEP_DATA
+from inquiry.resilience import SPOOL_PATTERN, reset_breakers
+
+ROW_FORMAT = '{0:<12}{1:<11}{2:>10}{3:>10}{4:>8}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Posts the first inquiry wizard step from concurrent clients while a local stand-in for '
+        'Segment is healthy, then down, then recovered, with and without the side effect '
+        'timeouts and circuit breakers, and reports the p50 and p99 latency of each phase'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='requests per phase')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--latency', type=float, default=0.02, help='seconds the healthy stand-in takes'
+        )
+        parser.add_argument(
+            '--outage-latency', type=float, default=2.0,
+            help='seconds the stand-in hangs during the outage'
+        )
+        parser.add_argument(
+            '--outage-status', type=int, default=200,
+            help='status of the stand-in during the outage, e.g. 503'
+        )
+        parser.add_argument('--timeout', type=float, default=0.25, help='side effect timeout')
+
+    def _post_first_step(self):
+        start = time.perf_counter()
+        try:
+            # the test client raises the exceptions of the view, e.g. of a failed side effect
+            failed = Client().post(self.url, FIRST_STEP_DATA).status_code not in (200, 302)
+        except Exception:
+            failed = True
+        return (time.perf_counter() - start, failed)
+
+    def _run_phase(self, mode, phase, options):
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(
+                executor.map(lambda _: self._post_first_step(), range(options['requests']))
+            )
+        seconds = [result[0] for result in results]
+        self.stdout.write(
+            ROW_FORMAT.format(
+                mode, phase, '{0:.1f}'.format(get_percentile(seconds, 50) * 1000),
+                '{0:.1f}'.format(get_percentile(seconds, 99) * 1000),
+                sum(result[1] for result in results)
+            )
+        )
+
+    def _run(self, mode, options):
+        self.server.latency, self.server.status = options['latency'], 200
+        self._run_phase(mode, 'healthy', options)
+        self.server.latency = options['outage_latency']
+        self.server.status = options['outage_status']
+        self._run_phase(mode, 'outage', options)
+        self.server.latency, self.server.status = options['latency'], 200
+        # lets the hung calls end and the circuit breakers let a trial call through
+        time.sleep(options['outage_latency'] + self.reset_timeout)
+        self._run_phase(mode, 'recovered', options)
+
+    def handle(self, *args, **options):
+        self.server, url = start_stand_in_server(options['latency'])
+        self.url = reverse('inquiry:inquiry_step', kwargs={'step': 'first'})
+        self.reset_timeout = 1
+        spool_dir = tempfile.mkdtemp()
+
+        def stand_in(*args, **kwargs):
+            urlopen(url, data=b'{}').read()
+
+        self.stdout.write(ROW_FORMAT.format('mode', 'phase', 'p50 ms', 'p99 ms', 'errors'))
+        try:
+            with mock.patch('inquiry.views.segment_event', stand_in), override_settings(
+                INQUIRY_BACKGROUND_SIDE_EFFECTS=False,
+                INQUIRY_CIRCUIT_RESET_TIMEOUT=self.reset_timeout,
+                INQUIRY_SPOOL_DIR=spool_dir,
+            ):
+                self._run('unguarded', options)
+                reset_breakers()
+                with override_settings(INQUIRY_SIDE_EFFECT_TIMEOUT=options['timeout']):
+                    self._run('guarded', options)
+                reset_breakers()
+            spooled = 0
+            for path in glob.glob(os.path.join(spool_dir, SPOOL_PATTERN)):
+                with open(path) as spool_file:
+                    spooled += sum(1 for _ in spool_file)
+            self.stdout.write('{0} side effects spooled during the outage'.format(spooled))
+        finally:
+            self.server.shutdown()
+            shutil.rmtree(spool_dir)
@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+from unittest import mock
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from inquiry.loadtest import start_stand_in_server
+from inquiry.side_effects import wait_for_side_effects
+
+# a valid first step, which sends a Segment event whatever the vetting outcome
+FIRST_STEP_DATA = {
+    'inquiry_apply_wizard-current_step': 'first',
+    'first-street': '20 University Rd',
+    'first-unit': 'Suite 100',
+    'first-city': 'Cambridge',
+    'first-state': 'MA',
+    'first-zip_code': '02138',
+    'first-use_case_debts': 'on',
+    'first-email': 'benchmark@hometap.com',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Posts the first inquiry wizard step from concurrent clients with its Segment event sent '
+        'inline and in the background, against a local stand-in for Segment, and reports the '
+        'throughput and median latency of each mode'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--latency', type=float, default=0.2, help='seconds the stand-in takes to answer'
+        )
+
+    def _post_first_step(self):
+        start = time.perf_counter()
+        response = Client().post(self.url, FIRST_STEP_DATA)
+        if response.status_code not in (200, 302):
+            raise RuntimeError('Unexpected status {0}'.format(response.status_code))
+        return time.perf_counter() - start
+
+    def _run(self, requests, concurrency):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings = list(executor.map(lambda _: self._post_first_step(), range(requests)))
+        elapsed = time.perf_counter() - start
+        return (requests / elapsed, median(timings))
+
+    def handle(self, *args, **options):
+        server, url = start_stand_in_server(options['latency'])
+        self.url = reverse('inquiry:inquiry_step', kwargs={'step': 'first'})
+
+        def stand_in(*args, **kwargs):
+            urlopen(url, data=b'{}').read()
+
+        self.stdout.write('{0:<12}{1:>16}{2:>16}'.format('mode', 'requests/s', 'median ms'))
+        try:
+            with mock.patch('inquiry.views.segment_event', stand_in):
+                for mode, background in (('inline', False), ('background', True)):
+                    with override_settings(INQUIRY_BACKGROUND_SIDE_EFFECTS=background):
+                        throughput, latency = self._run(
+                            options['requests'], options['concurrency']
+                        )
+                        # drain the queued side effects before the next run
+                        wait_for_side_effects()
+                    self.stdout.write(
+                        '{0:<12}{1:>16.1f}{2:>16.1f}'.format(mode, throughput, latency * 1000)
+                    )
+        finally:
+            server.shutdown()
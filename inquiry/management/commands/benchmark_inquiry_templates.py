@@ -0,0 +1,120 @@
+import copy
+import re
+import time
+from statistics import median
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.template.loaders.base import Loader
+from django.test import RequestFactory, override_settings
+
+from inquiry.views import InquiryApplyWizard
+
+CACHE_TAG_RE = re.compile(r'{%\s*(?:end)?cache\b[^%]*%}')
+DEFAULT_LOADERS = ['django.template.loaders.filesystem.Loader']
+APP_DIRECTORIES_LOADER = 'django.template.loaders.app_directories.Loader'
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+class CacheTagStrippingLoader(Loader):
+    """ loads the templates of the given loaders without their {% cache %} tags """
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine)
+        self.loaders = engine.get_template_loaders(loaders)
+
+    def get_template_sources(self, template_name):
+        for loader in self.loaders:
+            yield from loader.get_template_sources(template_name)
+
+    def get_contents(self, origin):
+        return CACHE_TAG_RE.sub('', origin.loader.get_contents(origin))
+
+
+def _get_base_loaders(template_settings):
+    """ returns the configured loaders of the DjangoTemplates backend, without the cached one """
+    options = template_settings.get('OPTIONS', {})
+    if 'loaders' not in options:
+        loaders = list(DEFAULT_LOADERS)
+        if template_settings.get('APP_DIRS'):
+            loaders.append(APP_DIRECTORIES_LOADER)
+        return loaders
+    loaders = []
+    for loader in options['loaders']:
+        if isinstance(loader, (tuple, list)) and loader[0] == CACHED_LOADER:
+            loaders.extend(loader[1])
+        else:
+            loaders.append(loader)
+    return loaders
+
+
+def get_templates_settings(strip_cache_tags):
+    """
+    returns the TEMPLATES setting with the cached template loader, over loaders stripping the
+    {% cache %} tags if strip_cache_tags
+    """
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for template_settings in templates:
+        if template_settings['BACKEND'] != 'django.template.backends.django.DjangoTemplates':
+            continue
+        loaders = _get_base_loaders(template_settings)
+        if strip_cache_tags:
+            loaders = [(__name__ + '.CacheTagStrippingLoader', loaders)]
+        template_settings['APP_DIRS'] = False
+        template_settings.setdefault('OPTIONS', {})['loaders'] = [(CACHED_LOADER, loaders)]
+    return templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders every inquiry wizard step from the same templates without their {% cache %} '
+        'tags and with them, on the configured cache backend, and reports the median render time '
+        'per step. Both use the cached template loader.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=200, help='number of renders per step and mode'
+        )
+
+    @staticmethod
+    def _get_request(step):
+        request = RequestFactory().get('/inquiry/data/{0}/'.format(step))
+        SessionMiddleware().process_request(request)
+        request.session.save()
+        request.user = AnonymousUser()
+        return request
+
+    def _time_step(self, view, step, iterations):
+        timings = []
+        for _ in range(iterations):
+            request = self._get_request(step)
+            start = time.perf_counter()
+            response = view(request, step=step)
+            response.render()
+            timings.append(time.perf_counter() - start)
+        return median(timings)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        view = InquiryApplyWizard.as_view(
+            InquiryApplyWizard.form_list, url_name='inquiry:inquiry_step'
+        )
+        self.stdout.write(
+            '{0:<12}{1:>16}{2:>16}{3:>10}'.format('step', 'uncached ms', 'cached ms', 'speedup')
+        )
+        for step, _ in InquiryApplyWizard.form_list:
+            # the templates are reloaded when the setting changes, without the cache tags the
+            # fragments are rendered on every request and the cache isn't called at all
+            with override_settings(TEMPLATES=get_templates_settings(strip_cache_tags=True)):
+                uncached = self._time_step(view, step, iterations)
+            # the median hides the first render that fills the fragment cache
+            with override_settings(TEMPLATES=get_templates_settings(strip_cache_tags=False)):
+                cached = self._time_step(view, step, iterations)
+            self.stdout.write(
+                '{0:<12}{1:>16.3f}{2:>16.3f}{3:>9.2f}x'.format(
+                    step, uncached * 1000, cached * 1000, uncached / cached
+                )
+            )
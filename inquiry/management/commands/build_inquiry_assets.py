@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inquiry.assets import build_assets
+
+
+class Command(BaseCommand):
+    help = (
+        'Compiles the inquiry SCSS, bundles and minifies the wizard JS and writes them with '
+        'content-hashed filenames. Run before collectstatic on deploy.'
+    )
+
+    def handle(self, *args, **options):
+        # libsass and rjsmin are only needed at build time
+        try:
+            import sass
+            import rjsmin
+        except ImportError as e:
+            raise CommandError(
+                'building the inquiry assets requires libsass and rjsmin: {0}'.format(e)
+            )
+
+        manifest = build_assets(
+            compile_scss=lambda source: sass.compile(string=source, output_style='compressed'),
+            minify_js=rjsmin.jsmin,
+        )
+        for kind in ('css', 'js'):
+            for bundle_name, hashed_name in sorted(manifest[kind].items()):
+                self.stdout.write('{0} {1} -> {2}'.format(kind, bundle_name, hashed_name))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inquiry.metrics import get_metrics_dir, merge_exited_files, reset_metrics_dir
+
+
+class Command(BaseCommand):
+    help = (
+        'Merges the metrics files of the exited workers into a single file. With --reset, deletes '
+        'every metrics file instead, run it on deploy before the workers start.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true', help='delete the metrics files, the values start over'
+        )
+
+    def handle(self, *args, **options):
+        metrics_dir = get_metrics_dir()
+        if not metrics_dir:
+            raise CommandError('settings.INQUIRY_METRICS_DIR is not set')
+        if options['reset']:
+            self.stdout.write('Deleted {0} metrics files'.format(reset_metrics_dir(metrics_dir)))
+        else:
+            self.stdout.write('Merged {0} metrics files'.format(merge_exited_files(metrics_dir)))
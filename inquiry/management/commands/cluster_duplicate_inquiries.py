@@ -0,0 +1,46 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from inquiry.backfill import backfill_inquiry_fingerprints
+from inquiry.duplicates import get_duplicate_clusters, mark_possible_duplicates
+
+
+class Command(BaseCommand):
+    help = (
+        'Clusters the inquiries with the same address or name fingerprint and writes the '
+        'clusters to a CSV file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='path of the CSV file of clusters')
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='compute the missing fingerprints first, in batches',
+        )
+        parser.add_argument(
+            '--mark',
+            action='store_true',
+            help='point the unmarked inquiries of each cluster to its earliest inquiry',
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            updated = backfill_inquiry_fingerprints()
+            self.stdout.write('Computed the fingerprints of {0} inquiries'.format(updated))
+
+        clusters = get_duplicate_clusters()
+        with open(options['output'], 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['cluster', 'inquiry_id', 'created_at'])
+            for index, cluster in enumerate(clusters, start=1):
+                for inquiry_id, created_at in cluster:
+                    writer.writerow([index, inquiry_id, created_at.isoformat()])
+        self.stdout.write(
+            'Found {0} clusters of {1} inquiries'.format(
+                len(clusters), sum(len(cluster) for cluster in clusters)
+            )
+        )
+        if options['mark']:
+            self.stdout.write('Marked {0} inquiries'.format(mark_possible_duplicates(clusters)))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from inquiry.export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_inquiries
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports the inquiries, with their address, created or changed since the last run of the '
+        'named export to gzipped JSONL or CSV chunk files'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir')
+        parser.add_argument('--name', default='warehouse', help='name of the export watermark')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='jsonl')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            '--full', action='store_true', help='export every inquiry and reset the watermark'
+        )
+
+    def handle(self, *args, **options):
+        paths = export_inquiries(
+            options['output_dir'],
+            options['name'],
+            file_format=options['format'],
+            chunk_size=options['chunk_size'],
+            full=options['full'],
+            progress=lambda path, rows: self.stdout.write('{0}: {1} inquiries'.format(path, rows)),
+        )
+        self.stdout.write('Wrote {0} chunks'.format(len(paths)))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inquiry.resilience import flush_spool
+
+
+class Command(BaseCommand):
+    help = (
+        'Calls the side effects spooled during an outage of Segment or email again, spooling the '
+        'ones that fail again and dropping the ones older than the retention. Stops when a '
+        'circuit opens, the next run continues. Only run one at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spool-dir', help='spool directory, settings.INQUIRY_SPOOL_DIR by default'
+        )
+
+    def handle(self, *args, **options):
+        spool_dir = options['spool_dir'] or getattr(settings, 'INQUIRY_SPOOL_DIR', None)
+        if not spool_dir:
+            raise CommandError('No spool directory')
+        succeeded, failed, expired = flush_spool(spool_dir)
+        self.stdout.write(
+            '{0} side effects done, {1} spooled again, {2} expired'.format(
+                succeeded, failed, expired
+            )
+        )
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils import OPERATIONAL_STATES
+from inquiry.synthetic import DEFAULT_CHUNK_SIZE, generate_inquiries
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates synthetic inquiries with their client and address for benchmarks, in bulk '
+        'without sending emails'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int)
+        parser.add_argument(
+            '--states', nargs='+', default=list(OPERATIONAL_STATES),
+            help='states of the addresses, the operational states by default'
+        )
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--seed', type=int, help='seed of the generated values')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(created):
+            self.stdout.write(
+                '{0} inquiries created, {1:.0f} per second'.format(
+                    created, created / (time.perf_counter() - started)
+                )
+            )
+
+        try:
+            created = generate_inquiries(
+                options['count'],
+                options['states'],
+                chunk_size=options['chunk_size'],
+                seed=options['seed'],
+                progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            'Created {0} inquiries in {1:.1f}s'.format(created, time.perf_counter() - started)
+        )
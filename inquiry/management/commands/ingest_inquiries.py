@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from inquiry.ingest import DEFAULT_CHUNK_SIZE, LEAD_FORMATS, ingest_leads, read_leads
+
+
+class Command(BaseCommand):
+    help = 'Creates inquiries in bulk from a CSV or JSONL file of partner leads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='path of the lead file')
+        parser.add_argument(
+            '--format', choices=LEAD_FORMATS, help='lead file format, defaults to the extension'
+        )
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith('.jsonl') else 'csv')
+        with open(path, newline='', encoding='utf-8-sig') as lead_file:
+            report = ingest_leads(
+                read_leads(lead_file, file_format), chunk_size=options['chunk_size']
+            )
+
+        for row, errors in report.errors:
+            self.stderr.write('row {0}: {1}'.format(row, json.dumps(errors)))
+        for row, outcome_key in report.rejected:
+            self.stdout.write('row {0}: rejected {1}'.format(row, outcome_key))
+        self.stdout.write(
+            '{0} rows, {1} created, {2} rejected, {3} errors in {4:.1f}s ({5:.1f} rows/s)'.format(
+                report.rows, report.created, len(report.rejected), len(report.errors),
+                report.elapsed, report.rows_per_second
+            )
+        )
@@ -0,0 +1,74 @@
+import os
+import time
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+# smaps_rollup fields (in kB) summed for the unique set size, the memory only the process maps
+USS_FIELDS = ('Private_Clean', 'Private_Dirty')
+
+
+def get_child_pids(pid):
+    """ returns the pids of the children of the given process, e.g. the gunicorn workers """
+    children = []
+    for tid in os.listdir('/proc/{0}/task'.format(pid)):
+        with open('/proc/{0}/task/{1}/children'.format(pid, tid)) as children_file:
+            children.extend(int(child) for child in children_file.read().split())
+    return sorted(children)
+
+
+def get_memory_usage(pid):
+    """ returns the unique and proportional set sizes of the given process in kB """
+    fields = {}
+    with open('/proc/{0}/smaps_rollup'.format(pid)) as smaps_file:
+        for line in smaps_file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return (sum(fields.get(field, 0) for field in USS_FIELDS), fields.get('Pss', 0))
+
+
+class Command(BaseCommand):
+    help = (
+        'Reports the unique (USS) and proportional (PSS) set size of each worker of a running '
+        'gunicorn master, optionally after sending requests to warm the workers up, to compare '
+        'runs with and without INQUIRY_PRELOAD. Linux only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('master_pid', type=int)
+        parser.add_argument('--url', help='URL requested before measuring, e.g. a wizard step')
+        parser.add_argument('--requests', type=int, default=0)
+        parser.add_argument(
+            '--interval', type=float, default=0, help='seconds between samples, 0 samples once'
+        )
+        parser.add_argument('--samples', type=int, default=1)
+
+    def _report(self, worker_pids):
+        total_uss = 0
+        for pid in worker_pids:
+            uss, pss = get_memory_usage(pid)
+            total_uss += uss
+            self.stdout.write('{0:<10}{1:>14.1f}{2:>14.1f}'.format(pid, uss / 1024, pss / 1024))
+        self.stdout.write(
+            'mean worker USS {0:.1f} MB over {1} workers'.format(
+                total_uss / 1024 / len(worker_pids), len(worker_pids)
+            )
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('This command requires /proc/<pid>/smaps_rollup (Linux 4.14+)')
+        worker_pids = get_child_pids(options['master_pid'])
+        if not worker_pids:
+            raise CommandError('Process {0} has no workers'.format(options['master_pid']))
+
+        if options['url']:
+            for _ in range(options['requests']):
+                urlopen(options['url']).read()
+
+        for sample in range(options['samples']):
+            if sample:
+                time.sleep(options['interval'])
+            self.stdout.write('{0:<10}{1:>14}{2:>14}'.format('pid', 'USS MB', 'PSS MB'))
+            self._report(worker_pids)
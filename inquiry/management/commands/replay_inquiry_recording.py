@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inquiry.loadtest import get_percentile
+from inquiry.recording import read_sessions, replay_sessions, summarize_replay
+
+ROW_FORMAT = '{0:<16} {1:>6} {2:>10} {3:>10} {4:>10} {5:>10} {6:>9} {7:>9} {8:>8} {9:>8}'
+
+
+def _format_ms(values, percentile):
+    value = get_percentile(values, percentile)
+    return '-' if value is None else '{0:.0f}'.format(value)
+
+
+def _format_mean(values):
+    return '-' if not values else '{0:.1f}'.format(sum(values) / len(values))
+
+
+def _format_errors(statuses):
+    return str(sum(1 for status in statuses if status is None or status >= 500))
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays the recorded inquiry wizard sessions against a baseline and a candidate server '
+        'and compares the latency and query count of each step. The query counts require '
+        'settings.INQUIRY_QUERY_COUNT_HEADER on the servers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='URL of the baseline server')
+        parser.add_argument('candidate', help='URL of the candidate server')
+        parser.add_argument(
+            '--recording-dir', help='recording directory, settings.INQUIRY_RECORDING_DIR by default'
+        )
+        parser.add_argument('--sessions', type=int, help='replay only the first sessions')
+        parser.add_argument('--concurrency', type=int, default=1)
+
+    def handle(self, *args, **options):
+        recording_dir = options['recording_dir'] or getattr(settings, 'INQUIRY_RECORDING_DIR', None)
+        if not recording_dir:
+            raise CommandError('No recording directory')
+        sessions = read_sessions(recording_dir)[:options['sessions']]
+        if not sessions:
+            raise CommandError('No recorded sessions')
+        self.stdout.write('Replaying {0} sessions'.format(len(sessions)))
+        summaries = [
+            summarize_replay(replay_sessions(options[server], sessions, options['concurrency']))
+            for server in ('baseline', 'candidate')
+        ]
+        self.stdout.write(
+            ROW_FORMAT.format(
+                'request', 'count', 'base p50', 'cand p50', 'base p95', 'cand p95', 'base qry',
+                'cand qry', 'base err', 'cand err'
+            )
+        )
+        baseline, candidate = summaries
+        for key in sorted(baseline):
+            base, cand = baseline[key], candidate[key]
+            self.stdout.write(
+                ROW_FORMAT.format(
+                    '{0} {1}'.format(*key), len(base['ms']),
+                    _format_ms(base['ms'], 50), _format_ms(cand['ms'], 50),
+                    _format_ms(base['ms'], 95), _format_ms(cand['ms'], 95),
+                    _format_mean(base['queries']), _format_mean(cand['queries']),
+                    _format_errors(base['statuses']), _format_errors(cand['statuses'])
+                )
+            )
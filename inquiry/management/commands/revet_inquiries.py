@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from inquiry.revetting import revet_inquiries, write_rejected_csv
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-evaluates the inquiry outcome rules over every inquiry in parallel worker processes. '
+        'Resumes from the checkpoint directory if a previous run was interrupted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('checkpoint_dir', help='directory holding the per-shard results')
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument(
+            '--shards', type=int, help='number of shards, defaults to 4 per worker'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        shard_count = options['shards'] or workers * 4
+        checkpoint_dir = options['checkpoint_dir']
+
+        start = time.perf_counter()
+        results = revet_inquiries(
+            checkpoint_dir,
+            workers,
+            shard_count,
+            progress=lambda result: self.stdout.write('shard {0} done'.format(result['shard'])),
+        )
+        rejected_path = os.path.join(checkpoint_dir, 'rejected.csv')
+        write_rejected_csv(rejected_path, results['rejected'])
+
+        for outcome_key, count in sorted(results['counts'].items()):
+            self.stdout.write('{0}: {1}'.format(outcome_key, count))
+        self.stdout.write(
+            'Re-vetted {0} inquiries in {1:.1f}s, rejected inquiries written to {2}'.format(
+                sum(results['counts'].values()), time.perf_counter() - start, rejected_path
+            )
+        )
@@ -0,0 +1,46 @@
+import datetime
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inquiry.profiling import aggregate_profiles, get_profile_dir, get_profiles
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    help = (
+        'Lists the slowest profiled inquiry wizard requests and the hot functions of those '
+        'profiles combined'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile-dir', help='profile directory, settings.INQUIRY_PROFILE_DIR by default'
+        )
+        parser.add_argument('--step', help='only the profiles of this wizard step')
+        parser.add_argument(
+            '--limit', type=int, default=10, help='number of slowest profiles to aggregate'
+        )
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative')
+        parser.add_argument('--functions', type=int, default=30, help='number of hot functions')
+
+    def handle(self, *args, **options):
+        profile_dir = options['profile_dir'] or get_profile_dir()
+        if not profile_dir:
+            raise CommandError('No profile directory')
+        profiles = get_profiles(profile_dir, step=options['step'])[:options['limit']]
+        if not profiles:
+            self.stdout.write('No profiles')
+            return
+        for profile in profiles:
+            self.stdout.write(
+                '{0:>7}ms {1} {2:<9} {3} {4}'.format(
+                    profile.ms, profile.method, profile.step,
+                    datetime.datetime.fromtimestamp(profile.timestamp).isoformat(), profile.path
+                )
+            )
+        output = io.StringIO()
+        stats = aggregate_profiles(profiles, stream=output)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['functions'])
+        self.stdout.write(output.getvalue())
@@ -0,0 +1,99 @@
+import threading
+from unittest import mock
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+)
+from django.test import override_settings
+
+from inquiry.loadtest import DONE_STEP, run_stress, start_stand_in_server
+
+PERCENTILES = (50, 95, 99)
+ROW_FORMAT = '{0:>11} {1:>12} {2:>10} {3:>8} {4:>8} {5:>8} {6:>11} {7:>7} {8:>10}'
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs simulated applicants through the inquiry wizard from increasing numbers of '
+        'concurrent workers and reports the throughput, latency percentiles, errors and database '
+        'lock waits of each concurrency level. Without --base-url, the wizard runs in a local '
+        'server in this process with local stand-ins for Segment and email.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            help='URL of a running server, whose Segment and email settings should point to '
+            'stand-ins'
+        )
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+        parser.add_argument(
+            '--applicants', type=int, default=10, help='applicants per concurrent worker'
+        )
+        parser.add_argument(
+            '--segment-latency', type=float, default=0.05,
+            help='seconds the Segment stand-in takes to answer'
+        )
+
+    def _write_result(self, result):
+        latencies = [result.get_latency(percentile) for percentile in PERCENTILES]
+        latencies.append(result.get_latency(95, step=DONE_STEP))
+        lock_waits = '-'
+        if result.max_lock_waits is not None:
+            lock_waits = '{0}/{1:.1f}'.format(result.max_lock_waits, result.mean_lock_waits)
+        self.stdout.write(
+            ROW_FORMAT.format(
+                result.concurrency,
+                '{0:.1f}'.format(result.applicants_per_second),
+                '{0:.1f}'.format(result.requests_per_second),
+                *['-' if latency is None else '{0:.0f}'.format(latency * 1000)
+                  for latency in latencies],
+                '{0:.1%}'.format(result.error_rate),
+                lock_waits
+            )
+        )
+
+    def _run(self, base_url, options):
+        self.stdout.write(
+            ROW_FORMAT.format(
+                'concurrency', 'applicants/s', 'requests/s', 'p50 ms', 'p95 ms', 'p99 ms',
+                'done p95 ms', 'errors', 'lock waits'
+            )
+        )
+        for concurrency in options['concurrency']:
+            self._write_result(
+                run_stress(base_url, concurrency, concurrency * options['applicants'])
+            )
+        self.stdout.write('lock waits: maximum/mean number of ungranted locks (PostgreSQL only)')
+
+    def handle(self, *args, **options):
+        if options['base_url']:
+            self._run(options['base_url'], options)
+            return
+
+        stand_in, stand_in_url = start_stand_in_server(options['segment_latency'])
+
+        def segment_stand_in(*args, **kwargs):
+            urlopen(stand_in_url, data=b'{}').read()
+
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler)
+        server.daemon_threads = True
+        server.set_app(get_internal_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with mock.patch('inquiry.views.segment_event', segment_stand_in), override_settings(
+                ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['127.0.0.1'],
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            ):
+                self._run('http://127.0.0.1:{0}'.format(server.server_address[1]), options)
+        finally:
+            server.shutdown()
+            stand_in.shutdown()
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inquiry.decision_log import read_decisions
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarizes the logged first step vetting decisions by outcome and forecast version, '
+        'optionally writing them to a CSV file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log-dir', help='decision log directory, settings.INQUIRY_DECISION_LOG_DIR by default'
+        )
+        parser.add_argument('--days', type=float, help='only the decisions of the last days')
+        parser.add_argument('--output', help='CSV file of the decisions')
+
+    def handle(self, *args, **options):
+        log_dir = options['log_dir'] or getattr(settings, 'INQUIRY_DECISION_LOG_DIR', None)
+        if not log_dir:
+            raise CommandError('No decision log directory')
+        since = None if options['days'] is None else time.time() - options['days'] * 86400
+        started = time.perf_counter()
+        decisions = read_decisions(log_dir, since=since)
+        self.stdout.write(
+            'Read {0} decisions in {1:.2f}s'.format(len(decisions), time.perf_counter() - started)
+        )
+        if decisions.empty:
+            return
+        summary = decisions.groupby(
+            ['forecast_version', 'outcome_key'], observed=True
+        ).size().rename('decisions')
+        self.stdout.write(summary.to_string())
+        if options['output']:
+            decisions.to_csv(options['output'], index=False)
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inquiry.forecast import clean_zip_code_forecast
+
+
+class Command(BaseCommand):
+    help = (
+        'Validates and cleans a zip code forecast CSV before it is deployed, optionally writing '
+        'the cleaned forecast'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='path of the forecast CSV')
+        parser.add_argument('--output', help='path to write the cleaned forecast CSV to')
+
+    def handle(self, *args, **options):
+        try:
+            df = pd.read_csv(options['path'], dtype=str)
+            clean, notes = clean_zip_code_forecast(df)
+        except (OSError, ValueError) as e:
+            # ForecastValidationError is a ValueError
+            raise CommandError('Rejected {0}: {1}'.format(options['path'], e))
+
+        for note in notes:
+            self.stdout.write(note)
+        columns = ', '.join('{0} ({1})'.format(col, dtype) for col, dtype in clean.dtypes.items())
+        self.stdout.write('{0} zip codes, columns: {1}'.format(len(clean), columns))
+        if options['output']:
+            clean.to_csv(options['output'], index=False)
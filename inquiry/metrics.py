@@ -0,0 +1,397 @@
+"""
+Counters and histograms of the inquiry app aggregated across worker processes.
+
+With settings.INQUIRY_METRICS_DIR set, each process keeps its metric values in its own
+memory-mapped file in that directory, metrics-<pid>.db, so incrementing a metric is a write to
+shared memory without locks between processes. get_exposition() sums the values of every file
+and renders them in the Prometheus text format for InquiryMetricsView.
+
+Each process holds a shared lock on its file while it runs. The files of the processes that
+exited are still read, which keeps the counters monotonic, and merge_exited_files() adds their
+values to a single metrics-merged.db and deletes them, so that the directory doesn't grow with
+every restarted worker; the clean_inquiry_metrics command runs it, e.g. periodically from cron.
+
+The values start again from zero when the directory is emptied, which clean_inquiry_metrics
+--reset does. Run it when the application is deployed, before the workers start, so that the
+metrics of a release aren't mixed with those of the previous one.
+
+Counter.local() returns a counter with fixed labels for hot paths, e.g. the forecast lookups: its
+key is encoded once and it counts in the thread, without locks, folding the counts of the thread
+into the file every FOLD_EVERY increments or once FOLD_SECONDS have passed since the last fold.
+The counts of a thread that stopped counting stay pending until its next increment.
+"""
+import fcntl
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+FILE_PATTERN = 'metrics-*.db'
+MERGED_FILE = 'metrics-merged.db'
+# held while merging so that concurrent merges don't merge a file twice
+MERGE_LOCK_FILE = 'merge.lock'
+INITIAL_FILE_SIZE = 64 * 1024
+# the first 8 bytes of a file hold the number of bytes used
+HEADER_SIZE = 8
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# increments and seconds after which the local counts of a thread are folded into its process'
+FOLD_EVERY = 1000
+FOLD_SECONDS = 1.0
+
+# registered metrics by name, in exposition order
+REGISTRY = {}
+
+_values = None
+_values_lock = threading.Lock()
+
+
+def _get_padding(key_length):
+    # entries are (key length int32, key, padding, value double) aligned on 8 bytes
+    return (8 - (key_length + 4) % 8) % 8
+
+
+def _iter_entries(data):
+    """ yields the (key, value offset) of the entries of a metrics file """
+    used = struct.unpack_from('i', data, 0)[0]
+    position = HEADER_SIZE
+    while position < used:
+        key_length = struct.unpack_from('i', data, position)[0]
+        position += 4
+        key = bytes(data[position:position + key_length]).decode('utf-8')
+        position += key_length + _get_padding(key_length)
+        yield key, position
+        position += 8
+
+
+class MmapValues:
+    """ the metric values of a process in a memory-mapped file, only written by that process """
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._file = self._open_locked(path)
+        size = os.fstat(self._file.fileno()).st_size
+        if size < INITIAL_FILE_SIZE:
+            self._file.truncate(INITIAL_FILE_SIZE)
+            size = INITIAL_FILE_SIZE
+        self._capacity = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = struct.unpack_from('i', self._map, 0)[0]
+        if self._used == 0:
+            # a new file
+            self._used = HEADER_SIZE
+            struct.pack_into('i', self._map, 0, self._used)
+        # a pid reused after a worker exited continues the values of its file
+        self._positions = dict(_iter_entries(self._map))
+
+    @staticmethod
+    def _open_locked(path):
+        """ returns the file at path opened with a shared lock, telling merges it is in use """
+        while True:
+            metrics_file = open(path, 'a+b')
+            fcntl.flock(metrics_file.fileno(), fcntl.LOCK_SH)
+            # a merge may have deleted the file while waiting for the lock
+            if os.path.exists(path) and os.path.samestat(
+                os.fstat(metrics_file.fileno()), os.stat(path)
+            ):
+                return metrics_file
+            metrics_file.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _add_entry(self, key):
+        encoded = key.encode('utf-8')
+        entry = struct.pack(
+            'i{0}sd'.format(len(encoded) + _get_padding(len(encoded))), len(encoded), encoded, 0.0
+        )
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._map[self._used:self._used + len(entry)] = entry
+        position = self._used + len(entry) - 8
+        self._used += len(entry)
+        # written after the entry so that readers never see a partial entry
+        struct.pack_into('i', self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def inc(self, key, amount):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._add_entry(key)
+            value = struct.unpack_from('d', self._map, position)[0]
+            struct.pack_into('d', self._map, position, value + amount)
+
+
+def get_metrics_dir():
+    return getattr(settings, 'INQUIRY_METRICS_DIR', None)
+
+
+def _get_values():
+    """ returns the values of this process or None if the metrics are disabled """
+    global _values
+    metrics_dir = get_metrics_dir()
+    if not metrics_dir:
+        return None
+    path = os.path.join(metrics_dir, 'metrics-{0}.db'.format(os.getpid()))
+    # a forked worker doesn't share the file of its parent
+    if _values is None or _values.path != path:
+        with _values_lock:
+            if _values is None or _values.path != path:
+                os.makedirs(metrics_dir, exist_ok=True)
+                _values = MmapValues(path)
+    return _values
+
+
+def _get_key(sample_name, labels):
+    return json.dumps([sample_name, sorted(labels.items())])
+
+
+class _LocalCounts(threading.local):
+    """ the pending counts of the local counters in a thread, by key """
+
+    def __init__(self):
+        self.pending = {}
+        self.increments = 0
+        self.folded_at = time.monotonic()
+        self.pid = os.getpid()
+
+
+_local_counts = _LocalCounts()
+
+
+def fold_local_counts():
+    """ adds the pending counts of the local counters in this thread to the process' values """
+    counts = _local_counts
+    pending, counts.pending = counts.pending, {}
+    counts.increments = 0
+    counts.folded_at = time.monotonic()
+    if counts.pid != os.getpid():
+        # counted by the parent before the fork, which folds them itself
+        counts.pid = os.getpid()
+        return
+    values = _get_values()
+    if values is not None:
+        for key, amount in pending.items():
+            values.inc(key, amount)
+
+
+class LocalCounter:
+    """ a counter with fixed labels counted in each thread, see the module docstring """
+    __slots__ = ('key', )
+
+    def __init__(self, key):
+        self.key = key
+
+    def inc(self, amount=1):
+        counts = _local_counts
+        counts.pending[self.key] = counts.pending.get(self.key, 0) + amount
+        counts.increments += 1
+        if (counts.increments >= FOLD_EVERY
+                or time.monotonic() - counts.folded_at >= FOLD_SECONDS):
+            fold_local_counts()
+
+
+class Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def _check_labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                '{0} expects the labels {1}, got {2}'.format(
+                    self.name, ', '.join(self.labelnames), ', '.join(sorted(labels))
+                )
+            )
+        return {name: str(value) for name, value in labels.items()}
+
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        labels = self._check_labels(labels)
+        values = _get_values()
+        if values is not None:
+            values.inc(_get_key(self.name + '_total', labels), amount)
+
+    def local(self, **labels):
+        """ returns a LocalCounter of the given labels """
+        return LocalCounter(_get_key(self.name + '_total', self._check_labels(labels)))
+
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bucket) for bucket in buckets) + (float('inf'), )
+
+    def observe(self, value, **labels):
+        labels = self._check_labels(labels)
+        values = _get_values()
+        if values is None:
+            return
+        # the bucket counts are stored cumulative, as they are exposed
+        for bucket in self.buckets:
+            if value <= bucket:
+                values.inc(_get_key(self.name + '_bucket', dict(labels, le=_format_le(bucket))), 1)
+        values.inc(_get_key(self.name + '_sum', labels), value)
+        values.inc(_get_key(self.name + '_count', labels), 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """ observes the seconds spent in the with block """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def _format_le(bucket):
+    return '+Inf' if bucket == float('inf') else repr(bucket)
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_sample(sample_name, labels, value):
+    if labels:
+        sample_name += '{' + ','.join(
+            '{0}="{1}"'.format(name, _escape(label)) for name, label in labels
+        ) + '}'
+    return '{0} {1}'.format(sample_name, repr(float(value)))
+
+
+def _sample_order(sample):
+    sample_name, labels = sample
+    # numeric bucket order, with +Inf last
+    le = dict(labels).get('le')
+    return (
+        sample_name, [label for label in labels if label[0] != 'le'],
+        float('inf') if le in (None, '+Inf') else float(le)
+    )
+
+
+def collect(metrics_dir):
+    """ returns {(sample name, ((label, value), ...)): value} summed over the metrics files """
+    samples = defaultdict(float)
+    for path in glob.glob(os.path.join(metrics_dir, FILE_PATTERN)):
+        with open(path, 'rb') as metrics_file:
+            data = metrics_file.read()
+        if len(data) < HEADER_SIZE:
+            continue
+        for key, position in _iter_entries(data):
+            sample_name, labels = json.loads(key)
+            samples[(sample_name, tuple(tuple(label) for label in labels))] += struct.unpack_from(
+                'd', data, position
+            )[0]
+    return samples
+
+
+def merge_exited_files(metrics_dir):
+    """
+    adds the values of the files of the processes that exited to the merged file and deletes
+    them, returns the number of merged files
+    """
+    merged_path = os.path.join(metrics_dir, MERGED_FILE)
+    merged = None
+    count = 0
+    with open(os.path.join(metrics_dir, MERGE_LOCK_FILE), 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        for path in glob.glob(os.path.join(metrics_dir, FILE_PATTERN)):
+            if path == merged_path:
+                continue
+            with open(path, 'rb') as metrics_file:
+                try:
+                    fcntl.flock(metrics_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # the process is running
+                    continue
+                data = metrics_file.read()
+                if merged is None:
+                    merged = MmapValues(merged_path)
+                if len(data) >= HEADER_SIZE:
+                    for key, position in _iter_entries(data):
+                        merged.inc(key, struct.unpack_from('d', data, position)[0])
+                os.remove(path)
+            count += 1
+    if merged is not None:
+        merged.close()
+    return count
+
+
+def reset_metrics_dir(metrics_dir):
+    """ deletes the metrics files, the values start again from zero, returns the number deleted """
+    paths = glob.glob(os.path.join(metrics_dir, FILE_PATTERN))
+    for path in paths:
+        os.remove(path)
+    return len(paths)
+
+
+def get_exposition(metrics_dir):
+    """ returns the registered metrics in the Prometheus text format """
+    samples_by_metric = defaultdict(list)
+    for (sample_name, labels), value in collect(metrics_dir).items():
+        metric_name = sample_name
+        for suffix in ('_total', '_bucket', '_sum', '_count'):
+            if sample_name.endswith(suffix) and sample_name[:-len(suffix)] in REGISTRY:
+                metric_name = sample_name[:-len(suffix)]
+        samples_by_metric[metric_name].append(((sample_name, labels), value))
+
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append('# HELP {0} {1}'.format(name, metric.documentation))
+        lines.append('# TYPE {0} {1}'.format(name, metric.metric_type))
+        for sample, value in sorted(
+            samples_by_metric[name], key=lambda item: _sample_order(item[0])
+        ):
+            lines.append(_format_sample(sample[0], sample[1], value))
+    return '\n'.join(lines) + '\n'
+
+
+WIZARD_STEP_SECONDS = Histogram(
+    'inquiry_wizard_step_seconds', 'Inquiry wizard request latency by step and method.',
+    ['step', 'method']
+)
+VETTING_OUTCOMES = Counter(
+    'inquiry_vetting_outcomes', 'First step vetting decisions by outcome key.', ['outcome']
+)
+FORECAST_LOOKUPS = Counter(
+    'inquiry_forecast_lookups',
+    'Zip code forecast lookups by result, a miss being a zip code without forecast data.',
+    ['result']
+)
+SIDE_EFFECT_SECONDS = Histogram(
+    'inquiry_side_effect_seconds', 'Segment event and email dispatch latency by side effect.',
+    ['side_effect']
+)
+SIDE_EFFECT_FAILURES = Counter(
+    'inquiry_side_effect_failures',
+    'Side effects not done by side effect and reason (error, timeout or open circuit).',
+    ['side_effect', 'reason']
+)
+DONE_FAILURES = Counter(
+    'inquiry_done_failures', 'Failed final wizard submissions by stage.', ['stage']
+)
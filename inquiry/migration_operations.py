@@ -0,0 +1,64 @@
+"""
+Migration operations for indexes on the live inquiry tables.
+
+A plain CREATE INDEX, as run by AddIndex and by AddField or AlterField with db_index=True, locks
+the table against writes until the index is built. CreateIndexConcurrently builds it with
+CREATE INDEX CONCURRENTLY on PostgreSQL instead, which can't run in a transaction, so migrations
+using it must set atomic = False. It only changes the database, wrap it in
+SeparateDatabaseAndState with the AddIndex or AlterField of the model state.
+"""
+from django.db.migrations.operations.base import Operation
+
+
+class CreateIndexConcurrently(Operation):
+    reduces_to_sql = True
+    reversible = True
+
+    def __init__(self, model_name, name, fields):
+        self.model_name = model_name
+        self.name = name
+        self.fields = fields
+
+    def deconstruct(self):
+        return (
+            self.__class__.__name__, [], {
+                'model_name': self.model_name,
+                'name': self.name,
+                'fields': self.fields,
+            }
+        )
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def _execute(self, sql, app_label, schema_editor, state):
+        model = state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        quote_name = schema_editor.quote_name
+        concurrently = ' CONCURRENTLY' if schema_editor.connection.vendor == 'postgresql' else ''
+        schema_editor.execute(
+            sql.format(
+                concurrently=concurrently,
+                name=quote_name(self.name),
+                table=quote_name(model._meta.db_table),
+                columns=', '.join(
+                    quote_name(model._meta.get_field(field).column) for field in self.fields
+                ),
+            )
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._execute(
+            'CREATE INDEX{concurrently} IF NOT EXISTS {name} ON {table} ({columns})', app_label,
+            schema_editor, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._execute('DROP INDEX{concurrently} IF EXISTS {name}', app_label, schema_editor,
+                      from_state)
+
+    def describe(self):
+        return 'Create index {0} on {1} of {2} concurrently'.format(
+            self.name, ', '.join(self.fields), self.model_name
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 2.0.2 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0001_initial'),
+        ('inquiry', '0006_remove_inquiry_investment_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquirySubmission',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=36, unique=True)),
+                ('client', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='custom_auth.Client')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.0.2 on 2026-10-19 12:30
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inquiry', '0007_inquirysubmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquiryRejection',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('state', models.CharField(max_length=2)),
+                ('zip_code', models.CharField(max_length=10)),
+                ('outcome_key', models.CharField(db_index=True, max_length=30)),
+                ('forecast_value', models.FloatField(blank=True, null=True)),
+                ('forecast_version', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='forecast_value',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='forecast_version',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='outcome_key',
+            field=models.CharField(blank=True, max_length=30, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.0.2 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Adds the geography columns as nullable, which doesn't rewrite the table. Their indexes are
+    built concurrently by 0013_inquiry_geography_indexes. Existing rows are filled in batches by
+    the backfill_inquiry_geography command instead of in this migration, so that it doesn't lock
+    the whole table while it updates every row.
+    """
+
+    dependencies = [
+        ('inquiry', '0008_vetting_outcome'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inquiry',
+            name='state',
+            field=models.CharField(blank=True, max_length=2, null=True),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='zip5',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.0.2 on 2026-10-19 13:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inquiry', '0009_inquiry_geography'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inquiry',
+            name='address_fingerprint',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='name_fingerprint',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='inquiry',
+            name='possible_duplicate_of',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='possible_duplicates', to='inquiry.Inquiry'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.0.2 on 2026-10-19 14:00
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inquiry', '0010_inquiry_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=60, unique=True)),
+                ('last_modified_at', models.DateTimeField(null=True)),
+                ('last_id', models.UUIDField(null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.0.2 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inquiry', '0011_export_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InquiryFunnelCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('step', models.CharField(max_length=20)),
+                ('outcome', models.CharField(max_length=30)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='inquiryfunnelcounter',
+            unique_together={('day', 'step', 'outcome')},
+        ),
+    ]
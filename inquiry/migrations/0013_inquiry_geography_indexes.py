@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+from inquiry.migration_operations import CreateIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    """ Builds the indexes of the geography columns without locking the table against writes """
+
+    atomic = False
+
+    dependencies = [
+        ('inquiry', '0012_inquiryfunnelcounter'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                CreateIndexConcurrently('inquiry', 'inquiry_zip5_idx', ['zip5']),
+                CreateIndexConcurrently('inquiry', 'inquiry_state_zip5_idx', ['state', 'zip5']),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='inquiry',
+                    name='zip5',
+                    field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+                ),
+                migrations.AddIndex(
+                    model_name='inquiry',
+                    index=models.Index(fields=['state', 'zip5'], name='inquiry_state_zip5_idx'),
+                ),
+            ],
+        ),
+    ]
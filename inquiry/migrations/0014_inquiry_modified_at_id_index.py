@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+from inquiry.migration_operations import CreateIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    """ Builds the keyset index of the incremental export without locking the table """
+
+    atomic = False
+
+    dependencies = [
+        ('inquiry', '0013_inquiry_geography_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                CreateIndexConcurrently(
+                    'inquiry', 'inquiry_modified_at_id_idx', ['modified_at', 'id']
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='inquiry',
+                    index=models.Index(
+                        fields=['modified_at', 'id'], name='inquiry_modified_at_id_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from inquiry.migration_operations import CreateIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    """ Builds the indexes of the duplicate columns without locking the table against writes """
+
+    atomic = False
+
+    dependencies = [
+        ('inquiry', '0014_inquiry_modified_at_id_index'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                CreateIndexConcurrently(
+                    'inquiry', 'inquiry_address_fingerprint_idx', ['address_fingerprint']
+                ),
+                CreateIndexConcurrently(
+                    'inquiry', 'inquiry_name_fingerprint_idx', ['name_fingerprint']
+                ),
+                CreateIndexConcurrently(
+                    'inquiry', 'inquiry_possible_duplicate_of_idx', ['possible_duplicate_of']
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='inquiry',
+                    name='address_fingerprint',
+                    field=models.CharField(blank=True, db_index=True, max_length=40, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='inquiry',
+                    name='name_fingerprint',
+                    field=models.CharField(blank=True, db_index=True, max_length=40, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='inquiry',
+                    name='possible_duplicate_of',
+                    field=models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='possible_duplicates',
+                        to='inquiry.Inquiry'
+                    ),
+                ),
+            ],
+        ),
+    ]
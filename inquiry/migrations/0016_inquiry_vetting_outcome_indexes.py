@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+from inquiry.migration_operations import CreateIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    """ Builds the indexes of the vetting outcome columns without locking the table """
+
+    atomic = False
+
+    dependencies = [
+        ('inquiry', '0015_inquiry_fingerprint_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                CreateIndexConcurrently('inquiry', 'inquiry_outcome_key_idx', ['outcome_key']),
+                CreateIndexConcurrently(
+                    'inquiry', 'inquiry_forecast_version_idx', ['forecast_version']
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='inquiry',
+                    name='outcome_key',
+                    field=models.CharField(blank=True, db_index=True, max_length=30, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='inquiry',
+                    name='forecast_version',
+                    field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+                ),
+            ],
+        ),
+    ]
@@ -1,17 +1,46 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.forms.models import model_to_dict
+from django.utils import timezone
 
 from core.utils import model_to_dict_verbose
 from core.models import TimestampedModel, Address, UUIDModel, UseCaseModel, WhenInterestedModel
 from core.pricing import MIN_HOME_VALUE, MAX_HOME_VALUE
 from custom_auth.models import Client
-from .utils import send_new_inquiry_email
+from . import columnar
+from .fingerprints import get_address_fingerprint, get_name_fingerprint
+from .side_effects import run_side_effect
+from .utils import get_geography, send_new_inquiry_email
+
+
+class InquiryQuerySet(models.QuerySet):
+    def to_arrays(self, fields=columnar.DEFAULT_FIELDS, chunk_size=columnar.DEFAULT_CHUNK_SIZE):
+        """ returns the given fields of the inquiries as numpy arrays, see inquiry.columnar """
+        return columnar.to_arrays(self, fields, chunk_size)
+
+    def to_dataframe(self, fields=columnar.DEFAULT_FIELDS, chunk_size=columnar.DEFAULT_CHUNK_SIZE):
+        """ returns the given fields of the inquiries as a dataframe, see inquiry.columnar """
+        return columnar.to_dataframe(self, fields, chunk_size)
+
+    def update_without_save(self, **fields):
+        """
+        updates the given fields of the inquiries with update() rather than Inquiry.save(), which
+        would notify the reviewers again, and sets modified_at so that the incremental export
+        picks up the change, returns the number of updated inquiries
+        """
+        return self.update(modified_at=timezone.now(), **fields)
 
 
 class Inquiry(UseCaseModel, UUIDModel, WhenInterestedModel, TimestampedModel):
     class Meta:
         verbose_name_plural = 'inquiries'
+        indexes = [
+            models.Index(fields=['state', 'zip5'], name='inquiry_state_zip5_idx'),
+            # keyset pagination of the incremental export, see inquiry.export
+            models.Index(fields=['modified_at', 'id'], name='inquiry_modified_at_id_idx'),
+        ]
+
+    objects = InquiryQuerySet.as_manager()
 
     # META DATA
     client = models.OneToOneField(Client, on_delete=models.CASCADE, related_name='inquiry')
@@ -60,15 +89,72 @@ class Inquiry(UseCaseModel, UUIDModel, WhenInterestedModel, TimestampedModel):
 
     notes = models.CharField(max_length=1000, blank=True)
 
+    # GEOGRAPHY DATA
+    # copied from the address by sync_geography() so that reports don't need to join to it, null
+    # until filled by the backfill_inquiry_geography command for inquiries saved before
+    state = models.CharField(max_length=2, null=True, blank=True)
+    zip5 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+
+    # DUPLICATE DATA
+    # fingerprints of the normalized address and name computed by sync_fingerprints(), null until
+    # filled by the cluster_duplicate_inquiries command for inquiries saved before
+    address_fingerprint = models.CharField(max_length=40, null=True, blank=True, db_index=True)
+    name_fingerprint = models.CharField(max_length=40, null=True, blank=True, db_index=True)
+    # earliest inquiry with the same address or name fingerprint when this one was created
+    possible_duplicate_of = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.SET_NULL, related_name='possible_duplicates'
+    )
+
+    # VETTING DATA
+    # recorded when the first step is vetted, null for inquiries submitted before they were
+    outcome_key = models.CharField(max_length=30, null=True, blank=True, db_index=True)
+    forecast_value = models.FloatField(null=True, blank=True)
+    forecast_version = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
     def __str__(self):
         return "Inquiry submission by {0} {1} for {2}".format(
             self.first_name, self.last_name, self.address
         )
 
+    def sync_geography(self):
+        """ copies the state and 5 digit zip code of the address """
+        if self.address is None:
+            self.state, self.zip5 = (None, None)
+        else:
+            self.state, self.zip5 = get_geography(self.address.state, self.address.zip_code)
+
+    def sync_fingerprints(self):
+        """ computes the address and name fingerprints, see inquiry.fingerprints """
+        address = self.address
+        if address is None:
+            self.address_fingerprint, self.name_fingerprint = (None, None)
+            return
+        self.address_fingerprint = get_address_fingerprint(
+            address.street, address.unit, address.city, address.state, address.zip_code
+        )
+        self.name_fingerprint = get_name_fingerprint(
+            self.first_name, self.last_name, address.zip_code
+        )
+
+    def find_possible_duplicate(self):
+        """ returns the earliest other inquiry with the same address or name fingerprint or None """
+        duplicate_filter = models.Q()
+        if self.address_fingerprint:
+            duplicate_filter |= models.Q(address_fingerprint=self.address_fingerprint)
+        if self.name_fingerprint:
+            duplicate_filter |= models.Q(name_fingerprint=self.name_fingerprint)
+        if not duplicate_filter:
+            return None
+        return Inquiry.objects.filter(duplicate_filter).exclude(pk=self.pk).order_by(
+            'created_at'
+        ).first()
+
     def save(self, *args, **kwargs):
+        self.sync_geography()
+        self.sync_fingerprints()
         super().save(*args, **kwargs)
         # notify staff that there is a new Inquiry
-        send_new_inquiry_email(self.first_name, self.last_name)
+        run_side_effect(send_new_inquiry_email, self.first_name, self.last_name)
 
     @property
     def full_name_short(self):
@@ -81,3 +167,61 @@ class Inquiry(UseCaseModel, UUIDModel, WhenInterestedModel, TimestampedModel):
     @property
     def as_dict_verbose(self):
         return model_to_dict_verbose(self)
+
+
+class InquirySubmission(UUIDModel, TimestampedModel):
+    """
+    The final submission of an inquiry wizard session. The unique key is generated once per wizard
+    session, so a double-clicked or retried final POST can't create a second client and inquiry.
+    client is set once the submission is complete.
+    """
+    key = models.CharField(max_length=36, unique=True)
+    client = models.ForeignKey(Client, null=True, on_delete=models.CASCADE)
+
+    def __str__(self):
+        return "Inquiry submission {0}".format(self.key)
+
+
+class InquiryRejection(UUIDModel, TimestampedModel):
+    """
+    The vetting outcome of a first wizard step that was rejected, recorded the same way as on an
+    Inquiry so that rejections can be reported on without vetting the addresses again
+    """
+    state = models.CharField(max_length=2)
+    zip_code = models.CharField(max_length=10)
+    outcome_key = models.CharField(max_length=30, db_index=True)
+    forecast_value = models.FloatField(null=True, blank=True)
+    forecast_version = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return "Inquiry rejection {0} for {1} {2}".format(
+            self.outcome_key, self.state, self.zip_code
+        )
+
+
+class ExportWatermark(UUIDModel, TimestampedModel):
+    """
+    The position an incremental export of inquiries reached: the (modified_at, id) of the last
+    exported inquiry
+    """
+    name = models.CharField(max_length=60, unique=True)
+    last_modified_at = models.DateTimeField(null=True)
+    last_id = models.UUIDField(null=True)
+
+    def __str__(self):
+        return "Export watermark {0} at {1}".format(self.name, self.last_modified_at)
+
+
+class InquiryFunnelCounter(models.Model):
+    """ The number of funnel events of a wizard step and outcome on a day, see inquiry.funnel """
+
+    class Meta:
+        unique_together = ('day', 'step', 'outcome')
+
+    day = models.DateField()
+    step = models.CharField(max_length=20)
+    outcome = models.CharField(max_length=30)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return "{0} {1} {2}: {3}".format(self.day, self.step, self.outcome, self.count)
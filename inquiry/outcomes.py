@@ -8,7 +8,7 @@ https://docs.google.com/spreadsheets/d/1rF7kAiadlgMiBuRFug3vUWGJzENqWz91CA_z_Oq1
 import logging as logging_
 
 from core.utils import EXPANSION_STATES, OTHER_STATES
-from inquiry.utils import undesirable_zip_code
+from inquiry.utils import get_vetting_snapshot, undesirable_zip_code
 
 logger = logging_.getLogger(__name__)
 
@@ -24,6 +24,9 @@ INQUIRY_OUTCOME_SLUG_MAP = {
     "3_undesirable_zip_code": "ruzc",
 }
 
+# outcome key recorded for inquiries that passed vetting
+PASSED_OUTCOME_KEY = "passed"
+
 # Map of outcome slugs to outcome context for template
 INQUIRY_OUTCOME_CONTEXTS = {
     "rros": {
@@ -51,14 +54,17 @@ def get_state_outcome_key(state):
     return None
 
 
-def get_zip_code_outcome_key(zip_code):
-    """ returns the rejection outcome key corresponding to the given zip code or None """
-    if undesirable_zip_code(zip_code):
+def get_zip_code_outcome_key(zip_code, snapshot=None):
+    """
+    returns the rejection outcome key corresponding to the given zip code or None, looked up in
+    the given forecast snapshot, the current one by default
+    """
+    if undesirable_zip_code(zip_code, snapshot):
         return '3_undesirable_zip_code'
     return None
 
 
-def get_state_zip_code_outcome_key(state, zip_code):
+def get_state_zip_code_outcome_key(state, zip_code, snapshot=None):
     """
     returns the rejection outcome key corresponding to a non-operational state, or if it's an
     operational state, the rejection outcome key corresponding to an undesirable zip code
@@ -66,7 +72,42 @@ def get_state_zip_code_outcome_key(state, zip_code):
     outcome_key = get_state_outcome_key(state)
     if outcome_key is None:
         # state is operational -- check the zip code
-        outcome_key = get_zip_code_outcome_key(zip_code)
+        outcome_key = get_zip_code_outcome_key(zip_code, snapshot)
+    return _get_outcome_key_and_message(outcome_key)
+
+
+def get_state_zip_code_outcome_keys(states_zip_codes, snapshot=None):
+    """
+    returns the get_state_zip_code_outcome_key() result of each of the given (state, zip code)
+    pairs, vetting all of the zip codes against the same forecast snapshot, the current one unless
+    a snapshot from inquiry.utils.get_vetting_snapshot() is given
+    """
+    if snapshot is None:
+        snapshot = get_vetting_snapshot()
+    return [
+        get_state_zip_code_outcome_key(state, zip_code, snapshot)
+        for state, zip_code in states_zip_codes
+    ]
+
+
+def _get_outcome_key_and_message(outcome_key):
+    """ returns the outcome key and its vetted message or (None, '') if there is no outcome """
     if outcome_key is not None:
         return (outcome_key, 'rejected ' + ' '.join(outcome_key.split('_')[1:]))
     return (None, '')
+
+
+def get_vetting_record(state, zip_code, outcome_key, snapshot=None):
+    """
+    returns the fields recording the given vetting outcome of the state and zip code on an
+    Inquiry or InquiryRejection: the outcome key, the forecast value of the zip code and the
+    version of the forecast it was vetted against, pass the snapshot the outcome was vetted
+    against, the current one by default
+    """
+    if snapshot is None:
+        snapshot = get_vetting_snapshot()
+    return {
+        'outcome_key': outcome_key or PASSED_OUTCOME_KEY,
+        'forecast_value': snapshot.get_value(zip_code),
+        'forecast_version': snapshot.version,
+    }
@@ -0,0 +1,72 @@
+"""
+Fork-friendly preloading of the inquiry app.
+
+gunicorn --preload loads the application in the master process and forks the workers from it, so
+memory allocated before the fork is shared copy-on-write. Python objects don't stay shared for
+long: every reference count update and garbage collection pass writes to the page holding the
+object, and the worker gets a private copy of the page.
+
+With settings.INQUIRY_PRELOAD enabled, preload() runs when the app is ready. It replaces the
+cleaned forecast of the lookups with a compact copy, only the zip code and forecast columns held
+in contiguous numeric numpy arrays whose buffers hold no Python objects, builds the forecast
+snapshot the lookups read from it, and imports the inquiry module graph so that the workers don't
+each import it. The forecast loaded by the settings is left as is and no longer read.
+
+Under a preforking server it also freezes the objects allocated so far out of the garbage
+collector (gc.freeze(), Python 3.7+) so that collections in the workers don't touch them. Frozen
+objects are never collected, so it isn't done in processes that don't fork workers, e.g.
+management commands or the development server.
+"""
+import gc
+import importlib
+import os
+
+from django.conf import settings
+
+from inquiry.utils import (
+    get_zip_code_forecast, get_zip_code_forecast_snapshot, replace_zip_code_forecast
+)
+
+PRELOADED_MODULES = (
+    'inquiry.forms',
+    'inquiry.outcomes',
+    'inquiry.views',
+    'inquiry.urls',
+    'inquiry.templatetags.inquiry_assets',
+)
+# SERVER_SOFTWARE prefixes of the servers that fork their workers from the process loading the app,
+# the gunicorn arbiter sets it before loading the app with --preload
+PREFORKING_SERVERS = ('gunicorn/', )
+
+
+def compact_zip_code_forecast(clean):
+    """
+    returns a consolidated copy of the cleaned forecast with only the columns of the lookups, the
+    zip codes downcast to int32
+
+    the forecast values stay float64, they are recorded on the inquiries and compared with the
+    risk value
+    """
+    compact = clean[[settings.ZIP_CODE_COL, settings.ZIP_FORECAST_COL]].copy()
+    compact[settings.ZIP_CODE_COL] = compact[settings.ZIP_CODE_COL].astype('int32')
+    return compact
+
+
+def is_preforking_server():
+    """ returns True if the app is loaded by a server that forks its workers afterwards """
+    return os.environ.get('SERVER_SOFTWARE', '').startswith(PREFORKING_SERVERS)
+
+
+def preload():
+    """ prepares the inquiry app to be shared by forked workers, see the module docstring """
+    clean = get_zip_code_forecast()
+    if clean is not None:
+        replace_zip_code_forecast(compact_zip_code_forecast(clean))
+        # the lookups read the snapshot, build it before the fork instead of once per worker
+        get_zip_code_forecast_snapshot()
+    for module in PRELOADED_MODULES:
+        importlib.import_module(module)
+    if is_preforking_server() and hasattr(gc, 'freeze'):
+        # release the replaced forecast and any garbage before freezing what remains
+        gc.collect()
+        gc.freeze()
@@ -0,0 +1,89 @@
+"""
+Opt-in profiling of inquiry wizard requests.
+
+With settings.INQUIRY_PROFILE_DIR set, a wizard request runs under cProfile when it is sent by a
+staff user with the X-Inquiry-Profile header, or at random for settings.INQUIRY_PROFILE_SAMPLE_RATE
+(0 to 1, 0 by default) of the requests. The profile is saved to the directory named after the
+step, the method and the duration of the request, so that the slowest requests can be found
+without opening the profiles, see the show_inquiry_profiles command.
+"""
+import cProfile
+import glob
+import os
+import pstats
+import random
+import re
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+PROFILE_HEADER = 'HTTP_X_INQUIRY_PROFILE'
+PROFILE_NAME_RE = re.compile(
+    r'^(?P<step>[\w-]+)-(?P<method>[A-Z]+)-(?P<ms>\d+)ms-(?P<timestamp>\d+)-\d+\.prof$'
+)
+
+Profile = namedtuple('Profile', ['path', 'step', 'method', 'ms', 'timestamp'])
+
+
+def get_profile_dir():
+    return getattr(settings, 'INQUIRY_PROFILE_DIR', None)
+
+
+def should_profile(request):
+    """ returns True if the request should run under the profiler """
+    if not get_profile_dir():
+        return False
+    if request.META.get(PROFILE_HEADER) and request.user.is_staff:
+        return True
+    sample_rate = getattr(settings, 'INQUIRY_PROFILE_SAMPLE_RATE', 0)
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def profile_request(step, method, func, *args, **kwargs):
+    """ returns the response of func called under the profiler, saving the profile """
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        response = func(*args, **kwargs)
+        # include the rendering of the template responses
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+    finally:
+        profiler.disable()
+        ms = int((time.perf_counter() - started) * 1000)
+        profile_dir = get_profile_dir()
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(
+            os.path.join(
+                profile_dir, '{0}-{1}-{2}ms-{3}-{4}.prof'.format(
+                    step, method, ms, int(time.time()), os.getpid()
+                )
+            )
+        )
+    return response
+
+
+def get_profiles(profile_dir, step=None):
+    """ returns the saved profiles, optionally of a single step, slowest first """
+    profiles = []
+    for path in glob.glob(os.path.join(profile_dir, '*.prof')):
+        match = PROFILE_NAME_RE.match(os.path.basename(path))
+        if match is None or (step is not None and match.group('step') != step):
+            continue
+        profiles.append(
+            Profile(
+                path, match.group('step'), match.group('method'), int(match.group('ms')),
+                int(match.group('timestamp'))
+            )
+        )
+    return sorted(profiles, key=lambda profile: profile.ms, reverse=True)
+
+
+def aggregate_profiles(profiles, stream=None):
+    """ returns the pstats.Stats of the given profiles combined """
+    stats = pstats.Stats(profiles[0].path, stream=stream)
+    for profile in profiles[1:]:
+        stats.add(profile.path)
+    return stats
@@ -0,0 +1,93 @@
+"""
+Query budgets of the inquiry views.
+
+query_budget() wraps a view so that the queries it runs on the default database connection,
+including while rendering its template response, are counted along with the repeated ones (the
+same SQL with the same parameters, typically a related object fetched in a loop). A request over
+the budget of its view is logged, or raises QueryBudgetExceeded with
+settings.INQUIRY_QUERY_BUDGET_RAISE, which test settings should enable. The budgets can be
+overridden by name in settings.INQUIRY_QUERY_BUDGETS.
+"""
+import functools
+import logging as logging_
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging_.getLogger('portals.apps.' + __name__)
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """ a database execute wrapper counting the queries and the repeated ones """
+
+    def __init__(self):
+        self.count = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        self.statements[(sql, repr(params))] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values())
+
+    def get_most_repeated(self):
+        """ returns the SQL of the most repeated query and its count or None """
+        if not self.statements:
+            return None
+        (sql, _), count = self.statements.most_common(1)[0]
+        return (sql, count) if count > 1 else None
+
+
+def get_budget(name, default):
+    return getattr(settings, 'INQUIRY_QUERY_BUDGETS', {}).get(name, default)
+
+
+def _check_budget(name, budget, counter):
+    if budget is None or counter.count <= budget:
+        return
+    message = '{0} ran {1} queries over its budget of {2}, {3} repeated'.format(
+        name, counter.count, budget, counter.duplicates
+    )
+    most_repeated = counter.get_most_repeated()
+    if most_repeated is not None:
+        message += ', {1} times: {0}'.format(*most_repeated)
+    if getattr(settings, 'INQUIRY_QUERY_BUDGET_RAISE', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def query_budget(budget, name=None):
+    """
+    returns a decorator of views enforcing the given number of queries per request, name being
+    the key of the budget in settings.INQUIRY_QUERY_BUDGETS, the view name by default
+    """
+
+    def decorator(view):
+        budget_name = name or view.__name__
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = view(request, *args, **kwargs)
+                # count the queries of the template as well
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+            if getattr(settings, 'INQUIRY_QUERY_COUNT_HEADER', False):
+                response[QUERY_COUNT_HEADER] = str(counter.count)
+            _check_budget(budget_name, get_budget(budget_name, budget), counter)
+            return response
+
+        return wrapper
+
+    return decorator
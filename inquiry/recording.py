@@ -0,0 +1,222 @@
+"""
+Recording and replay of anonymized inquiry wizard traffic.
+
+With settings.INQUIRY_RECORDING_DIR set, record_wizard_requests() appends a JSON line per wizard
+request to a file of the process in that directory: an anonymous id of the wizard session, the
+time, the method and step, the shape of the posted fields, the status and redirect location of
+the response, its duration and its number of queries. Posted values are only kept for the
+navigation fields and the fields with a small set of values (states, zip codes, choices and
+checkboxes); passwords are not recorded at all, emails and phone numbers are replaced by
+placeholders and other values by a mask keeping their length and character classes, e.g.
+'~99 Aaaa Aa' for '20 Main St'.
+
+replay_sessions() sends the recorded sessions again to a server, with values of the same shapes
+and a fixed password, and returns the duration and query count (from the X-Query-Count header,
+see inquiry.query_budget) of each replayed request.
+"""
+import functools
+import glob
+import json
+import logging as logging_
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+
+from django.conf import settings
+from django.db import connection
+
+from inquiry.loadtest import Applicant
+from inquiry.query_budget import QUERY_COUNT_HEADER, QueryCounter
+
+logger = logging_.getLogger('portals.apps.' + __name__)
+
+RECORDING_SESSION_KEY = 'inquiry_recording_session'
+FILE_PATTERN = 'wizard-*.jsonl'
+# fields whose values are recorded as is, with the checkboxes ('on')
+KEPT_FIELDS = {
+    'inquiry_apply_wizard-current_step',
+    'wizard_goto_step',
+    'submit',
+    'first-state',
+    'first-zip_code',
+    'home-property_type',
+    'home-rent_type',
+    'home-primary_residence',
+    'home-ten_year_duration_prediction',
+    'homeowner-when_interested',
+}
+PASSWORD_FIELDS = ('signup-password1', 'signup-password2')
+# not even their masks, which would give away the length and character classes of passwords
+DROPPED_FIELDS = {'csrfmiddlewaretoken'} | set(PASSWORD_FIELDS)
+EMAIL_FIELDS = {'first-email', 'signup-email'}
+EMAIL_PLACEHOLDER = '@email'
+PHONE_FIELDS = {'signup-phone_number'}
+PHONE_PLACEHOLDER = '@phone'
+# a valid phone number for the replayed phone numbers, whose masks would rarely be valid
+REPLAY_PHONE_NUMBER = '617-399-0604'
+# a valid password for the signup step, whose passwords aren't recorded
+REPLAY_PASSWORD = 'replaypassword1'
+PASSWORD_STEP = 'signup'
+MASK_PREFIX = '~'
+
+_file_lock = threading.Lock()
+
+
+def mask_value(value):
+    """ returns the mask of a value, letters as a or A and digits as 9 """
+    return MASK_PREFIX + ''.join(
+        '9' if char.isdigit() else ('A' if char.isupper() else 'a') if char.isalpha() else char
+        for char in value
+    )
+
+
+def unmask_value(value, email):
+    """ returns a value of the shape of the recorded value, the given email for emails """
+    if value == EMAIL_PLACEHOLDER:
+        return email
+    if value == PHONE_PLACEHOLDER:
+        return REPLAY_PHONE_NUMBER
+    if not value.startswith(MASK_PREFIX):
+        return value
+    return value[len(MASK_PREFIX):].replace('a', 'x').replace('A', 'X').replace('9', '5')
+
+
+def anonymize_fields(post_data):
+    """ returns {field: [anonymized values]} of the posted data """
+    fields = OrderedDict()
+    for name, values in sorted(post_data.lists()):
+        if name in DROPPED_FIELDS:
+            continue
+        if name in KEPT_FIELDS:
+            fields[name] = values
+        elif name in EMAIL_FIELDS:
+            fields[name] = [EMAIL_PLACEHOLDER if '@' in value else mask_value(value)
+                            for value in values]
+        elif name in PHONE_FIELDS:
+            fields[name] = [PHONE_PLACEHOLDER if sum(char.isdigit() for char in value) >= 10
+                            else mask_value(value) for value in values]
+        else:
+            fields[name] = [value if value == 'on' else mask_value(value) for value in values]
+    return fields
+
+
+def _get_location(response):
+    location = response.get('Location', '')
+    if location and not location.startswith('/'):
+        return 'external'
+    return location.split('?')[0]
+
+
+def _write_record(record):
+    recording_dir = settings.INQUIRY_RECORDING_DIR
+    path = os.path.join(recording_dir, 'wizard-{0}.jsonl'.format(os.getpid()))
+    with _file_lock:
+        os.makedirs(recording_dir, exist_ok=True)
+        with open(path, 'a') as recording_file:
+            recording_file.write(json.dumps(record) + '\n')
+
+
+def record_wizard_requests(view):
+    """ returns the wizard view recording its requests when the recording is enabled """
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not getattr(settings, 'INQUIRY_RECORDING_DIR', None):
+            return view(request, *args, **kwargs)
+        session_id = request.session.get(RECORDING_SESSION_KEY)
+        if session_id is None:
+            session_id = request.session[RECORDING_SESSION_KEY] = uuid.uuid4().hex
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        try:
+            _write_record({
+                'session': session_id,
+                'time': round(time.time(), 3),
+                'method': request.method,
+                'step': kwargs.get('step', ''),
+                'fields': anonymize_fields(request.POST) if request.method == 'POST' else {},
+                'status': response.status_code,
+                'location': _get_location(response),
+                'ms': round((time.perf_counter() - started) * 1000, 1),
+                'queries': counter.count,
+            })
+        except OSError as e:
+            # never fail the request
+            logger.error('Wizard request recording failed {0}'.format(e))
+        return response
+
+    return wrapper
+
+
+def read_sessions(recording_dir):
+    """ returns the lists of recorded requests of the sessions, in order of their first request """
+    records = []
+    for path in glob.glob(os.path.join(recording_dir, FILE_PATTERN)):
+        with open(path) as recording_file:
+            records.extend(json.loads(line) for line in recording_file if line.strip())
+    sessions = OrderedDict()
+    for record in sorted(records, key=lambda record: record['time']):
+        sessions.setdefault(record['session'], []).append(record)
+    return list(sessions.values())
+
+
+def _replay_session(base_url, records, index):
+    """ returns the (method, step, status, ms, query count) of each replayed request """
+    email = 'replay+{0}-{1}@hometap.com'.format(uuid.uuid4().hex[:8], index)
+    applicant = Applicant(base_url, email)
+    # gets the CSRF cookie
+    applicant.request('/inquiry/data/first/')
+    results = []
+    for record in records:
+        path = '/inquiry/data/{0}/'.format(record['step']) if record['step'] else '/inquiry/data/'
+        data = None
+        if record['method'] == 'POST':
+            data = {
+                name: [unmask_value(value, email) for value in values]
+                for name, values in record['fields'].items()
+            }
+            if record['step'] == PASSWORD_STEP:
+                data.update({name: REPLAY_PASSWORD for name in PASSWORD_FIELDS})
+        started = time.perf_counter()
+        try:
+            status = applicant.request(path, data)
+            query_count = applicant.last_headers.get(QUERY_COUNT_HEADER)
+        except (URLError, OSError):
+            status = query_count = None
+        ms = (time.perf_counter() - started) * 1000
+        results.append((
+            record['method'], record['step'], status, ms,
+            None if query_count is None else int(query_count)
+        ))
+    return results
+
+
+def replay_sessions(base_url, sessions, concurrency=1):
+    """ replays the given recorded sessions, returns the results of each session """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(
+            executor.map(
+                lambda item: _replay_session(base_url, item[1], item[0]), enumerate(sessions)
+            )
+        )
+
+
+def summarize_replay(session_results):
+    """ returns {(method, step): {'ms': [...], 'queries': [...], 'statuses': [...]}} """
+    summary = defaultdict(lambda: {'ms': [], 'queries': [], 'statuses': []})
+    for results in session_results:
+        for method, step, status, ms, query_count in results:
+            step_summary = summary[(method, step)]
+            step_summary['ms'].append(ms)
+            step_summary['statuses'].append(status)
+            if query_count is not None:
+                step_summary['queries'].append(query_count)
+    return summary
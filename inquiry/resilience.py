@@ -0,0 +1,293 @@
+"""
+Timeouts, circuit breakers and a local spool for the outbound calls of the side effects.
+
+With settings.INQUIRY_SIDE_EFFECT_TIMEOUT set (seconds), call_with_resilience() runs a side
+effect in a small thread pool and waits for it at most that long. Each side effect has a
+CircuitBreaker: after INQUIRY_CIRCUIT_FAILURE_THRESHOLD consecutive failures, timeouts or calls
+slower than INQUIRY_CIRCUIT_SLOW_CALL seconds, it opens and the side effect fails fast without
+being called, until a trial call is let through INQUIRY_CIRCUIT_RESET_TIMEOUT seconds later.
+
+A side effect that fails, including after timing out, or is rejected by its open breaker is
+appended to a spool file in settings.INQUIRY_SPOOL_DIR, if set, so that the flush_inquiry_spool
+command can call it again once the service is back, through the same timeouts and breakers,
+stopping when a breaker opens. The arguments are spooled as JSON and hold personal data (emails,
+phone numbers, names and addresses): the files are only readable by their owner, they are deleted
+once flushed and calls older than settings.INQUIRY_SPOOL_RETENTION seconds (7 days by default)
+are dropped by the flush instead of being called.
+"""
+import glob
+import json
+import logging as logging_
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+from inquiry.metrics import SIDE_EFFECT_FAILURES
+from inquiry.utils import write_file_atomically
+
+logger = logging_.getLogger('portals.apps.' + __name__)
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_SLOW_CALL = 1.0
+DEFAULT_RESET_TIMEOUT = 30
+DEFAULT_WORKERS = 8
+DEFAULT_SPOOL_RETENTION = 7 * 24 * 3600
+SPOOL_PATTERN = 'spool-*.jsonl'
+# spool files claimed by a flush
+FLUSHING_PATTERN = 'spool-*.flushing'
+# sidecar of a claimed spool file holding the number of its calls done by the flush
+OFFSET_SUFFIX = '.offset'
+# seconds the flush waits for each call without settings.INQUIRY_SIDE_EFFECT_TIMEOUT
+DEFAULT_FLUSH_TIMEOUT = 10.0
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold, slow_call, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """ returns True if a call may go through, a single trial one after the reset timeout """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self, seconds):
+        if seconds > self.slow_call:
+            self.record_failure()
+            return
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning('Circuit of {0} opened'.format(self.name))
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+_spool_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """ returns the circuit breaker of the named side effect """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                getattr(settings, 'INQUIRY_CIRCUIT_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD),
+                getattr(settings, 'INQUIRY_CIRCUIT_SLOW_CALL', DEFAULT_SLOW_CALL),
+                getattr(settings, 'INQUIRY_CIRCUIT_RESET_TIMEOUT', DEFAULT_RESET_TIMEOUT),
+            )
+        return _breakers[name]
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def _get_executor():
+    # the calls that time out keep running here, the breakers keep them from piling up
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'INQUIRY_RESILIENCE_WORKERS', DEFAULT_WORKERS),
+                    thread_name_prefix='inquiry-resilience',
+                )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def get_func_path(func):
+    return '{0}.{1}'.format(func.__module__, func.__qualname__)
+
+
+def _append_to_spool(spool_dir, call):
+    line = json.dumps(call, cls=DjangoJSONEncoder)
+    with _spool_lock:
+        os.makedirs(spool_dir, mode=0o700, exist_ok=True)
+        path = os.path.join(spool_dir, 'spool-{0}.jsonl'.format(os.getpid()))
+        # the calls hold personal data, only the user of the workers may read them
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        with os.fdopen(fd, 'a') as f:
+            f.write(line + '\n')
+
+
+def spool(func, args, kwargs, spool_dir=None, spooled_at=None):
+    """
+    appends the call to the spool of this process, returns False if there's no spool
+
+    spooled_at is the time the call was first spooled, now by default, calls spooled again keep
+    it so that they expire
+    """
+    spool_dir = spool_dir or getattr(settings, 'INQUIRY_SPOOL_DIR', None)
+    if not spool_dir:
+        return False
+    _append_to_spool(
+        spool_dir, {
+            'func': get_func_path(func),
+            'args': args,
+            'kwargs': kwargs,
+            'time': spooled_at or time.time(),
+        }
+    )
+    return True
+
+
+def _spool_or_drop(func, args, kwargs, reason, spool_dir=None, spooled_at=None):
+    SIDE_EFFECT_FAILURES.inc(side_effect=func.__name__, reason=reason)
+    if not spool(func, args, kwargs, spool_dir, spooled_at):
+        logger.warning('Side effect {0} dropped, {1}'.format(func.__name__, reason))
+
+
+def _spool_if_failed(func, args, kwargs, spool_dir, spooled_at):
+    """ returns a callback spooling the call of a timed out future only if it finally fails """
+
+    def callback(future):
+        e = future.exception()
+        if e is not None:
+            logger.error('Timed out side effect {0} failed {1}'.format(func.__name__, e))
+            _spool_or_drop(func, args, kwargs, 'error', spool_dir, spooled_at)
+
+    return callback
+
+
+def call_with_resilience(func, args, kwargs, timeout, spool_dir=None, spooled_at=None):
+    """
+    calls func with a timeout behind its circuit breaker, spooling the call if it fails or is
+    rejected, returns True if the call succeeded
+
+    a call that times out keeps running and is only spooled if it finally fails, spooling it
+    right away would send it twice when it completes. spool_dir and spooled_at are the ones of a
+    spooled call flushed again, see spool().
+    """
+    name = func.__name__
+    breaker = get_breaker(name)
+    if not breaker.allow():
+        _spool_or_drop(func, args, kwargs, 'open', spool_dir, spooled_at)
+        return False
+    started = time.monotonic()
+    future = _get_executor().submit(_call, func, args, kwargs)
+    try:
+        future.result(timeout=timeout)
+        breaker.record_success(time.monotonic() - started)
+        return True
+    except TimeoutError:
+        breaker.record_failure()
+        SIDE_EFFECT_FAILURES.inc(side_effect=name, reason='timeout')
+        # the settings may be overridden by then
+        future.add_done_callback(
+            _spool_if_failed(
+                func, args, kwargs, spool_dir or getattr(settings, 'INQUIRY_SPOOL_DIR', None),
+                spooled_at
+            )
+        )
+    except Exception as e:
+        breaker.record_failure()
+        logger.error('Side effect {0} failed {1}'.format(name, e))
+        _spool_or_drop(func, args, kwargs, 'error', spool_dir, spooled_at)
+    return False
+
+
+def _read_offset(path):
+    """ returns the number of calls of the claimed spool file done by an interrupted flush """
+    try:
+        with open(path + OFFSET_SUFFIX) as f:
+            return int(f.read())
+    except FileNotFoundError:
+        return 0
+
+
+def _claim_spool_files(spool_dir):
+    """ returns the claimed spool files, with the ones left by an interrupted flush """
+    for path in glob.glob(os.path.join(spool_dir, SPOOL_PATTERN)):
+        # the workers start a new file on their next spooled call, the name is unique so that
+        # it doesn't replace a file left by an interrupted flush
+        os.replace(path, '{0}.{1}.flushing'.format(path, uuid.uuid4().hex[:8]))
+    return sorted(glob.glob(os.path.join(spool_dir, FLUSHING_PATTERN)))
+
+
+def flush_spool(spool_dir):
+    """
+    calls the spooled side effects again through call_with_resilience(), the ones that fail again
+    are spooled again and the ones older than the retention are dropped, returns the numbers of
+    succeeded, failed and expired calls
+
+    the flush stops at the first call that leaves its circuit open, the service is still down and
+    the next flush picks the remaining calls up. The number of calls done is written next to the
+    claimed file after each call, so an interrupted flush neither loses nor repeats calls. Flushes
+    must not run concurrently.
+    """
+    retention = getattr(settings, 'INQUIRY_SPOOL_RETENTION', DEFAULT_SPOOL_RETENTION)
+    timeout = getattr(settings, 'INQUIRY_SIDE_EFFECT_TIMEOUT', None) or DEFAULT_FLUSH_TIMEOUT
+    expired_before = time.time() - retention
+    succeeded = failed = expired = 0
+    for path in _claim_spool_files(spool_dir):
+        done = _read_offset(path)
+        with open(path) as f:
+            calls = [json.loads(line) for line in f if line.strip()]
+        for call in calls[done:]:
+            circuit_open = False
+            if call.get('time', 0) < expired_before:
+                logger.warning('Spooled side effect {0} expired'.format(call['func']))
+                expired += 1
+            else:
+                try:
+                    func = import_string(call['func'])
+                except ImportError as e:
+                    logger.error('Spooled side effect {0} failed {1}'.format(call['func'], e))
+                    _append_to_spool(spool_dir, call)
+                    failed += 1
+                else:
+                    if call_with_resilience(
+                        func, call['args'], call['kwargs'], timeout, spool_dir, call.get('time')
+                    ):
+                        succeeded += 1
+                    else:
+                        failed += 1
+                        circuit_open = get_breaker(func.__name__).state == OPEN
+            done += 1
+            write_file_atomically(path + OFFSET_SUFFIX, str(done).encode('utf-8'))
+            if circuit_open:
+                logger.warning('Flush stopped, the circuit of {0} is open'.format(call['func']))
+                return (succeeded, failed, expired)
+        os.remove(path)
+        if os.path.exists(path + OFFSET_SUFFIX):
+            os.remove(path + OFFSET_SUFFIX)
+    return (succeeded, failed, expired)
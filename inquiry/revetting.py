@@ -0,0 +1,123 @@
+"""
+Parallel re-vetting of historical inquiries against the current outcome rules and forecast.
+
+The inquiry UUID space is split into equal ranges (shards). A pool of worker processes evaluates
+get_state_zip_code_outcome_key() semantics over each shard against the forecast snapshot of
+inquiry.utils, created in the parent process so that forked workers share it, and writes the
+result of each shard to a checkpoint directory. Shards that already have a result are skipped,
+so an interrupted run can be resumed by running it again with the same checkpoint directory.
+"""
+import csv
+import json
+import os
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.db import connections
+
+from inquiry.outcomes import PASSED_OUTCOME_KEY, get_state_zip_code_outcome_keys
+from inquiry.utils import get_zip_code_forecast_snapshot, write_file_atomically
+
+PASSED = PASSED_OUTCOME_KEY
+NO_ADDRESS = 'no_address'
+UUID_SPACE = 2**128
+
+
+def get_shards(shard_count):
+    """ returns (index, lowest uuid, uuid upper bound or None) tuples covering the uuid space """
+    shards = []
+    for index in range(shard_count):
+        low = uuid.UUID(int=index * UUID_SPACE // shard_count)
+        high = None
+        if index < shard_count - 1:
+            high = uuid.UUID(int=(index + 1) * UUID_SPACE // shard_count)
+        shards.append((index, low, high))
+    return shards
+
+
+def get_shard_path(checkpoint_dir, index, shard_count):
+    return os.path.join(checkpoint_dir, 'shard-{0:04d}-of-{1:04d}.json'.format(index, shard_count))
+
+
+def _init_worker():
+    # workers started with the spawn method don't inherit the configured apps, setting them up
+    # loads the forecast again
+    if not apps.ready:
+        django.setup()
+
+
+def revet_shard(shard, snapshot=None):
+    """ returns the outcome counts and the rejected inquiries of the given shard """
+    Inquiry = apps.get_model('inquiry', 'Inquiry')
+    index, low, high = shard
+    inquiries = Inquiry.objects.filter(id__gte=low)
+    if high is not None:
+        inquiries = inquiries.filter(id__lt=high)
+    rows = list(inquiries.values_list('id', 'address__state', 'address__zip_code').iterator())
+
+    counts = Counter()
+    with_address = []
+    for row in rows:
+        if row[1] is None:
+            counts[NO_ADDRESS] += 1
+        else:
+            with_address.append(row)
+    rows = with_address
+    outcomes = get_state_zip_code_outcome_keys(
+        ((state, zip_code) for _, state, zip_code in rows), snapshot
+    )
+    rejected = []
+    for (inquiry_id, _, _), (outcome_key, _) in zip(rows, outcomes):
+        counts[outcome_key or PASSED] += 1
+        if outcome_key is not None:
+            rejected.append([str(inquiry_id), outcome_key])
+    return {'shard': index, 'counts': dict(counts), 'rejected': rejected}
+
+
+def revet_inquiries(checkpoint_dir, workers, shard_count, progress=None):
+    """
+    re-vets every inquiry in a pool of worker processes, checkpointing each shard, returns the
+    merged results
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    pending = [
+        shard for shard in get_shards(shard_count)
+        if not os.path.exists(get_shard_path(checkpoint_dir, shard[0], shard_count))
+    ]
+    if pending:
+        # created once here, before the workers are forked
+        get_zip_code_forecast_snapshot()
+        # forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(revet_shard, shard) for shard in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                write_file_atomically(
+                    get_shard_path(checkpoint_dir, result['shard'], shard_count),
+                    json.dumps(result).encode('utf-8')
+                )
+                if progress is not None:
+                    progress(result)
+    return merge_results(checkpoint_dir, shard_count)
+
+
+def merge_results(checkpoint_dir, shard_count):
+    counts = Counter()
+    rejected = []
+    for index in range(shard_count):
+        with open(get_shard_path(checkpoint_dir, index, shard_count)) as checkpoint_file:
+            result = json.load(checkpoint_file)
+        counts.update(result['counts'])
+        rejected.extend(result['rejected'])
+    return {'counts': dict(counts), 'rejected': rejected}
+
+
+def write_rejected_csv(path, rejected):
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['inquiry_id', 'outcome_key'])
+        writer.writerows(rejected)
@@ -0,0 +1,77 @@
+"""
+Dispatch of the I/O-bound side effects of the inquiry views (Segment events and reviewer emails).
+
+With settings.INQUIRY_BACKGROUND_SIDE_EFFECTS enabled, side effects are handed to a per-process
+thread pool so the request thread returns without waiting on the outbound calls, and failed side
+effects are logged without failing the request. Otherwise they run inline, as before, and their
+exceptions propagate to the request.
+
+With settings.INQUIRY_SIDE_EFFECT_TIMEOUT set, side effects also go through the timeouts, circuit
+breakers and spool of inquiry.resilience, so an outage of Segment or email neither slows the
+requests nor loses the calls, and failed side effects don't fail the request in either mode.
+"""
+import logging as logging_
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from inquiry.metrics import SIDE_EFFECT_SECONDS
+from inquiry.resilience import call_with_resilience
+
+logger = logging_.getLogger('portals.apps.' + __name__)
+
+DEFAULT_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """ returns the thread pool of this process, created on first use so each worker has one """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'INQUIRY_SIDE_EFFECT_WORKERS', DEFAULT_WORKERS),
+                    thread_name_prefix='inquiry-side-effects',
+                )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    timeout = getattr(settings, 'INQUIRY_SIDE_EFFECT_TIMEOUT', None)
+    with SIDE_EFFECT_SECONDS.time(side_effect=func.__name__):
+        if timeout is None:
+            func(*args, **kwargs)
+        else:
+            call_with_resilience(func, args, kwargs, timeout)
+
+
+def _run(func, args, kwargs):
+    try:
+        _call(func, args, kwargs)
+    except Exception as e:
+        logger.error('Side effect {0} failed {1}'.format(func.__name__, e))
+    finally:
+        # pool threads outlive requests, so don't leave connections opened by the side effect
+        close_old_connections()
+
+
+def run_side_effect(func, *args, **kwargs):
+    """ calls func with the given arguments, in the background if it is enabled in the settings """
+    if not getattr(settings, 'INQUIRY_BACKGROUND_SIDE_EFFECTS', False):
+        _call(func, args, kwargs)
+        return
+    get_executor().submit(_run, func, args, kwargs)
+
+
+def wait_for_side_effects():
+    """ waits for the queued side effects and shuts the pool down, a new one is created on use """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,48 @@
+from django.db.models import Case, CharField, Value, When
+from django.db.models.signals import post_save
+from django.test.signals import setting_changed
+from django.dispatch import receiver
+
+from core.models import Address
+from inquiry.models import Inquiry
+from inquiry.utils import prepare_zip_code_forecast
+
+
+@receiver(setting_changed)
+def reload_zip_code_forecast(sender, setting, **kwargs):
+    """ cleans the forecast again when a test overrides it """
+    if setting == 'ZIP_CODE_FORECAST':
+        prepare_zip_code_forecast()
+
+
+@receiver(post_save, sender=Address)
+def sync_inquiry_address_data(sender, instance, created, raw=False, **kwargs):
+    """
+    keeps the state, zip5 and fingerprints of the inquiries of a changed address in sync with it,
+    in a single update
+
+    the geography and address fingerprint are computed once, the name fingerprint once per name
+    """
+    if created or raw:
+        return
+    inquiries = Inquiry.objects.filter(address=instance)
+    synced_by_name = {}
+    for first_name, last_name in inquiries.values_list('first_name', 'last_name').distinct():
+        synced = Inquiry(address=instance, first_name=first_name, last_name=last_name)
+        synced.sync_geography()
+        synced.sync_fingerprints()
+        synced_by_name[(first_name, last_name)] = synced
+    if not synced_by_name:
+        return
+    name_fingerprints = [
+        When(first_name=first_name, last_name=last_name, then=Value(synced.name_fingerprint))
+        for (first_name, last_name), synced in synced_by_name.items()
+    ]
+    # the geography and address fingerprint are the same for every name
+    synced = next(iter(synced_by_name.values()))
+    inquiries.update_without_save(
+        state=synced.state,
+        zip5=synced.zip5,
+        address_fingerprint=synced.address_fingerprint,
+        name_fingerprint=Case(*name_fingerprints, output_field=CharField()),
+    )
@@ -0,0 +1,195 @@
+"""
+Synthetic inquiries for building large local databases for benchmarks.
+
+generate_inquiries() creates users, clients, addresses and inquiries with bulk_create in one
+transaction per chunk, so no model save() runs: no reviewer email is sent, no signal is sent
+and no stage transition is executed. The zip codes are drawn from the ones of the zip code
+forecast in the given states, each with the state its 3 digit prefix is assigned to, and are
+vetted like the first step: the outcome key, forecast value and forecast version are the ones
+the wizard records. The values of the inquiry fields with choices are drawn uniformly from the
+choices.
+"""
+import random
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import BooleanField
+
+from core.models import Address, UseCaseModel
+from core.pricing import MIN_HOME_VALUE, MAX_HOME_VALUE
+from custom_auth.models import Client, User
+from inquiry.models import Inquiry
+from inquiry.outcomes import get_state_zip_code_outcome_key, get_vetting_record
+from inquiry.utils import get_vetting_snapshot, get_zip_code_forecast
+
+DEFAULT_CHUNK_SIZE = 2000
+FIRST_NAMES = (
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William',
+    'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+    'Charles', 'Karen', 'Maria', 'Wei', 'Priya', 'Ahmed', 'Sofia',
+)
+LAST_NAMES = (
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+    'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor',
+    'Moore', 'Jackson', 'Martin', 'Lee', 'Nguyen', 'Patel', 'Kim', 'Cohen',
+)
+STREET_NAMES = (
+    'Main', 'Oak', 'Pine', 'Maple', 'Cedar', 'Elm', 'Washington', 'Lake', 'Hill', 'Park',
+    'Walnut', 'Spring', 'Highland', 'Church', 'Center', 'Chestnut', 'Prospect', 'Summer',
+)
+STREET_SUFFIXES = ('St', 'Ave', 'Rd', 'Ln', 'Dr', 'Ct', 'Pl', 'Ter')
+CITIES = (
+    'Springfield', 'Franklin', 'Greenville', 'Bristol', 'Clinton', 'Fairview', 'Salem',
+    'Madison', 'Georgetown', 'Arlington', 'Ashland', 'Dover', 'Newton', 'Milton',
+)
+USE_CASE_PROBABILITY = 0.3
+PRIMARY_RESIDENCE_PROBABILITY = 0.85
+UNIT_PROBABILITY = 0.15
+# (first, last, state) ranges of the 3 digit zip code prefixes assigned to the states, without
+# the few prefixes shared with a neighbouring state or assigned to the military
+ZIP_PREFIX_STATES = (
+    (5, 5, 'NY'), (6, 7, 'PR'), (8, 8, 'VI'), (9, 9, 'PR'), (10, 27, 'MA'), (28, 29, 'RI'),
+    (30, 38, 'NH'), (39, 49, 'ME'), (50, 59, 'VT'), (60, 69, 'CT'), (70, 89, 'NJ'),
+    (100, 149, 'NY'), (150, 196, 'PA'), (197, 199, 'DE'), (200, 200, 'DC'), (201, 201, 'VA'),
+    (202, 205, 'DC'), (206, 219, 'MD'), (220, 246, 'VA'), (247, 268, 'WV'), (270, 289, 'NC'),
+    (290, 299, 'SC'), (300, 319, 'GA'), (320, 349, 'FL'), (350, 369, 'AL'), (370, 385, 'TN'),
+    (386, 397, 'MS'), (398, 399, 'GA'), (400, 427, 'KY'), (430, 459, 'OH'), (460, 479, 'IN'),
+    (480, 499, 'MI'), (500, 528, 'IA'), (530, 549, 'WI'), (550, 567, 'MN'), (569, 569, 'DC'),
+    (570, 577, 'SD'), (580, 588, 'ND'), (590, 599, 'MT'), (600, 629, 'IL'), (630, 658, 'MO'),
+    (660, 679, 'KS'), (680, 693, 'NE'), (700, 714, 'LA'), (716, 729, 'AR'), (730, 732, 'OK'),
+    (733, 733, 'TX'), (734, 749, 'OK'), (750, 799, 'TX'), (800, 816, 'CO'), (820, 831, 'WY'),
+    (832, 838, 'ID'), (840, 847, 'UT'), (850, 865, 'AZ'), (870, 884, 'NM'), (885, 885, 'TX'),
+    (889, 898, 'NV'), (900, 961, 'CA'), (967, 968, 'HI'), (969, 969, 'GU'), (970, 979, 'OR'),
+    (980, 994, 'WA'), (995, 999, 'AK'),
+)
+
+
+def get_zip_code_state(zip_code):
+    """ returns the state the prefix of the ddddd zip code is assigned to or None """
+    prefix = int(zip_code[:3])
+    for first, last, state in ZIP_PREFIX_STATES:
+        if first <= prefix <= last:
+            return state
+    return None
+
+
+def get_forecast_zip_codes():
+    """ returns the ddddd zip codes of the zip code forecast """
+    df = get_zip_code_forecast()
+    if df is None:
+        return []
+    return [str(int(value)).zfill(5) for value in df[settings.ZIP_CODE_COL].dropna().values]
+
+
+class InquiryGenerator:
+    """ generates the objects of synthetic inquiries, reproducibly for a given seed """
+
+    def __init__(self, zip_codes, states, seed=None):
+        states = set(states)
+        # sorted so that the draws don't depend on the order of the forecast
+        self.states_zip_codes = sorted(
+            (get_zip_code_state(zip_code), zip_code) for zip_code in set(zip_codes)
+            if get_zip_code_state(zip_code) in states
+        )
+        if not self.states_zip_codes:
+            raise ValueError('No zip codes to draw from in the states')
+        self.random = random.Random(seed)
+        # unique per run so that runs with the same seed don't create the same emails
+        self.run = uuid.uuid4().hex[:8]
+        self.count = 0
+        self.choice_fields = [field for field in Inquiry._meta.fields if field.choices]
+        self.use_case_fields = [
+            field.name for field in UseCaseModel._meta.fields if isinstance(field, BooleanField)
+        ]
+        self.friendly_id_length = Client._meta.get_field('friendly_id').max_length
+        # an unusable password, it is the same for every user
+        self.password = make_password(None)
+
+    def _get_home_value(self):
+        # home values are roughly log-normal around $450k
+        value = int(self.random.lognormvariate(13, 0.5)) // 1000 * 1000
+        return min(max(value, MIN_HOME_VALUE), MAX_HOME_VALUE)
+
+    def generate(self):
+        """ returns the unsaved user, client, address and inquiry of a synthetic inquiry """
+        self.count += 1
+        rand = self.random
+        first_name, last_name = rand.choice(FIRST_NAMES), rand.choice(LAST_NAMES)
+        state, zip_code = rand.choice(self.states_zip_codes)
+        user = User(
+            email='synthetic+{0}-{1}@example.com'.format(self.run, self.count),
+            first_name=first_name,
+            last_name=last_name,
+            password=self.password,
+        )
+        client = Client(
+            user=user,
+            phone_number='555{0:07d}'.format(rand.randrange(10**7)),
+            friendly_id=uuid.uuid4().hex[:self.friendly_id_length],
+        )
+        address = Address(
+            street='{0} {1} {2}'.format(
+                rand.randint(1, 9999), rand.choice(STREET_NAMES), rand.choice(STREET_SUFFIXES)
+            ),
+            unit=str(rand.randint(1, 400)) if rand.random() < UNIT_PROBABILITY else '',
+            city=rand.choice(CITIES),
+            state=state,
+            zip_code=zip_code,
+        )
+        home_value = self._get_home_value()
+        # vetted like the first step of the wizard
+        snapshot = get_vetting_snapshot()
+        outcome_key, _ = get_state_zip_code_outcome_key(state, zip_code, snapshot)
+        inquiry = Inquiry(
+            client=client,
+            address=address,
+            ip_address=None,
+            primary_residence=rand.random() < PRIMARY_RESIDENCE_PROBABILITY,
+            home_value=home_value,
+            household_debt=int(home_value * rand.uniform(0, 0.8)),
+            first_name=first_name,
+            last_name=last_name,
+            **get_vetting_record(state, zip_code, outcome_key, snapshot)
+        )
+        for field in self.choice_fields:
+            setattr(inquiry, field.attname, rand.choice(field.choices)[0])
+        for name in self.use_case_fields:
+            setattr(inquiry, name, rand.random() < USE_CASE_PROBABILITY)
+        return (user, client, address, inquiry)
+
+
+def _create_chunk(rows):
+    users, clients, addresses, inquiries = zip(*rows)
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        # set the foreign keys now that the related objects have their primary key
+        for client in clients:
+            client.user_id = client.user.pk
+        Client.objects.bulk_create(clients)
+        Address.objects.bulk_create(addresses)
+        for inquiry in inquiries:
+            inquiry.client_id, inquiry.address_id = inquiry.client.pk, inquiry.address.pk
+            inquiry.sync_geography()
+            inquiry.sync_fingerprints()
+        Inquiry.objects.bulk_create(inquiries)
+
+
+def generate_inquiries(count, states, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, progress=None):
+    """
+    creates count synthetic inquiries in the given states with their client and address, calling
+    progress with the number created so far after each chunk
+    """
+    if not connection.features.can_return_ids_from_bulk_insert:
+        # the clients and inquiries need the primary keys of the users, clients and addresses
+        raise ValueError('The database must return the primary keys of bulk inserts')
+    generator = InquiryGenerator(get_forecast_zip_codes(), list(states), seed=seed)
+    created = 0
+    while created < count:
+        size = min(chunk_size, count - created)
+        _create_chunk([generator.generate() for _ in range(size)])
+        created += size
+        if progress is not None:
+            progress(created)
+    return created
@@ -0,0 +1,43 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from inquiry.assets import CSS_BUNDLES, JS_BUNDLES, load_manifest
+
+register = template.Library()
+
+
+@register.simple_tag
+def inquiry_css(bundle_name):
+    """
+    renders the stylesheet link of a built CSS bundle or, if the assets have not been built, the
+    links of its SCSS sources for django-compressor to compile
+    """
+    manifest = load_manifest()
+    if manifest is not None and bundle_name in manifest['css']:
+        return format_html(
+            '<link rel="stylesheet" type="text/css" href="{0}">',
+            static(manifest['css'][bundle_name])
+        )
+    return format_html_join(
+        '\n', '<link rel="stylesheet" type="text/x-scss" href="{0}">',
+        ((static(source), ) for source in CSS_BUNDLES[bundle_name])
+    )
+
+
+@register.simple_tag
+def inquiry_js(bundle_name):
+    """
+    renders the script tag of a built JS bundle or, if the assets have not been built, the script
+    tags of its sources
+    """
+    manifest = load_manifest()
+    if manifest is not None and bundle_name in manifest['js']:
+        return format_html(
+            '<script type="text/javascript" src="{0}"></script>',
+            static(manifest['js'][bundle_name])
+        )
+    return format_html_join(
+        '\n', '<script type="text/javascript" src="{0}"></script>',
+        ((static(source), ) for source in JS_BUNDLES[bundle_name])
+    )
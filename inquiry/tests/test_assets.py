@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from inquiry.assets import (
+    APP_STATIC_ROOT, CSS_BUNDLES, JS_BUNDLES, build_assets, get_hashed_name, load_manifest
+)
+from inquiry.templatetags.inquiry_assets import inquiry_css, inquiry_js
+
+
+class BuildAssetsTests(SimpleTestCase):
+    def setUp(self):
+        # build from a copy of the app's static files so the source tree is left untouched
+        self.static_root = tempfile.mkdtemp()
+        shutil.copytree(
+            os.path.join(APP_STATIC_ROOT, 'inquiry'), os.path.join(self.static_root, 'inquiry')
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.static_root)
+
+    def test_get_hashed_name(self):
+        name = get_hashed_name('wizard', 'js', 'var a = 1;')
+        self.assertTrue(name.startswith('inquiry/build/wizard.'))
+        self.assertTrue(name.endswith('.js'))
+        self.assertEqual(name, get_hashed_name('wizard', 'js', 'var a = 1;'))
+        self.assertNotEqual(name, get_hashed_name('wizard', 'js', 'var a = 2;'))
+
+    def test_build_assets(self):
+        self.assertIsNone(load_manifest(self.static_root))
+        manifest = build_assets(
+            compile_scss=lambda source: source, minify_js=lambda source: source,
+            static_root=self.static_root
+        )
+        self.assertEqual(set(manifest['css']), set(CSS_BUNDLES))
+        self.assertEqual(set(manifest['js']), set(JS_BUNDLES))
+        self.assertEqual(load_manifest(self.static_root), manifest)
+
+        with open(os.path.join(self.static_root, manifest['js']['wizard'])) as bundle_file:
+            bundle = bundle_file.read()
+        # the bundle contains every source
+        self.assertIn('function useDemoData()', bundle)
+        self.assertIn('function validatePassword()', bundle)
+
+
+class InquiryAssetsTagTests(SimpleTestCase):
+    @mock.patch('inquiry.templatetags.inquiry_assets.load_manifest', return_value=None)
+    def test_not_built(self, mocked_load_manifest):
+        self.assertIn('inquiry/scss/home.scss', inquiry_css('home'))
+        self.assertIn('text/x-scss', inquiry_css('home'))
+        html = inquiry_js('wizard')
+        self.assertIn('inquiry/js/demo.js', html)
+        self.assertIn('inquiry/js/signup.js', html)
+
+    @mock.patch('inquiry.templatetags.inquiry_assets.load_manifest')
+    def test_built(self, mocked_load_manifest):
+        mocked_load_manifest.return_value = {
+            'css': {
+                'home': 'inquiry/build/home.0123456789ab.css'
+            },
+            'js': {
+                'wizard': 'inquiry/build/wizard.0123456789ab.js'
+            },
+        }
+        html = inquiry_css('home')
+        self.assertIn('inquiry/build/home.0123456789ab.css', html)
+        self.assertIn('text/css', html)
+        html = inquiry_js('wizard')
+        self.assertIn('inquiry/build/wizard.0123456789ab.js', html)
+        self.assertNotIn('inquiry/js/demo.js', html)
@@ -0,0 +1,109 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from core.tests.test_helpers import create_address_example
+from custom_auth.tests.test_helpers import create_client_example
+from inquiry.backfill import backfill_inquiry_geography, iter_pk_batches
+from inquiry.fingerprints import get_address_fingerprint, get_name_fingerprint
+from inquiry.models import Inquiry
+from inquiry.tests.test_utils import create_inquiry_example
+
+
+def get_query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+class BackfillInquiryGeographyTests(TestCase):
+    def setUp(self):
+        self.address = create_address_example()
+        self.inquiry = create_inquiry_example(create_client_example(), self.address)
+
+    def test_iter_pk_batches(self):
+        client = create_client_example(overrides={'email': 'test+client2@hometap.com'})
+        create_inquiry_example(client, create_address_example())
+        batches = list(iter_pk_batches(Inquiry.objects.all(), batch_size=1))
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(
+            [pk for batch in batches for pk in batch],
+            list(Inquiry.objects.order_by('pk').values_list('pk', flat=True))
+        )
+
+    def test_backfill(self):
+        Inquiry.objects.update(state=None, zip5=None)
+        modified_at = Inquiry.objects.get().modified_at
+        self.assertEqual(backfill_inquiry_geography(batch_size=1, pause=0), 1)
+        self.inquiry.refresh_from_db()
+        # picked up by the incremental export
+        self.assertGreater(self.inquiry.modified_at, modified_at)
+        self.assertEqual(self.inquiry.state, self.address.state.upper())
+        self.assertEqual(self.inquiry.zip5, int(self.address.zip_code[:5]))
+        # nothing left to backfill
+        self.assertEqual(backfill_inquiry_geography(pause=0), 0)
+
+    def test_save_syncs_geography(self):
+        self.address.zip_code = '02467-1234'
+        self.address.save()
+        self.inquiry.refresh_from_db()
+        self.assertEqual(self.inquiry.zip5, 2467)
+        self.inquiry.save()
+        self.assertEqual(self.inquiry.zip5, 2467)
+
+    def test_save_syncs_fingerprints(self):
+        client = create_client_example(overrides={'email': 'test+client2@hometap.com'})
+        other = create_inquiry_example(client, self.address)
+        Inquiry.objects.filter(pk=other.pk).update(first_name='Jane')
+        self.address.zip_code = '02467'
+        self.address.save()
+        address = self.address
+        for inquiry in Inquiry.objects.all():
+            self.assertEqual(
+                inquiry.address_fingerprint,
+                get_address_fingerprint(
+                    address.street, address.unit, address.city, address.state, '02467'
+                )
+            )
+            self.assertEqual(
+                inquiry.name_fingerprint,
+                get_name_fingerprint(inquiry.first_name, inquiry.last_name, '02467')
+            )
+        self.assertEqual(Inquiry.objects.values('name_fingerprint').distinct().count(), 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are documented for PostgreSQL')
+class GeographyQueryPlanTests(TestCase):
+    """
+    documents the query plans of a geographic report before and after the denormalized columns
+
+    the test tables are tiny, so sequential scans are disabled to show the plans the planner
+    picks for a large table
+    """
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = on')
+
+    def test_before_joins_address(self):
+        # string zip codes with ZIP+4 suffixes can only be matched with a pattern on the address
+        plan = get_query_plan(
+            Inquiry.objects.filter(address__state='MA', address__zip_code__startswith='02138')
+        )
+        self.assertIn('Join', plan)
+
+    def test_after_uses_state_zip5_index(self):
+        plan = get_query_plan(Inquiry.objects.filter(state='MA', zip5=2138))
+        self.assertNotIn('Join', plan)
+        self.assertIn('inquiry_state_zip5_idx', plan)
+
+    def test_after_zip5_range_uses_index(self):
+        plan = get_query_plan(Inquiry.objects.filter(zip5__gte=2100, zip5__lt=2200))
+        self.assertNotIn('Join', plan)
+        self.assertIn('Index', plan)
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import pandas as pd
+
+from django.conf import settings
+from django.test import TestCase, Client as Browser, override_settings
+
+from inquiry import decision_log
+from inquiry.decision_log import (
+    flush_at_exit, get_segment_paths, get_writer, log_decision, read_decisions,
+    wait_for_decisions
+)
+from inquiry.outcomes import PASSED_OUTCOME_KEY
+from inquiry.tests.test_views import submit_inquiry_forms
+
+VETTING_RECORD = {
+    'outcome_key': PASSED_OUTCOME_KEY, 'forecast_value': 0.5, 'forecast_version': 'abc'
+}
+
+
+class DecisionLogTests(TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(INQUIRY_DECISION_LOG_DIR=self.log_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        wait_for_decisions()
+        self.settings_override.disable()
+        shutil.rmtree(self.log_dir)
+
+    def test_disabled_without_log_dir(self):
+        with override_settings(INQUIRY_DECISION_LOG_DIR=None):
+            self.assertIsNone(get_writer())
+            log_decision('MA', '02138', VETTING_RECORD)
+
+    def test_log_and_read(self):
+        log_decision('MA', '02138-1234', VETTING_RECORD)
+        log_decision('MA', '02467', dict(VETTING_RECORD, outcome_key='undesirable_zip_code'))
+        wait_for_decisions()
+
+        decisions = read_decisions(self.log_dir)
+        self.assertEqual(list(decisions['zip5']), [2138, 2467])
+        self.assertEqual(
+            list(decisions['outcome_key']), [PASSED_OUTCOME_KEY, 'undesirable_zip_code']
+        )
+        self.assertEqual(decisions['outcome_key'].dtype.name, 'category')
+        self.assertEqual(decisions['timestamp'].dtype.name, 'datetime64[ns]')
+
+    def test_read_since(self):
+        log_decision('MA', '02138', VETTING_RECORD)
+        wait_for_decisions()
+        self.assertEqual(len(read_decisions(self.log_dir, since=time.time() - 60)), 1)
+        self.assertTrue(read_decisions(self.log_dir, since=time.time() + 60).empty)
+
+    def test_read_empty(self):
+        self.assertTrue(read_decisions(self.log_dir).empty)
+
+    def test_segment_rotation(self):
+        with mock.patch.object(get_writer(), 'segment_bytes', 1):
+            for _ in range(3):
+                log_decision('MA', '02138', VETTING_RECORD)
+                wait_for_decisions()
+                # segments are named after the millisecond they are started
+                time.sleep(0.002)
+        self.assertEqual(len(get_segment_paths(self.log_dir)), 3)
+        self.assertEqual(len(read_decisions(self.log_dir)), 3)
+
+    def test_full_queue_drops_decisions(self):
+        writer = get_writer()
+        with mock.patch.object(decision_log.queue.Queue, 'put_nowait') as put_nowait:
+            put_nowait.side_effect = decision_log.queue.Full
+            log_decision('MA', '02138', VETTING_RECORD)
+        self.assertEqual(writer.dropped, 1)
+
+    def test_flush_at_exit(self):
+        log_decision('MA', '02138', VETTING_RECORD)
+        started = time.monotonic()
+        flush_at_exit()
+        # without waiting for a full batch
+        self.assertLess(time.monotonic() - started, decision_log.BATCH_WAIT)
+        self.assertEqual(len(read_decisions(self.log_dir)), 1)
+
+    @override_settings(INQUIRY_DECISION_LOG_FLUSH_TIMEOUT=0.05)
+    def test_flush_at_exit_timeout(self):
+        writer = get_writer()
+        with mock.patch.object(writer, '_write', side_effect=lambda batch: time.sleep(0.5)):
+            log_decision('MA', '02138', VETTING_RECORD)
+            with mock.patch('inquiry.decision_log.logger') as mocked_logger:
+                started = time.monotonic()
+                flush_at_exit()
+                self.assertLess(time.monotonic() - started, 0.4)
+            mocked_logger.warning.assert_called_once_with('1 decisions not written at exit')
+            wait_for_decisions()
+
+    def test_new_writer_after_fork(self):
+        writer = get_writer()
+        with mock.patch.object(os, 'getpid', return_value=writer.pid + 1):
+            self.assertIsNot(get_writer(), writer)
+
+    @override_settings(
+        ZIP_CODE_FORECAST=pd.
+        read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+    )
+    def test_wizard_decisions(self):
+        submit_inquiry_forms(
+            Browser(), 'test+client1@hometap.com', first_overrides={'first-zip_code': '02467'}
+        )
+        wait_for_decisions()
+        decisions = read_decisions(self.log_dir)
+        self.assertEqual(list(decisions['zip5']), [2467])
+        self.assertNotEqual(decisions['outcome_key'][0], PASSED_OUTCOME_KEY)
@@ -0,0 +1,81 @@
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from core.tests.test_helpers import create_address_example
+from custom_auth.tests.test_helpers import create_client_example
+from inquiry.export import export_inquiries
+from inquiry.models import ExportWatermark
+from inquiry.tests.test_utils import create_inquiry_example
+
+
+def read_jsonl_chunks(paths):
+    rows = []
+    for path in paths:
+        with gzip.open(path, 'rt') as chunk_file:
+            rows.extend(json.loads(line) for line in chunk_file)
+    return rows
+
+
+@override_settings(INQUIRY_EXPORT_LAG=0)
+class ExportInquiriesTests(TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.inquiries = []
+        for index in range(3):
+            client = create_client_example(
+                overrides={'email': 'test+client{0}@hometap.com'.format(index)}
+            )
+            self.inquiries.append(create_inquiry_example(client, create_address_example()))
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_export_incremental(self):
+        paths = export_inquiries(self.output_dir, 'test', chunk_size=2)
+        self.assertEqual(len(paths), 2)
+        rows = read_jsonl_chunks(paths)
+        self.assertEqual(
+            {row['id'] for row in rows}, {str(inquiry.id) for inquiry in self.inquiries}
+        )
+        self.assertEqual(rows[0]['address__zip_code'], self.inquiries[0].address.zip_code)
+        watermark = ExportWatermark.objects.get(name='test')
+        self.assertEqual(str(watermark.last_id), rows[-1]['id'])
+
+        # nothing changed since the last run
+        self.assertEqual(export_inquiries(self.output_dir, 'test'), [])
+
+        self.inquiries[1].notes = 'changed'
+        self.inquiries[1].save()
+        rows = read_jsonl_chunks(export_inquiries(self.output_dir, 'test'))
+        self.assertEqual([row['id'] for row in rows], [str(self.inquiries[1].id)])
+        self.assertEqual(rows[0]['notes'], 'changed')
+
+    def test_export_full(self):
+        export_inquiries(self.output_dir, 'test')
+        paths = export_inquiries(self.output_dir, 'test', full=True)
+        self.assertEqual(len(read_jsonl_chunks(paths)), 3)
+
+    def test_runs_dont_overwrite_chunks(self):
+        # runs in the same second write their own chunks
+        first_paths = export_inquiries(self.output_dir, 'test')
+        second_paths = export_inquiries(self.output_dir, 'test', full=True)
+        self.assertFalse(set(first_paths) & set(second_paths))
+        self.assertEqual(len(read_jsonl_chunks(first_paths + second_paths)), 6)
+
+    def test_export_csv(self):
+        paths = export_inquiries(self.output_dir, 'test', file_format='csv')
+        with gzip.open(paths[0], 'rt') as chunk_file:
+            rows = list(csv.DictReader(io.StringIO(chunk_file.read())))
+        self.assertEqual(len(rows), 3)
+        self.assertIn('address__city', rows[0])
+
+    @override_settings(INQUIRY_EXPORT_LAG=3600)
+    def test_export_lag(self):
+        # inquiries modified within the lag are left to the next run
+        self.assertEqual(export_inquiries(self.output_dir, 'test'), [])
@@ -0,0 +1,77 @@
+from django.test import TestCase
+
+from core.tests.test_helpers import create_address_example
+from custom_auth.tests.test_helpers import create_client_example
+from inquiry.duplicates import get_duplicate_clusters, mark_possible_duplicates
+from inquiry.fingerprints import (
+    get_address_fingerprint, get_name_fingerprint, normalize_street, normalize_unit
+)
+from inquiry.models import Inquiry
+from inquiry.tests.test_utils import create_inquiry_example
+
+
+class FingerprintTests(TestCase):
+    def test_normalize_street(self):
+        self.assertEqual(normalize_street('20 University Road'), '20 university rd')
+        self.assertEqual(normalize_street(' 20  UNIVERSITY rd. '), '20 university rd')
+        self.assertEqual(normalize_street('1 North Main Street'), '1 n main st')
+
+    def test_normalize_unit(self):
+        for unit in ['Suite 100', 'ste. 100', '#100', 'Unit #100', '100']:
+            self.assertEqual(normalize_unit(unit), '100')
+
+    def test_get_address_fingerprint(self):
+        fingerprint = get_address_fingerprint(
+            '20 University Road', 'Suite 100', 'Cambridge', 'MA', '02138'
+        )
+        self.assertEqual(len(fingerprint), 40)
+        self.assertEqual(
+            get_address_fingerprint('20 university rd.', '#100', 'CAMBRIDGE', 'ma', '02138-1234'),
+            fingerprint
+        )
+        self.assertNotEqual(
+            get_address_fingerprint('20 University Road', 'Suite 101', 'Cambridge', 'MA', '02138'),
+            fingerprint
+        )
+        self.assertIsNone(get_address_fingerprint('', '', 'Cambridge', 'MA', '02138'))
+
+    def test_get_name_fingerprint(self):
+        fingerprint = get_name_fingerprint('John', 'Doe', '02138')
+        self.assertEqual(get_name_fingerprint(' john ', 'DOE', '02138-1234'), fingerprint)
+        self.assertNotEqual(get_name_fingerprint('John', 'Doe', '02139'), fingerprint)
+        self.assertIsNone(get_name_fingerprint('John', '', '02138'))
+        self.assertIsNone(get_name_fingerprint('John', 'Doe', ''))
+
+
+class DuplicateInquiryTests(TestCase):
+    def _create_inquiry(self, email):
+        client = create_client_example(overrides={'email': email})
+        inquiry = create_inquiry_example(client, create_address_example())
+        return inquiry
+
+    def test_find_possible_duplicate(self):
+        first = self._create_inquiry('test+client1@hometap.com')
+        second = self._create_inquiry('test+client2@hometap.com')
+        self.assertIsNotNone(second.address_fingerprint)
+        self.assertEqual(second.find_possible_duplicate(), first)
+
+    def test_find_possible_duplicate_none(self):
+        inquiry = self._create_inquiry('test+client1@hometap.com')
+        self.assertIsNone(inquiry.find_possible_duplicate())
+
+    def test_get_duplicate_clusters(self):
+        first = self._create_inquiry('test+client1@hometap.com')
+        second = self._create_inquiry('test+client2@hometap.com')
+        other = self._create_inquiry('test+client3@hometap.com')
+        Inquiry.objects.filter(pk=other.pk).update(
+            address_fingerprint='other', name_fingerprint='other'
+        )
+
+        clusters = get_duplicate_clusters()
+        self.assertEqual([[member[0] for member in cluster] for cluster in clusters],
+                         [[first.pk, second.pk]])
+        self.assertEqual(mark_possible_duplicates(clusters), 1)
+        second.refresh_from_db()
+        self.assertEqual(second.possible_duplicate_of, first)
+        # already marked
+        self.assertEqual(mark_possible_duplicates(clusters), 0)
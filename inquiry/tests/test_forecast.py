@@ -0,0 +1,70 @@
+from math import isclose, nan
+
+import pandas as pd
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from inquiry.forecast import (
+    CREATED_COL, ForecastValidationError, clean_zip_code_forecast, load_zip_code_forecast
+)
+from inquiry.tests.test_utils import DF_DATA
+
+TEST_ZIP_CODES_PATH = settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv'
+
+
+class CleanZipCodeForecastTests(SimpleTestCase):
+    def test_test_file(self):
+        df = load_zip_code_forecast(TEST_ZIP_CODES_PATH)
+        # the unnamed columns and the embedded table are dropped
+        self.assertFalse([col for col in df.columns if col.startswith('Unnamed')])
+        self.assertNotIn(settings.ZIP_CODE_COL + '.1', df.columns)
+        self.assertEqual(df[settings.ZIP_CODE_COL].dtype, 'int64')
+        for col in df.columns:
+            if col not in (settings.ZIP_CODE_COL, CREATED_COL):
+                self.assertEqual(df[col].dtype, 'float64')
+        self.assertEqual(df[CREATED_COL].dtype, 'datetime64[ns]')
+        self.assertTrue(df[settings.ZIP_CODE_COL].is_unique)
+
+        # '1899-12-30 0:55:09' is a float formatted as a time
+        risk = df.loc[df[settings.ZIP_CODE_COL] == 2445, 'risk 12 month loss'].iloc[0]
+        self.assertTrue(isclose(risk, (55 * 60 + 9) / (24 * 60 * 60)))
+
+    def test_keeps_zip_codes_without_forecast(self):
+        df, notes = clean_zip_code_forecast(DF_DATA)
+        self.assertEqual(len(df), len(DF_DATA))
+        forecast = df.loc[df[settings.ZIP_CODE_COL] == 2457, settings.ZIP_FORECAST_COL].iloc[0]
+        self.assertTrue(pd.isnull(forecast))
+
+    def test_coerces_and_drops_bad_rows(self):
+        df = pd.DataFrame({
+            settings.ZIP_CODE_COL: ['2445', 'total', '', '123456', '2445'],
+            settings.ZIP_FORECAST_COL: ['0.1', '19', '0.2', '0.3', '>6.7%'],
+            CREATED_COL: [
+                '2018-06-12 17:26:50', '', '', '', '2018-10-30 14:28:51'
+            ],
+        })
+        clean, notes = clean_zip_code_forecast(df)
+        self.assertEqual(list(clean[settings.ZIP_CODE_COL]), [2445])
+        # the most recently created row is kept
+        self.assertTrue(pd.isnull(clean[settings.ZIP_FORECAST_COL].iloc[0]))
+        self.assertTrue(notes)
+
+    def test_missing_columns(self):
+        with self.assertRaises(ForecastValidationError):
+            clean_zip_code_forecast(pd.DataFrame({settings.ZIP_CODE_COL: [2445]}))
+
+    def test_no_forecast_values(self):
+        df = pd.DataFrame({settings.ZIP_CODE_COL: [2445], settings.ZIP_FORECAST_COL: [nan]})
+        with self.assertRaises(ForecastValidationError):
+            clean_zip_code_forecast(df)
+
+    def test_forecast_out_of_range(self):
+        df = pd.DataFrame({settings.ZIP_CODE_COL: [2445], settings.ZIP_FORECAST_COL: [19]})
+        with self.assertRaises(ForecastValidationError):
+            clean_zip_code_forecast(df)
+
+    def test_no_valid_zip_codes(self):
+        df = pd.DataFrame({settings.ZIP_CODE_COL: ['total'], settings.ZIP_FORECAST_COL: [0.1]})
+        with self.assertRaises(ForecastValidationError):
+            clean_zip_code_forecast(df)
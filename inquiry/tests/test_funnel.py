@@ -0,0 +1,107 @@
+import datetime
+from unittest import mock
+
+import pandas as pd
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import TestCase, Client as Browser, override_settings
+from django.utils import timezone
+
+from inquiry.funnel import (
+    ACCOUNT_CREATED, DONE_STEP, SUBMITTED, flush_funnel_events, get_daily_funnel, get_funnel,
+    record_funnel_event
+)
+from inquiry.models import InquiryFunnelCounter
+from inquiry.tests.test_views import submit_inquiry_forms
+
+
+class FunnelTests(TestCase):
+    def setUp(self):
+        # drop the events counted by other tests
+        flush_funnel_events()
+        InquiryFunnelCounter.objects.all().delete()
+
+    @override_settings(INQUIRY_FUNNEL_FLUSH_INTERVAL=3600)
+    def test_events_buffered_until_flush(self):
+        record_funnel_event('first', SUBMITTED)
+        record_funnel_event('first', SUBMITTED)
+        self.assertFalse(InquiryFunnelCounter.objects.exists())
+        flush_funnel_events()
+        self.assertEqual(InquiryFunnelCounter.objects.get().count, 2)
+
+        record_funnel_event('first', SUBMITTED)
+        flush_funnel_events()
+        self.assertEqual(InquiryFunnelCounter.objects.get().count, 3)
+
+    @override_settings(INQUIRY_FUNNEL_FLUSH_INTERVAL=0)
+    def test_events_flushed_after_interval(self):
+        record_funnel_event('first', SUBMITTED)
+        self.assertEqual(InquiryFunnelCounter.objects.get().count, 1)
+
+    def test_get_funnel(self):
+        today = timezone.localdate()
+        for days_ago, step, outcome, count in [
+            (0, 'first', SUBMITTED, 5),
+            (1, 'first', SUBMITTED, 3),
+            (1, 'first', 'ruzc', 2),
+            (40, 'first', SUBMITTED, 7),
+        ]:
+            InquiryFunnelCounter.objects.create(
+                day=today - datetime.timedelta(days=days_ago), step=step, outcome=outcome,
+                count=count
+            )
+        start_day = today - datetime.timedelta(days=30)
+        self.assertEqual(
+            list(get_funnel(start_day, today).items()),
+            [(('first', 'ruzc'), 2), (('first', SUBMITTED), 8)]
+        )
+        self.assertEqual(len(get_daily_funnel(start_day, today)), 3)
+
+    @override_settings(
+        INQUIRY_FUNNEL_FLUSH_INTERVAL=3600,
+        ZIP_CODE_FORECAST=pd.
+        read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+    )
+    def test_wizard_events(self):
+        today = timezone.localdate()
+        submit_inquiry_forms(Browser(), 'test+client1@hometap.com')
+        flush_funnel_events()
+        self.assertEqual(
+            get_funnel(today, today), {
+                ('first', SUBMITTED): 1,
+                ('home', SUBMITTED): 1,
+                ('homeowner', SUBMITTED): 1,
+                ('signup', SUBMITTED): 1,
+                (DONE_STEP, ACCOUNT_CREATED): 1,
+            }
+        )
+
+        submit_inquiry_forms(
+            Browser(), 'test+client2@hometap.com', first_overrides={'first-zip_code': '02467'}
+        )
+        flush_funnel_events()
+        funnel = get_funnel(today, today)
+        self.assertEqual(funnel[('first', 'ruzc')], 1)
+        # the rejected inquiry didn't get through
+        self.assertEqual(funnel[('signup', SUBMITTED)], 1)
+        self.assertEqual(funnel[(DONE_STEP, ACCOUNT_CREATED)], 1)
+
+    @mock.patch('inquiry.funnel.logger')
+    def test_failed_flush_keeps_transaction_usable(self, mocked_logger):
+        def failing_upsert(counts):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT * FROM inquiry_missing_table')
+
+        record_funnel_event('first', SUBMITTED)
+        with transaction.atomic():
+            with mock.patch('inquiry.funnel._upsert', failing_upsert), mock.patch(
+                'inquiry.funnel._upsert_postgresql', failing_upsert
+            ):
+                flush_funnel_events()
+            # the failed upsert was rolled back to its savepoint
+            self.assertFalse(InquiryFunnelCounter.objects.exists())
+        mocked_logger.error.assert_called_once()
+        # the counts are kept for the next flush
+        flush_funnel_events()
+        self.assertEqual(InquiryFunnelCounter.objects.get().count, 1)
@@ -0,0 +1,212 @@
+import copy
+import csv
+import io
+import json
+from unittest import mock
+
+import pandas as pd
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from core.models import Address
+from core.tests.test_helpers import create_address_example
+from custom_auth.models import Client
+from custom_auth.tests.test_helpers import create_client_example
+from inquiry.ingest import ingest_leads, read_leads, validate_lead
+from inquiry.models import Inquiry, InquiryRejection
+from inquiry.tests.test_forms import FIRST_FORM_EXAMPLE_DATA, HOME_FORM_EXAMPLE_DATA
+from inquiry.tests.test_utils import UNDESIRABLE_ZIP_CODES, create_inquiry_example
+from inquiry.utils import get_vetting_snapshot
+
+LEAD_EXAMPLE_DATA = dict(
+    FIRST_FORM_EXAMPLE_DATA, **HOME_FORM_EXAMPLE_DATA, **{
+        'first_name': 'Bob',
+        'last_name': 'Smith',
+        'referrer_name': 'Sarah Dekin',
+        'notes': 'Partner lead',
+        'when_interested': '7_to_12_months',
+        'phone_number': '617-399-0604',
+    }
+)
+
+
+def _get_lead(**overrides):
+    lead = copy.deepcopy(LEAD_EXAMPLE_DATA)
+    lead.update(overrides)
+    return lead
+
+
+class ReadLeadsTests(TestCase):
+    def test_read_leads_csv(self):
+        stream = io.StringIO('first_name,last_name\nBob,Smith\nJane,Doe\n')
+        self.assertEqual(
+            list(read_leads(stream, 'csv')), [
+                {'first_name': 'Bob', 'last_name': 'Smith'},
+                {'first_name': 'Jane', 'last_name': 'Doe'},
+            ]
+        )
+
+    def test_read_leads_jsonl(self):
+        stream = io.StringIO(json.dumps({'first_name': 'Bob'}) + '\n\n')
+        self.assertEqual(list(read_leads(stream, 'jsonl')), [{'first_name': 'Bob'}])
+
+    def test_read_leads_unknown_format(self):
+        with self.assertRaises(ValueError):
+            list(read_leads(io.StringIO(''), 'xml'))
+
+
+@override_settings(
+    ZIP_CODE_FORECAST=pd.
+    read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+)
+class IngestLeadsTests(TestCase):
+    def test_validate_lead(self):
+        step_cleaned_data, errors = validate_lead(_get_lead())
+        self.assertEqual(errors, {})
+        self.assertEqual(set(step_cleaned_data), {'first', 'home', 'homeowner', 'signup'})
+
+    def test_validate_lead_errors(self):
+        step_cleaned_data, errors = validate_lead(_get_lead(street='', home_value=''))
+        self.assertEqual(set(errors), {'street', 'home_value'})
+
+    def test_validate_lead_phone_number(self):
+        step_cleaned_data, errors = validate_lead(_get_lead(phone_number='not a phone'))
+        self.assertEqual(set(errors), {'phone_number'})
+        # the phone number is optional
+        step_cleaned_data, errors = validate_lead(_get_lead(phone_number=''))
+        self.assertEqual(errors, {})
+        self.assertEqual(step_cleaned_data['signup'], {'phone_number': ''})
+
+    def test_ingest_leads(self):
+        leads = [
+            _get_lead(),
+            _get_lead(email='test+client2@hometap.com'),
+        ]
+        report = ingest_leads(leads, chunk_size=1)
+        self.assertEqual(report.rows, 2)
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.errors, [])
+        self.assertEqual(Client.objects.count(), 2)
+        self.assertEqual(Address.objects.count(), 2)
+        self.assertEqual(Inquiry.objects.count(), 2)
+        inquiry = Inquiry.objects.get(client__user__email='test+client2@hometap.com')
+        self.assertEqual(inquiry.first_name, 'Bob')
+        self.assertEqual(inquiry.address.zip_code, FIRST_FORM_EXAMPLE_DATA['zip_code'])
+
+    def test_ingest_leads_possible_duplicates(self):
+        first = create_inquiry_example(create_client_example(), create_address_example())
+        leads = [
+            # the address of create_address_example()
+            _get_lead(email='test+client2@hometap.com', **{
+                field: getattr(first.address, field) or ''
+                for field in ('street', 'unit', 'city', 'state', 'zip_code')
+            }),
+            # another address and name
+            _get_lead(email='test+client3@hometap.com', street='77 Other St', last_name='Jones'),
+            _get_lead(email='test+client4@hometap.com', street='77 Other St', last_name='Jones'),
+        ]
+        report = ingest_leads(leads)
+        self.assertEqual(report.created, 3)
+        second, third, fourth = [
+            Inquiry.objects.get(client__user__email=lead['email']) for lead in leads
+        ]
+        self.assertEqual(second.possible_duplicate_of, first)
+        # the duplicates within the batch
+        self.assertIsNone(third.possible_duplicate_of)
+        self.assertEqual(fourth.possible_duplicate_of, third)
+
+    def test_ingest_leads_errors(self):
+        create_client_example()
+        leads = [
+            # the email of create_client_example()
+            _get_lead(),
+            _get_lead(email='test+client2@hometap.com', street=''),
+            _get_lead(email='test+client3@hometap.com'),
+            _get_lead(email='test+client3@hometap.com'),
+            _get_lead(email='test+client5@hometap.com', phone_number='not a phone'),
+        ]
+        report = ingest_leads(leads)
+        self.assertEqual(report.created, 1)
+        self.assertEqual([row for row, _ in report.errors], [1, 2, 4, 5])
+        self.assertIn('email', report.errors[0][1])
+        self.assertIn('street', report.errors[1][1])
+        self.assertIn('email', report.errors[2][1])
+        self.assertIn('phone_number', report.errors[3][1])
+
+    def test_ingest_leads_rejected(self):
+        leads = [
+            _get_lead(state='MA', zip_code=UNDESIRABLE_ZIP_CODES[0]),
+        ]
+        report = ingest_leads(leads)
+        self.assertEqual(report.created, 0)
+        self.assertEqual(report.rejected, [(1, '3_undesirable_zip_code')])
+        self.assertFalse(Inquiry.objects.exists())
+        rejection = InquiryRejection.objects.get()
+        self.assertEqual(
+            (rejection.state, rejection.zip_code, rejection.outcome_key),
+            ('MA', UNDESIRABLE_ZIP_CODES[0], '3_undesirable_zip_code')
+        )
+        self.assertIsNotNone(rejection.forecast_version)
+
+    def test_ingest_leads_vetted_against_one_snapshot(self):
+        leads = [_get_lead(state='MA', zip_code=UNDESIRABLE_ZIP_CODES[0])]
+        snapshot = get_vetting_snapshot()
+        with mock.patch(
+            'inquiry.ingest.get_vetting_snapshot', return_value=snapshot
+        ) as mocked_get_vetting_snapshot:
+            # the outcomes and the records must not read the current snapshot again
+            with mock.patch('inquiry.outcomes.get_vetting_snapshot', side_effect=AssertionError):
+                ingest_leads(leads)
+        mocked_get_vetting_snapshot.assert_called_once_with()
+        self.assertEqual(InquiryRejection.objects.get().forecast_version, snapshot.version)
+
+
+@override_settings(
+    INQUIRY_INGEST_API_KEYS=['test-key'],
+    ZIP_CODE_FORECAST=pd.
+    read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+)
+class InquiryIngestViewTests(TestCase):
+    def _post(self, body, **extra):
+        return self.client.post(
+            '/inquiry/ingest/?format=jsonl', body, content_type='application/x-ndjson', **extra
+        )
+
+    def test_not_authorized(self):
+        response = self._post(json.dumps(_get_lead()))
+        self.assertEqual(response.status_code, 403)
+        response = self._post(json.dumps(_get_lead()), HTTP_AUTHORIZATION='Bearer wrong-key')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Inquiry.objects.exists())
+
+    def test_ingest(self):
+        response = self._post(json.dumps(_get_lead()), HTTP_AUTHORIZATION='Bearer test-key')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['rows'], 1)
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(Inquiry.objects.count(), 1)
+
+    @override_settings(INQUIRY_QUERY_BUDGET_RAISE=True)
+    def test_ingest_partner_file(self):
+        rows = [
+            _get_lead(email='test+lead{0}@hometap.com'.format(index)) for index in range(50)
+        ]
+        content = io.StringIO()
+        writer = csv.DictWriter(content, fieldnames=list(LEAD_EXAMPLE_DATA))
+        writer.writeheader()
+        writer.writerows(rows)
+        response = self.client.post(
+            '/inquiry/ingest/?format=csv',
+            {'file': SimpleUploadedFile('leads.csv', content.getvalue().encode('utf-8'))},
+            HTTP_AUTHORIZATION='Bearer test-key'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 50)
+        self.assertEqual(Inquiry.objects.count(), 50)
+
+    def test_malformed(self):
+        response = self._post('{not json', HTTP_AUTHORIZATION='Bearer test-key')
+        self.assertEqual(response.status_code, 400)
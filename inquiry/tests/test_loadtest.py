@@ -0,0 +1,38 @@
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from custom_auth.models import Client
+from inquiry.loadtest import DONE_STEP, StressResult, get_percentile, run_stress
+
+
+class StressResultTests(SimpleTestCase):
+    def test_get_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(get_percentile(values, 50), 50)
+        self.assertEqual(get_percentile(values, 99), 99)
+        self.assertEqual(get_percentile([3], 95), 3)
+        self.assertIsNone(get_percentile([], 50))
+
+    def test_stress_result(self):
+        completed = [('get', 200, 0.1), ('first', 302, 0.2), (DONE_STEP, 302, 0.4)]
+        failed = [('get', 200, 0.1), ('first', 500, 0.3)]
+        result = StressResult(2, [completed, failed, []], 2.0, [0, 3, 1])
+        self.assertEqual(result.completed, 1)
+        self.assertEqual(result.errors, 2)
+        self.assertEqual(result.requests, 5)
+        self.assertEqual(result.applicants_per_second, 0.5)
+        self.assertEqual(result.get_latency(50, step='first'), 0.2)
+        self.assertEqual(result.max_lock_waits, 3)
+
+
+@skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+class RunStressTests(LiveServerTestCase):
+    @mock.patch('inquiry.views.segment_event')
+    def test_run_stress(self, mocked_segment_event):
+        result = run_stress(self.live_server_url, concurrency=2, applicants=2)
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(result.completed, 2)
+        self.assertEqual(Client.objects.count(), 2)
+        self.assertIsNotNone(result.get_latency(95, step=DONE_STEP))
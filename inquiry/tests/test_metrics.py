@@ -0,0 +1,231 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from django.conf import settings
+from django.test import TestCase, Client as Browser, override_settings
+
+from inquiry import metrics
+from inquiry.metrics import (
+    MERGED_FILE, REGISTRY, Counter, Histogram, MmapValues, collect, get_exposition,
+    merge_exited_files, reset_metrics_dir, _get_key
+)
+from inquiry.tests.test_views import submit_inquiry_forms
+
+TEST_COUNTER = Counter('inquiry_test_events', 'Test events.', ['kind'])
+TEST_HISTOGRAM = Histogram('inquiry_test_seconds', 'Test latency.', ['kind'], buckets=[0.1, 1])
+
+
+def _increment_in_child(metrics_dir):
+    with override_settings(INQUIRY_METRICS_DIR=metrics_dir):
+        TEST_COUNTER.inc(kind='child')
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        # drop the local counts pending from other tests
+        metrics.fold_local_counts()
+        self.metrics_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(INQUIRY_METRICS_DIR=self.metrics_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.metrics_dir)
+
+    def test_disabled_without_metrics_dir(self):
+        with override_settings(INQUIRY_METRICS_DIR=None):
+            TEST_COUNTER.inc(kind='a')
+        self.assertEqual(collect(self.metrics_dir), {})
+
+    def test_wrong_labels(self):
+        with self.assertRaises(ValueError):
+            TEST_COUNTER.inc(other='a')
+
+    def test_counter(self):
+        TEST_COUNTER.inc(kind='a')
+        TEST_COUNTER.inc(2, kind='a')
+        TEST_COUNTER.inc(kind='b')
+        samples = collect(self.metrics_dir)
+        self.assertEqual(samples[('inquiry_test_events_total', (('kind', 'a'), ))], 3)
+        self.assertEqual(samples[('inquiry_test_events_total', (('kind', 'b'), ))], 1)
+
+    def test_local_counter(self):
+        counter = TEST_COUNTER.local(kind='a')
+        with mock.patch('inquiry.metrics.FOLD_SECONDS', 60), mock.patch(
+            'inquiry.metrics.MmapValues.inc'
+        ) as mocked_inc:
+            counter.inc()
+            counter.inc(2)
+        # counted in the thread until the counts are folded
+        mocked_inc.assert_not_called()
+        metrics.fold_local_counts()
+        TEST_COUNTER.inc(kind='a')
+        samples = collect(self.metrics_dir)
+        self.assertEqual(samples[('inquiry_test_events_total', (('kind', 'a'), ))], 4)
+
+    def test_local_counter_folded(self):
+        counter = TEST_COUNTER.local(kind='a')
+        with mock.patch('inquiry.metrics.FOLD_EVERY', 2):
+            counter.inc()
+            counter.inc()
+        samples = collect(self.metrics_dir)
+        self.assertEqual(samples[('inquiry_test_events_total', (('kind', 'a'), ))], 2)
+
+    def test_local_counter_wrong_labels(self):
+        with self.assertRaises(ValueError):
+            TEST_COUNTER.local(other='a')
+
+    def test_histogram_exposition(self):
+        TEST_HISTOGRAM.observe(0.0625, kind='a')
+        TEST_HISTOGRAM.observe(0.5, kind='a')
+        TEST_HISTOGRAM.observe(5, kind='a')
+        lines = get_exposition(self.metrics_dir).splitlines()
+        start = lines.index('# TYPE inquiry_test_seconds histogram')
+        self.assertEqual(
+            lines[start + 1:start + 6], [
+                'inquiry_test_seconds_bucket{kind="a",le="0.1"} 1.0',
+                'inquiry_test_seconds_bucket{kind="a",le="1.0"} 2.0',
+                'inquiry_test_seconds_bucket{kind="a",le="+Inf"} 3.0',
+                'inquiry_test_seconds_count{kind="a"} 3.0',
+                'inquiry_test_seconds_sum{kind="a"} 5.5625',
+            ]
+        )
+        # every registered metric is described
+        for name in REGISTRY:
+            self.assertIn('# HELP {0} '.format(name), '\n'.join(lines))
+
+    def test_file_grows(self):
+        for index in range(metrics.INITIAL_FILE_SIZE // 32):
+            TEST_COUNTER.inc(kind=str(index))
+        samples = collect(self.metrics_dir)
+        self.assertEqual(len(samples), metrics.INITIAL_FILE_SIZE // 32)
+
+    def test_values_reopened(self):
+        TEST_COUNTER.inc(kind='a')
+        # a new worker with the pid of an exited one
+        path = os.path.join(self.metrics_dir, 'metrics-{0}.db'.format(os.getpid()))
+        MmapValues(path).inc(_get_key('inquiry_test_events_total', {'kind': 'a'}), 1)
+        self.assertEqual(
+            collect(self.metrics_dir)[('inquiry_test_events_total', (('kind', 'a'), ))], 2
+        )
+
+    @unittest.skipIf(not hasattr(os, 'fork'), 'Requires fork')
+    def test_aggregated_across_processes(self):
+        TEST_COUNTER.inc(kind='child')
+        process = multiprocessing.get_context('fork').Process(
+            target=_increment_in_child, args=(self.metrics_dir, )
+        )
+        process.start()
+        process.join()
+        self.assertEqual(len(os.listdir(self.metrics_dir)), 2)
+        self.assertEqual(
+            collect(self.metrics_dir)[('inquiry_test_events_total', (('kind', 'child'), ))], 2
+        )
+
+    def test_merge_exited_files(self):
+        key = _get_key('inquiry_test_events_total', {'kind': 'a'})
+        TEST_COUNTER.inc(kind='a')
+        for pid in (999991, 999992):
+            # files of exited workers, whose locks were released
+            values = MmapValues(os.path.join(self.metrics_dir, 'metrics-{0}.db'.format(pid)))
+            values.inc(key, 2)
+            values.close()
+        samples = collect(self.metrics_dir)
+        self.assertEqual(merge_exited_files(self.metrics_dir), 2)
+        self.assertEqual(collect(self.metrics_dir), samples)
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.metrics_dir) if name.endswith('.db')),
+            sorted(['metrics-{0}.db'.format(os.getpid()), MERGED_FILE])
+        )
+        # the file of this process is in use
+        self.assertEqual(merge_exited_files(self.metrics_dir), 0)
+        TEST_COUNTER.inc(kind='a')
+        self.assertEqual(
+            collect(self.metrics_dir)[('inquiry_test_events_total', (('kind', 'a'), ))], 6
+        )
+
+    def test_reset_metrics_dir(self):
+        TEST_COUNTER.inc(kind='a')
+        self.assertEqual(reset_metrics_dir(self.metrics_dir), 1)
+        self.assertEqual(collect(self.metrics_dir), {})
+
+    @unittest.skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+    def test_profiled_requests_not_timed(self):
+        profile_dir = tempfile.mkdtemp()
+        try:
+            with override_settings(INQUIRY_PROFILE_DIR=profile_dir, INQUIRY_PROFILE_SAMPLE_RATE=1):
+                self.assertEqual(Browser().get('/inquiry/data/first/').status_code, 200)
+        finally:
+            shutil.rmtree(profile_dir)
+        self.assertFalse([
+            sample for sample in collect(self.metrics_dir)
+            if sample[0].startswith('inquiry_wizard_step_seconds')
+        ])
+
+    @unittest.skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+    @override_settings(
+        ZIP_CODE_FORECAST=pd.
+        read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+    )
+    def test_wizard_metrics(self):
+        submit_inquiry_forms(
+            Browser(), 'test+client1@hometap.com', first_overrides={'first-zip_code': '02467'}
+        )
+        samples = collect(self.metrics_dir)
+        self.assertEqual(
+            samples[('inquiry_vetting_outcomes_total', (('outcome', '3_undesirable_zip_code'), ))],
+            1
+        )
+        metrics.fold_local_counts()
+        samples = collect(self.metrics_dir)
+        self.assertEqual(samples[('inquiry_forecast_lookups_total', (('result', 'hit'), ))], 1)
+        self.assertEqual(
+            samples[(
+                'inquiry_wizard_step_seconds_count', (('method', 'POST'), ('step', 'first'))
+            )], 1
+        )
+
+    @unittest.skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+    @mock.patch('inquiry.views.User.objects.create_client', side_effect=ValueError('down'))
+    def test_done_failure_metrics(self, mocked_create_client):
+        submit_inquiry_forms(Browser(), 'test+client1@hometap.com')
+        self.assertEqual(
+            collect(self.metrics_dir)[(
+                'inquiry_done_failures_total', (('stage', 'User+Client save failed'), )
+            )], 1
+        )
+
+
+class InquiryMetricsViewTests(TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.metrics_dir)
+
+    def test_disabled(self):
+        with override_settings(INQUIRY_METRICS_DIR=None):
+            self.assertEqual(self.client.get('/inquiry/metrics/').status_code, 404)
+
+    def test_forbidden(self):
+        with override_settings(
+            INQUIRY_METRICS_DIR=self.metrics_dir, INQUIRY_METRICS_ALLOWED_IPS=['10.0.0.1']
+        ):
+            self.assertEqual(self.client.get('/inquiry/metrics/').status_code, 403)
+
+    @unittest.skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+    def test_scrape(self):
+        with override_settings(
+            INQUIRY_METRICS_DIR=self.metrics_dir, INQUIRY_METRICS_ALLOWED_IPS=['127.0.0.1']
+        ):
+            TEST_COUNTER.inc(kind='a')
+            response = self.client.get('/inquiry/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn(b'inquiry_test_events_total{kind="a"} 1.0', response.content)
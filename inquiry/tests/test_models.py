@@ -1,9 +1,12 @@
 from django.core.exceptions import ValidationError
+from django.db import models
 from django.test import TestCase
 
 from core.tests.test_helpers import create_address_example
 from custom_auth.tests.test_helpers import create_client_example
 from fit_quiz.tests.test_models import create_fit_quiz_example
+from inquiry.columnar import ColumnConverter, get_codes_dtype
+from inquiry.models import Inquiry
 from inquiry.tests.test_utils import create_inquiry_example, INQUIRY_EXAMPLE_DATA
 
 
@@ -35,3 +38,45 @@ class InquiryTests(TestCase):
     def test_full_name_short(self):
         inquiry = create_inquiry_example(self.client, self.address)
         self.assertEqual(inquiry.full_name_short, inquiry.first_name + ' ' + inquiry.last_name)
+
+
+class InquiryQuerySetTests(TestCase):
+    def setUp(self):
+        self.address = create_address_example()
+        self.inquiry = create_inquiry_example(create_client_example(), self.address)
+
+    def test_to_arrays(self):
+        arrays = Inquiry.objects.to_arrays(chunk_size=1)
+        self.assertEqual(list(arrays['id']), [str(self.inquiry.id)])
+        self.assertEqual(arrays['home_value'].dtype, 'int64')
+        self.assertEqual(list(arrays['home_value']), [self.inquiry.home_value])
+        self.assertEqual(arrays['primary_residence'].dtype, 'bool')
+        self.assertEqual(arrays['property_type'].dtype, 'int8')
+        self.assertEqual(list(arrays['address__zip_code']), [self.address.zip_code])
+
+    def test_codes_dtype(self):
+        self.assertEqual(get_codes_dtype(['a', 'b']), 'int8')
+        self.assertEqual(get_codes_dtype([]), 'int8')
+        self.assertEqual(get_codes_dtype(range(128)), 'int8')
+        self.assertEqual(get_codes_dtype(range(129)), 'int16')
+        field = models.CharField(choices=[(str(value), str(value)) for value in range(200)])
+        codes = ColumnConverter(field).convert(['0', '199', 'unknown'])
+        self.assertEqual(codes.dtype, 'int16')
+        self.assertEqual(list(codes), [0, 199, -1])
+
+    def test_to_arrays_empty(self):
+        arrays = Inquiry.objects.none().to_arrays()
+        self.assertEqual(len(arrays['home_value']), 0)
+
+    def test_to_dataframe(self):
+        client = create_client_example(overrides={'email': 'test+client2@hometap.com'})
+        create_inquiry_example(client, create_address_example())
+        df = Inquiry.objects.to_dataframe(chunk_size=1)
+        self.assertEqual(len(df), 2)
+        self.assertEqual(str(df['property_type'].dtype), 'category')
+        self.assertEqual(
+            list(df['property_type'].cat.categories),
+            [value for value, _ in Inquiry.PROPERTY_TYPES]
+        )
+        self.assertEqual(list(df['rent_type']), [self.inquiry.rent_type] * 2)
+        self.assertEqual(str(df['created_at'].dtype), 'datetime64[ns]')
@@ -5,8 +5,13 @@ from django.test import TestCase, override_settings
 
 from core.utils import OPERATIONAL_STATES, EXPANSION_STATES, OTHER_STATES
 from inquiry.outcomes import (
-    INQUIRY_OUTCOME_SLUG_MAP, INQUIRY_OUTCOME_CONTEXTS, get_state_outcome_key,
-    get_zip_code_outcome_key, get_state_zip_code_outcome_key
+    INQUIRY_OUTCOME_SLUG_MAP, INQUIRY_OUTCOME_CONTEXTS, PASSED_OUTCOME_KEY, get_state_outcome_key,
+    get_zip_code_outcome_key, get_state_zip_code_outcome_key, get_state_zip_code_outcome_keys,
+    get_vetting_record
+)
+from inquiry.utils import (
+    ZipCodeForecastSnapshot, get_vetting_snapshot, get_zip_code_forecast,
+    get_zip_code_forecast_version
 )
 from inquiry.tests.test_utils import UNDESIRABLE_ZIP_CODES, NON_UNDESIRABLE_ZIP_CODES
 
@@ -71,3 +76,49 @@ class InquiryOutcomesTests(TestCase):
                 outcome_key, vetted_message = get_state_zip_code_outcome_key(state, zip_code)
                 self.assertIsNone(outcome_key)
                 self.assertEqual(vetted_message, '')
+
+    def test_get_state_zip_code_outcome_keys(self):
+        states_zip_codes = [
+            (state, zip_code)
+            for state in list(OTHER_STATES) + list(EXPANSION_STATES) + list(OPERATIONAL_STATES)
+            for zip_code in UNDESIRABLE_ZIP_CODES + NON_UNDESIRABLE_ZIP_CODES
+        ]
+        self.assertEqual(
+            get_state_zip_code_outcome_keys(states_zip_codes), [
+                get_state_zip_code_outcome_key(state, zip_code)
+                for state, zip_code in states_zip_codes
+            ]
+        )
+
+    def test_get_vetting_record(self):
+        df = get_zip_code_forecast()
+        forecast_value = df.loc[df[settings.ZIP_CODE_COL] == 2467][settings.ZIP_FORECAST_COL]
+        self.assertDictEqual(
+            get_vetting_record('MA', '02467', '3_undesirable_zip_code'), {
+                'outcome_key': '3_undesirable_zip_code',
+                'forecast_value': forecast_value.iloc[0],
+                'forecast_version': get_zip_code_forecast_version(),
+            }
+        )
+
+    def test_get_state_zip_code_outcome_keys_snapshot(self):
+        # an empty snapshot has no data for any zip code
+        snapshot = ZipCodeForecastSnapshot(None)
+        self.assertEqual(
+            get_state_zip_code_outcome_keys([('MA', UNDESIRABLE_ZIP_CODES[0])], snapshot),
+            [(None, '')]
+        )
+        self.assertIsNone(get_zip_code_outcome_key(UNDESIRABLE_ZIP_CODES[0], snapshot))
+
+    def test_get_vetting_record_snapshot(self):
+        snapshot = get_vetting_snapshot()
+        with override_settings(ZIP_CODE_FORECAST_VERSION='2018-11'):
+            with override_settings(ZIP_CODE_FORECAST=settings.ZIP_CODE_FORECAST.copy()):
+                record = get_vetting_record('MA', '02467', '3_undesirable_zip_code', snapshot)
+        self.assertEqual(record['forecast_version'], snapshot.version)
+        self.assertEqual(record['forecast_value'], snapshot.get_value('02467'))
+
+    def test_get_vetting_record_passed_no_data(self):
+        record = get_vetting_record('MA', '00000', None)
+        self.assertEqual(record['outcome_key'], PASSED_OUTCOME_KEY)
+        self.assertIsNone(record['forecast_value'])
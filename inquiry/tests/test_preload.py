@@ -0,0 +1,74 @@
+import gc
+from unittest import mock, skipUnless
+
+import pandas as pd
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from inquiry import utils
+from inquiry.preload import compact_zip_code_forecast, preload
+from inquiry.utils import (
+    get_zip_code_forecast, get_zip_code_forecast_snapshot, undesirable_zip_code
+)
+
+TEST_FORECAST = pd.read_csv(
+    settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv', dtype=str
+)
+
+
+class PreloadTests(TestCase):
+    def tearDown(self):
+        if hasattr(gc, 'unfreeze'):
+            gc.unfreeze()
+
+    def test_compact_zip_code_forecast(self):
+        with override_settings(ZIP_CODE_FORECAST=TEST_FORECAST):
+            clean = get_zip_code_forecast()
+        compact = compact_zip_code_forecast(clean)
+        self.assertEqual(list(compact.columns), [settings.ZIP_CODE_COL, settings.ZIP_FORECAST_COL])
+        self.assertEqual(compact[settings.ZIP_CODE_COL].dtype, 'int32')
+        self.assertFalse((compact.dtypes == object).any())
+        self.assertLess(
+            compact.memory_usage(deep=True).sum(), clean.memory_usage(deep=True).sum()
+        )
+        pd.testing.assert_frame_equal(
+            compact, clean[list(compact.columns)].astype({settings.ZIP_CODE_COL: 'int32'})
+        )
+
+    @override_settings(ZIP_CODE_FORECAST=TEST_FORECAST)
+    def test_preload_replaces_cleaned_forecast(self):
+        clean = get_zip_code_forecast()
+        preload()
+        # the settings are left as loaded
+        self.assertIs(settings.ZIP_CODE_FORECAST, TEST_FORECAST)
+        pd.testing.assert_frame_equal(get_zip_code_forecast(), compact_zip_code_forecast(clean))
+        self.assertTrue(undesirable_zip_code('02072'))
+        self.assertFalse(undesirable_zip_code('02138'))
+
+    @override_settings(ZIP_CODE_FORECAST=TEST_FORECAST)
+    def test_preload_builds_snapshot(self):
+        compact = compact_zip_code_forecast(get_zip_code_forecast())
+        with mock.patch('inquiry.utils._zip_code_forecast_snapshot', None):
+            preload()
+            # built from the compact forecast, before any lookup
+            snapshot = utils._zip_code_forecast_snapshot
+            self.assertIsNotNone(snapshot)
+            self.assertIs(snapshot.source, get_zip_code_forecast())
+            self.assertEqual(list(snapshot.source.columns), list(compact.columns))
+            # the lookups use the snapshot built by preload()
+            self.assertIs(get_zip_code_forecast_snapshot(), snapshot)
+
+    @skipUnless(hasattr(gc, 'freeze'), 'gc.freeze() requires Python 3.7')
+    @override_settings(ZIP_CODE_FORECAST=None)
+    def test_preload_freezes_gc_under_preforking_server(self):
+        with mock.patch.dict('os.environ', {'SERVER_SOFTWARE': 'gunicorn/19.9.0'}):
+            preload()
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+    @skipUnless(hasattr(gc, 'freeze'), 'gc.freeze() requires Python 3.7')
+    @override_settings(ZIP_CODE_FORECAST=None)
+    def test_preload_doesnt_freeze_gc(self):
+        with mock.patch.dict('os.environ', {'SERVER_SOFTWARE': ''}):
+            preload()
+        self.assertEqual(gc.get_freeze_count(), 0)
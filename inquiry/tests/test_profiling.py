@@ -0,0 +1,71 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from inquiry.profiling import get_profiles, profile_request, should_profile
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(INQUIRY_PROFILE_DIR=self.profile_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.profile_dir)
+
+    def _get_request(self, is_staff, **headers):
+        request = RequestFactory().get('/inquiry/data/first/', **headers)
+        request.user = mock.Mock(is_staff=is_staff)
+        return request
+
+    def test_should_profile(self):
+        self.assertFalse(should_profile(self._get_request(False)))
+        self.assertFalse(should_profile(self._get_request(False, HTTP_X_INQUIRY_PROFILE='1')))
+        self.assertFalse(should_profile(self._get_request(True)))
+        self.assertTrue(should_profile(self._get_request(True, HTTP_X_INQUIRY_PROFILE='1')))
+        with override_settings(INQUIRY_PROFILE_DIR=None):
+            self.assertFalse(should_profile(self._get_request(True, HTTP_X_INQUIRY_PROFILE='1')))
+
+    @override_settings(INQUIRY_PROFILE_SAMPLE_RATE=1)
+    def test_should_profile_sampled(self):
+        self.assertTrue(should_profile(self._get_request(False)))
+
+    def test_profile_request(self):
+        response = profile_request('first', 'POST', HttpResponse, 'content')
+        self.assertEqual(response.content, b'content')
+        profiles = get_profiles(self.profile_dir)
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual((profiles[0].step, profiles[0].method), ('first', 'POST'))
+
+    def test_get_profiles(self):
+        for name in [
+            'first-POST-12ms-1700000000-1.prof', 'home-GET-250ms-1700000000-1.prof',
+            'first-GET-40ms-1700000000-2.prof', 'other.txt'
+        ]:
+            open(os.path.join(self.profile_dir, name), 'w').close()
+        self.assertEqual([profile.ms for profile in get_profiles(self.profile_dir)], [250, 40, 12])
+        self.assertEqual(
+            [profile.ms for profile in get_profiles(self.profile_dir, step='first')], [40, 12]
+        )
+
+    @unittest.skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+    @override_settings(INQUIRY_PROFILE_SAMPLE_RATE=1)
+    def test_wizard_request_profiled(self):
+        response = self.client.get('/inquiry/data/first/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([profile.step for profile in get_profiles(self.profile_dir)], ['first'])
+
+        out = io.StringIO()
+        call_command('show_inquiry_profiles', stdout=out)
+        self.assertIn('GET first', out.getvalue())
+        self.assertIn('function calls', out.getvalue())
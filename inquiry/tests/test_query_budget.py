@@ -0,0 +1,72 @@
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, Client as Browser, override_settings
+
+from inquiry.models import Inquiry
+from inquiry.query_budget import QUERY_COUNT_HEADER, QueryBudgetExceeded, QueryCounter, query_budget
+from inquiry.tests.test_views import submit_inquiry_forms
+
+
+def _view(request, queries=1):
+    for _ in range(queries):
+        Inquiry.objects.filter(first_name='Bob').exists()
+    return HttpResponse('ok')
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def test_query_counter(self):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            Inquiry.objects.filter(first_name='Bob').exists()
+            Inquiry.objects.filter(first_name='Bob').exists()
+            Inquiry.objects.filter(first_name='Jane').exists()
+        self.assertEqual(counter.count, 3)
+        self.assertEqual(counter.duplicates, 1)
+        self.assertIn('first_name', counter.get_most_repeated()[0])
+
+    @override_settings(INQUIRY_QUERY_BUDGET_RAISE=True)
+    def test_within_budget(self):
+        response = query_budget(2)(_view)(self.request, queries=2)
+        self.assertEqual(response.content, b'ok')
+        self.assertNotIn(QUERY_COUNT_HEADER, response)
+
+    @override_settings(INQUIRY_QUERY_BUDGET_RAISE=True)
+    def test_over_budget_raises(self):
+        with self.assertRaisesMessage(
+            QueryBudgetExceeded, '_view ran 3 queries over its budget of 2, 2 repeated'
+        ):
+            query_budget(2)(_view)(self.request, queries=3)
+
+    @override_settings(INQUIRY_QUERY_BUDGET_RAISE=False)
+    @mock.patch('inquiry.query_budget.logger')
+    def test_over_budget_logged(self, mocked_logger):
+        response = query_budget(0, name='test')(_view)(self.request)
+        self.assertEqual(response.content, b'ok')
+        self.assertTrue(mocked_logger.warning.call_args[0][0].startswith('test ran 1 queries'))
+
+    @override_settings(INQUIRY_QUERY_BUDGET_RAISE=True, INQUIRY_QUERY_BUDGETS={'test': 3})
+    def test_budget_setting(self):
+        query_budget(0, name='test')(_view)(self.request, queries=3)
+
+    @override_settings(INQUIRY_QUERY_COUNT_HEADER=True)
+    def test_query_count_header(self):
+        response = query_budget(None)(_view)(self.request, queries=2)
+        self.assertEqual(response[QUERY_COUNT_HEADER], '2')
+
+    @skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+    @override_settings(INQUIRY_QUERY_BUDGET_RAISE=True, INQUIRY_QUERY_COUNT_HEADER=True)
+    def test_inquiry_views_within_budgets(self):
+        browser = Browser()
+        response = browser.get('/inquiry/data/first/')
+        self.assertIn(QUERY_COUNT_HEADER, response)
+        response = submit_inquiry_forms(browser, 'test+client1@hometap.com')
+        self.assertIn(QUERY_COUNT_HEADER, response)
+        response = browser.get('/inquiry/submitted/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(QUERY_COUNT_HEADER, response)
@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.http import QueryDict
+from django.test import LiveServerTestCase, TestCase, Client as Browser, override_settings
+
+from custom_auth.models import Client
+from inquiry.recording import (
+    EMAIL_PLACEHOLDER, PHONE_PLACEHOLDER, anonymize_fields, mask_value, read_sessions,
+    replay_sessions, summarize_replay, unmask_value
+)
+from inquiry.tests.test_views import SIGNUP_DATA, submit_inquiry_forms
+
+
+class AnonymizeTests(TestCase):
+    def test_mask_value(self):
+        self.assertEqual(mask_value('20 Main St.'), '~99 Aaaa Aa.')
+        self.assertEqual(unmask_value('~99 Aaaa Aa.', 'a@b.com'), '55 Xxxx Xx.')
+        self.assertEqual(unmask_value('MA', 'a@b.com'), 'MA')
+        self.assertEqual(unmask_value(EMAIL_PLACEHOLDER, 'a@b.com'), 'a@b.com')
+
+    def test_anonymize_fields(self):
+        fields = anonymize_fields(
+            QueryDict(
+                'csrfmiddlewaretoken=abc&first-street=20+Main+St&first-state=MA&'
+                'first-zip_code=02138&first-email=bob%40example.com&first-use_case_debts=on'
+            )
+        )
+        self.assertEqual(
+            dict(fields), {
+                'first-street': ['~99 Aaaa Aa'],
+                'first-state': ['MA'],
+                'first-zip_code': ['02138'],
+                'first-email': [EMAIL_PLACEHOLDER],
+                'first-use_case_debts': ['on'],
+            }
+        )
+
+    def test_anonymize_fields_drops_passwords(self):
+        fields = anonymize_fields(
+            QueryDict(
+                'signup-phone_number=617-399-0604&signup-password1=Secret123&'
+                'signup-password2=Secret123'
+            )
+        )
+        self.assertEqual(dict(fields), {'signup-phone_number': [PHONE_PLACEHOLDER]})
+
+
+def _read_records(recording_dir):
+    records = []
+    for name in os.listdir(recording_dir):
+        with open(os.path.join(recording_dir, name)) as recording_file:
+            records.extend(json.loads(line) for line in recording_file)
+    return records
+
+
+@skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+class RecordingTests(TestCase):
+    def setUp(self):
+        self.recording_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.recording_dir)
+
+    def test_disabled(self):
+        with override_settings(INQUIRY_RECORDING_DIR=None):
+            submit_inquiry_forms(Browser(), 'test+client1@hometap.com')
+        self.assertEqual(os.listdir(self.recording_dir), [])
+
+    def test_record(self):
+        with override_settings(INQUIRY_RECORDING_DIR=self.recording_dir):
+            submit_inquiry_forms(Browser(), 'test+client1@hometap.com')
+            submit_inquiry_forms(Browser(), 'test+client2@hometap.com')
+        records = _read_records(self.recording_dir)
+        self.assertEqual(
+            [(record['method'], record['step']) for record in records[:5]],
+            [('POST', 'first'), ('POST', 'home'), ('POST', 'homeowner'), ('POST', 'signup'),
+             ('GET', 'done')]
+        )
+        self.assertEqual(records[0]['fields']['first-email'], [EMAIL_PLACEHOLDER])
+        self.assertEqual(records[0]['fields']['first-zip_code'], ['02138'])
+        self.assertTrue(records[0]['fields']['first-street'][0].startswith('~'))
+        self.assertEqual(records[4]['location'], '/inquiry/submitted/')
+        self.assertNotIn('test+client1', json.dumps(records))
+        # neither the passwords nor their masks
+        self.assertFalse(
+            [name for record in records for name in record['fields'] if 'password' in name]
+        )
+        self.assertNotIn(mask_value(SIGNUP_DATA['signup-password1']), json.dumps(records))
+
+        sessions = read_sessions(self.recording_dir)
+        self.assertEqual([len(session) for session in sessions], [5, 5])
+
+
+@skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+class ReplayTests(LiveServerTestCase):
+    def setUp(self):
+        self.recording_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.recording_dir)
+
+    @mock.patch('inquiry.views.segment_event')
+    def test_replay(self, mocked_segment_event):
+        with override_settings(INQUIRY_RECORDING_DIR=self.recording_dir):
+            submit_inquiry_forms(Browser(), 'test+client1@hometap.com')
+        sessions = read_sessions(self.recording_dir)
+
+        with override_settings(INQUIRY_QUERY_COUNT_HEADER=True):
+            summary = summarize_replay(replay_sessions(self.live_server_url, sessions))
+        self.assertEqual(summary[('GET', 'done')]['statuses'], [302])
+        self.assertEqual(len(summary[('POST', 'first')]['queries']), 1)
+        self.assertEqual(Client.objects.count(), 2)
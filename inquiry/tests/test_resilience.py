@@ -0,0 +1,207 @@
+import glob
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from inquiry.resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, call_with_resilience, flush_spool, reset_breakers,
+    spool
+)
+from inquiry.side_effects import run_side_effect
+
+calls = []
+
+
+def succeeding_side_effect(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+def failing_side_effect(*args, **kwargs):
+    raise ValueError('down')
+
+
+def hanging_side_effect(*args, **kwargs):
+    time.sleep(0.5)
+
+
+def hanging_failing_side_effect(*args, **kwargs):
+    time.sleep(0.5)
+    raise ValueError('down')
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_failures(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, slow_call=1.0, reset_timeout=30)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_slow_calls_are_failures(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, slow_call=1.0, reset_timeout=30)
+        breaker.record_success(0.5)
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_success(2.0)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_half_open(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, slow_call=1.0, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        # a single trial call
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertTrue(breaker.allow())
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CLOSED)
+
+
+class CallWithResilienceTests(SimpleTestCase):
+    def setUp(self):
+        reset_breakers()
+        del calls[:]
+        self.spool_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            INQUIRY_SPOOL_DIR=self.spool_dir, INQUIRY_CIRCUIT_FAILURE_THRESHOLD=2
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.spool_dir)
+        reset_breakers()
+
+    def _read_spool(self):
+        spooled = []
+        for path in glob.glob(os.path.join(self.spool_dir, 'spool-*.jsonl')):
+            with open(path) as spool_file:
+                spooled.extend(json.loads(line) for line in spool_file)
+        return spooled
+
+    def test_success(self):
+        self.assertTrue(call_with_resilience(succeeding_side_effect, ('a',), {'b': 'c'}, 1.0))
+        self.assertEqual(calls, [(('a',), {'b': 'c'})])
+        self.assertEqual(self._read_spool(), [])
+
+    @mock.patch('inquiry.resilience.logger')
+    def test_failure_spooled(self, mocked_logger):
+        self.assertFalse(call_with_resilience(failing_side_effect, ('a',), {'b': 'c'}, 1.0))
+        mocked_logger.error.assert_called_once_with('Side effect failing_side_effect failed down')
+        spooled = self._read_spool()
+        self.assertEqual(len(spooled), 1)
+        # the time of the call is spooled for the retention
+        self.assertAlmostEqual(spooled[0].pop('time'), time.time(), delta=60)
+        self.assertEqual(
+            spooled, [{
+                'func': 'inquiry.tests.test_resilience.failing_side_effect',
+                'args': ['a'],
+                'kwargs': {'b': 'c'}
+            }]
+        )
+
+    def test_timeout_opens_circuit(self):
+        for _ in range(2):
+            started = time.perf_counter()
+            self.assertFalse(call_with_resilience(hanging_side_effect, (), {}, 0.05))
+            self.assertLess(time.perf_counter() - started, 0.4)
+        with mock.patch('inquiry.resilience._get_executor') as mocked_get_executor:
+            # fails fast without calling
+            self.assertFalse(call_with_resilience(hanging_side_effect, (), {}, 0.05))
+            mocked_get_executor.assert_not_called()
+        time.sleep(0.6)
+        # the timed out calls completed, only the rejected one is spooled
+        self.assertEqual(len(self._read_spool()), 1)
+
+    @mock.patch('inquiry.resilience.logger')
+    def test_timed_out_failure_spooled(self, mocked_logger):
+        self.assertFalse(call_with_resilience(hanging_failing_side_effect, (), {}, 0.05))
+        self.assertEqual(self._read_spool(), [])
+        time.sleep(0.6)
+        self.assertEqual(
+            [spooled['func'] for spooled in self._read_spool()],
+            ['inquiry.tests.test_resilience.hanging_failing_side_effect']
+        )
+
+    def test_spool_permissions(self):
+        spool(succeeding_side_effect, (), {})
+        for path in glob.glob(os.path.join(self.spool_dir, 'spool-*.jsonl')):
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+
+    @mock.patch('inquiry.resilience.logger')
+    def test_flush_spool(self, mocked_logger):
+        spool(failing_side_effect, (), {})
+        spool(succeeding_side_effect, ('a',), {'b': 'c'})
+        self.assertEqual(flush_spool(self.spool_dir), (1, 1, 0))
+        self.assertEqual(calls, [(('a',), {'b': 'c'})])
+        # the failing side effect is spooled again
+        self.assertEqual(
+            [spooled['func'] for spooled in self._read_spool()],
+            ['inquiry.tests.test_resilience.failing_side_effect']
+        )
+
+    @mock.patch('inquiry.resilience.logger')
+    def test_flush_keeps_spool_time(self, mocked_logger):
+        spool(failing_side_effect, (), {})
+        spooled_at = self._read_spool()[0]['time']
+        self.assertEqual(flush_spool(self.spool_dir), (0, 1, 0))
+        # spooled again with the time it was first spooled, so that it expires
+        self.assertEqual([spooled['time'] for spooled in self._read_spool()], [spooled_at])
+
+    @mock.patch('inquiry.resilience.logger')
+    def test_flush_stops_at_open_circuit(self, mocked_logger):
+        for _ in range(3):
+            spool(failing_side_effect, (), {})
+        spool(succeeding_side_effect, ('a',), {})
+        # the circuit opens after the second failure
+        self.assertEqual(flush_spool(self.spool_dir), (0, 2, 0))
+        self.assertEqual(calls, [])
+        self.assertEqual(len(self._read_spool()), 2)
+        # the remaining calls are left for the next flush
+        claimed = glob.glob(os.path.join(self.spool_dir, 'spool-*.flushing'))
+        self.assertEqual(len(claimed), 1)
+        with open(claimed[0] + '.offset') as offset_file:
+            self.assertEqual(offset_file.read(), '2')
+
+    @mock.patch('inquiry.resilience.logger')
+    def test_flush_interrupted_spool(self, mocked_logger):
+        spool(succeeding_side_effect, ('a',), {})
+        spool(succeeding_side_effect, ('b',), {})
+        with mock.patch('inquiry.tests.test_resilience.calls') as mocked_calls:
+            # the flush is interrupted after the first call
+            mocked_calls.append.side_effect = [None, KeyboardInterrupt]
+            with self.assertRaises(KeyboardInterrupt):
+                flush_spool(self.spool_dir)
+        self.assertEqual(flush_spool(self.spool_dir), (1, 0, 0))
+        self.assertEqual(calls, [(('b',), {})])
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    @mock.patch('inquiry.resilience.logger')
+    def test_flush_unknown_side_effect(self, mocked_logger):
+        spool(succeeding_side_effect, (), {})
+        with mock.patch('inquiry.resilience.import_string', side_effect=ImportError):
+            self.assertEqual(flush_spool(self.spool_dir), (0, 1, 0))
+        self.assertEqual(len(self._read_spool()), 1)
+
+    @override_settings(INQUIRY_SPOOL_RETENTION=0)
+    @mock.patch('inquiry.resilience.logger')
+    def test_flush_expired(self, mocked_logger):
+        spool(succeeding_side_effect, (), {})
+        time.sleep(0.01)
+        self.assertEqual(flush_spool(self.spool_dir), (0, 0, 1))
+        self.assertEqual(calls, [])
+
+    @override_settings(INQUIRY_BACKGROUND_SIDE_EFFECTS=False, INQUIRY_SIDE_EFFECT_TIMEOUT=0.05)
+    def test_run_side_effect_inline_does_not_raise(self):
+        run_side_effect(hanging_side_effect)
+        with mock.patch('inquiry.resilience.logger'):
+            run_side_effect(failing_side_effect)
+        self.assertEqual(len(self._read_spool()), 1)
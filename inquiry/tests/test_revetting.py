@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+import pandas as pd
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from core.tests.test_helpers import create_address_example
+from custom_auth.tests.test_helpers import create_client_example
+from inquiry.revetting import (
+    PASSED, get_shard_path, get_shards, merge_results, revet_inquiries, revet_shard
+)
+from inquiry.tests.test_utils import create_inquiry_example, UNDESIRABLE_ZIP_CODES
+from inquiry.utils import get_zip_code_forecast_snapshot
+
+
+class GetShardsTests(TestCase):
+    def test_get_shards(self):
+        shards = get_shards(3)
+        self.assertEqual([index for index, _, _ in shards], [0, 1, 2])
+        self.assertEqual(shards[0][1], uuid.UUID(int=0))
+        self.assertIsNone(shards[-1][2])
+        # shards are contiguous
+        for (_, _, high), (_, low, _) in zip(shards, shards[1:]):
+            self.assertEqual(high, low)
+
+
+@override_settings(
+    ZIP_CODE_FORECAST=pd.
+    read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+)
+class RevetTests(TestCase):
+    def setUp(self):
+        self.checkpoint_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.checkpoint_dir)
+
+    def test_revet_shard(self):
+        address = create_address_example()
+        address.zip_code = UNDESIRABLE_ZIP_CODES[0]
+        address.save()
+        inquiry = create_inquiry_example(create_client_example(), address)
+
+        result = revet_shard(get_shards(1)[0], get_zip_code_forecast_snapshot())
+        self.assertEqual(result['shard'], 0)
+        self.assertEqual(result['counts'], {'3_undesirable_zip_code': 1})
+        self.assertEqual(result['rejected'], [[str(inquiry.id), '3_undesirable_zip_code']])
+
+    def test_revet_inquiries_resume(self):
+        # all shards are checkpointed so nothing is re-evaluated
+        for index in range(2):
+            with open(get_shard_path(self.checkpoint_dir, index, 2), 'w') as checkpoint_file:
+                json.dump({
+                    'shard': index,
+                    'counts': {PASSED: 2, '1_other_states': 1},
+                    'rejected': [[str(uuid.uuid4()), '1_other_states']],
+                }, checkpoint_file)
+        results = revet_inquiries(self.checkpoint_dir, workers=2, shard_count=2)
+        self.assertEqual(results, merge_results(self.checkpoint_dir, 2))
+        self.assertEqual(results['counts'], {PASSED: 4, '1_other_states': 2})
+        self.assertEqual(len(results['rejected']), 2)
+        self.assertTrue(os.path.exists(get_shard_path(self.checkpoint_dir, 1, 2)))
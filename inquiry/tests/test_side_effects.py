@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from inquiry.side_effects import run_side_effect, wait_for_side_effects
+
+
+class RunSideEffectTests(TestCase):
+    def tearDown(self):
+        wait_for_side_effects()
+
+    @override_settings(INQUIRY_BACKGROUND_SIDE_EFFECTS=False)
+    @mock.patch('inquiry.side_effects.get_executor')
+    def test_inline(self, mocked_get_executor):
+        side_effect = mock.Mock(__name__='side_effect')
+        run_side_effect(side_effect, 'a', b='c')
+        side_effect.assert_called_once_with('a', b='c')
+        mocked_get_executor.assert_not_called()
+
+    @override_settings(INQUIRY_BACKGROUND_SIDE_EFFECTS=False)
+    def test_inline_raises(self):
+        side_effect = mock.Mock(__name__='side_effect', side_effect=ValueError)
+        with self.assertRaises(ValueError):
+            run_side_effect(side_effect)
+
+    @override_settings(INQUIRY_BACKGROUND_SIDE_EFFECTS=True)
+    def test_background(self):
+        side_effect = mock.Mock(__name__='side_effect')
+        run_side_effect(side_effect, 'a', b='c')
+        wait_for_side_effects()
+        side_effect.assert_called_once_with('a', b='c')
+
+    @override_settings(INQUIRY_BACKGROUND_SIDE_EFFECTS=True)
+    @mock.patch('inquiry.side_effects.logger')
+    def test_background_failure_logged(self, mocked_logger):
+        side_effect = mock.Mock(__name__='side_effect', side_effect=ValueError('down'))
+        run_side_effect(side_effect)
+        wait_for_side_effects()
+        mocked_logger.error.assert_called_once_with('Side effect side_effect failed down')
@@ -0,0 +1,85 @@
+from unittest import mock, skipUnless
+
+import pandas as pd
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from custom_auth.models import Client
+from inquiry.models import Inquiry
+from inquiry.outcomes import PASSED_OUTCOME_KEY, get_state_zip_code_outcome_key
+from inquiry.synthetic import (
+    InquiryGenerator, generate_inquiries, get_forecast_zip_codes, get_zip_code_state
+)
+
+
+@override_settings(
+    ZIP_CODE_FORECAST=pd.
+    read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+)
+class SyntheticInquiryTests(TestCase):
+    def test_generator(self):
+        zip_codes = get_forecast_zip_codes()
+        generator = InquiryGenerator(zip_codes, ['MA'], seed=1)
+        user, client, address, inquiry = generator.generate()
+        self.assertIn(address.zip_code, zip_codes)
+        self.assertEqual(address.state, 'MA')
+        self.assertEqual(inquiry.first_name, user.first_name)
+        self.assertEqual(
+            inquiry.outcome_key,
+            get_state_zip_code_outcome_key('MA', address.zip_code)[0] or PASSED_OUTCOME_KEY
+        )
+        self.assertIn(inquiry.property_type, dict(Inquiry.PROPERTY_TYPES))
+        # the values are the same for the same seed
+        other = InquiryGenerator(zip_codes, ['MA'], seed=1).generate()
+        self.assertEqual(other[2].street, address.street)
+        self.assertNotEqual(other[0].email, user.email)
+
+    def test_generator_vets_zip_codes(self):
+        generator = InquiryGenerator(['02072', '02138'], ['MA'], seed=1)
+        inquiries = [generator.generate()[3] for _ in range(20)]
+        outcome_keys = {
+            inquiry.address.zip_code: inquiry.outcome_key
+            for inquiry in inquiries
+        }
+        self.assertEqual(
+            outcome_keys, {
+                '02072': '3_undesirable_zip_code',
+                '02138': PASSED_OUTCOME_KEY
+            }
+        )
+
+    def test_generator_draws_zip_codes_in_states(self):
+        generator = InquiryGenerator(['02138', '94110'], ['CA'], seed=1)
+        for _ in range(5):
+            address = generator.generate()[2]
+            self.assertEqual((address.state, address.zip_code), ('CA', '94110'))
+
+    def test_get_zip_code_state(self):
+        self.assertEqual(get_zip_code_state('02138'), 'MA')
+        self.assertEqual(get_zip_code_state('10001'), 'NY')
+        self.assertEqual(get_zip_code_state('94110'), 'CA')
+        self.assertIsNone(get_zip_code_state('09001'))
+
+    def test_generator_without_zip_codes(self):
+        with self.assertRaises(ValueError):
+            InquiryGenerator([], ['MA'])
+        with self.assertRaises(ValueError):
+            InquiryGenerator(['02138'], ['CA'])
+
+    @skipUnless(
+        connection.features.can_return_ids_from_bulk_insert,
+        'Requires primary keys returned by bulk inserts'
+    )
+    @mock.patch('inquiry.models.send_new_inquiry_email')
+    def test_generate_inquiries(self, mocked_send_new_inquiry_email):
+        progress = mock.Mock()
+        self.assertEqual(generate_inquiries(5, ['MA', 'CA'], chunk_size=2, progress=progress), 5)
+        self.assertEqual([call[0][0] for call in progress.call_args_list], [2, 4, 5])
+        self.assertEqual(Inquiry.objects.count(), 5)
+        self.assertEqual(Client.objects.count(), 5)
+        self.assertFalse(Inquiry.objects.filter(zip5__isnull=True).exists())
+        # the test forecast only has Massachusetts zip codes
+        self.assertFalse(Inquiry.objects.exclude(state='MA').exists())
+        mocked_send_new_inquiry_email.assert_not_called()
@@ -1,12 +1,27 @@
+import os
+import shutil
+import stat
+import tempfile
 from math import nan
+from unittest import mock
 
 import pandas as pd
 
+from django.apps import apps
 from django.conf import settings
-from django.test import TestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from formtools.wizard.storage.session import SessionStorage
 
+from inquiry.forecast import ForecastValidationError
 from inquiry.models import Inquiry
-from inquiry.utils import get_desirable_zip_codes, undesirable_zip_code
+from inquiry.utils import (
+    CustomFormToolsSessionStorage, get_desirable_zip_codes, get_zip_code_forecast,
+    get_zip_code_forecast_value, get_zip_code_forecast_snapshot, get_zip_code_forecast_version,
+    get_zip5, undesirable_zip_code, undesirable_zip_codes, write_file_atomically
+)
 
 INQUIRY_EXAMPLE_DATA = {
     # 'client': client,
@@ -124,6 +139,12 @@ class GetDesirableZipCodesTests(TestCase):
         self.assertTrue('02171' in zips)  # zip code forecast is equal to settings.ZIP_RISK_VALUE
         self.assertTrue('02138' in zips)
 
+    @override_settings(ZIP_CODE_FORECAST=DF_DATA)
+    def test_snapshot_zip_codes(self):
+        snapshot = get_zip_code_forecast_snapshot()
+        self.assertEqual(snapshot.zip_codes, {2445, 2457, 2171, 2030, 2138})
+        self.assertEqual(snapshot.desirable_zip_codes, {'02445', '02171', '02138'})
+
 
 @override_settings(
     ZIP_CODE_FORECAST=pd.
@@ -143,3 +164,163 @@ class UndesirableZipCodeTests(TestCase):
     def test_undesirable_zip_code_desirable(self):
         for zip_code in NON_UNDESIRABLE_ZIP_CODES:
             self.assertFalse(undesirable_zip_code(zip_code))
+
+    def test_undesirable_zip_codes(self):
+        zip_codes = UNDESIRABLE_ZIP_CODES + NON_UNDESIRABLE_ZIP_CODES
+        self.assertEqual(
+            undesirable_zip_codes(zip_codes),
+            [undesirable_zip_code(zip_code) for zip_code in zip_codes]
+        )
+
+
+class CustomFormToolsSessionStorageTests(TestCase):
+    def setUp(self):
+        request = RequestFactory().get('/fake-path')
+        SessionMiddleware().process_request(request)
+        request.session.save()
+        self.storage = CustomFormToolsSessionStorage('inquiry_apply_wizard', request)
+        self.storage.set_step_data('first', QueryDict('first-email=test%40hometap.com'))
+
+    def test_get_step_data_decoded_once_per_request(self):
+        with mock.patch.object(
+            SessionStorage, 'get_step_data', autospec=True, side_effect=SessionStorage.get_step_data
+        ) as mocked_get_step_data:
+            for _ in range(3):
+                step_data = self.storage.get_step_data('first')
+                self.assertEqual(step_data.getlist('first-email'), ['test@hometap.com'])
+        self.assertEqual(mocked_get_step_data.call_count, 1)
+
+    def test_set_step_data_invalidates(self):
+        self.storage.get_step_data('first')
+        self.storage.set_step_data('first', QueryDict('first-email=other%40hometap.com'))
+        self.assertEqual(
+            self.storage.get_step_data('first').getlist('first-email'), ['other@hometap.com']
+        )
+
+    def test_reset_invalidates(self):
+        self.storage.get_step_data('first')
+        self.storage.reset()
+        self.assertIsNone(self.storage.get_step_data('first'))
+
+
+@override_settings(
+    ZIP_CODE_FORECAST=pd.
+    read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+)
+class ZipCodeForecastDetailsTests(TestCase):
+    def test_get_zip_code_forecast_value(self):
+        self.assertIsInstance(get_zip_code_forecast_value('02445'), float)
+        self.assertIsNone(get_zip_code_forecast_value('00000'))
+        self.assertIsNone(get_zip_code_forecast_value('abcde'))
+
+    def test_get_zip_code_forecast_version(self):
+        version = get_zip_code_forecast_version()
+        self.assertEqual(len(version), 12)
+        # the same forecast content has the same version
+        with override_settings(ZIP_CODE_FORECAST=settings.ZIP_CODE_FORECAST.copy()):
+            self.assertEqual(get_zip_code_forecast_version(), version)
+
+    def test_get_zip_code_forecast_version_setting(self):
+        with override_settings(ZIP_CODE_FORECAST_VERSION='2018-11'):
+            # the version is cached with the forecast, so change the forecast too
+            with override_settings(ZIP_CODE_FORECAST=settings.ZIP_CODE_FORECAST.copy()):
+                self.assertEqual(get_zip_code_forecast_version(), '2018-11')
+
+
+@override_settings(
+    ZIP_CODE_FORECAST=pd.
+    read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+)
+class ZipCodeForecastSnapshotTests(TestCase):
+    def test_snapshot(self):
+        snapshot = get_zip_code_forecast_snapshot()
+        self.assertIs(get_zip_code_forecast_snapshot(), snapshot)
+        self.assertEqual(
+            set(snapshot.desirable_zip_codes), set(get_desirable_zip_codes(snapshot.source))
+        )
+        for zip_code in UNDESIRABLE_ZIP_CODES:
+            self.assertTrue(snapshot.is_undesirable(zip_code))
+        for zip_code in NON_UNDESIRABLE_ZIP_CODES + ['00000', 'abcde']:
+            self.assertFalse(snapshot.is_undesirable(zip_code))
+
+    def test_immutable(self):
+        snapshot = get_zip_code_forecast_snapshot()
+        with self.assertRaises(AttributeError):
+            snapshot.version = 'changed'
+        with self.assertRaises(TypeError):
+            snapshot.values[2138] = 1.0
+        with self.assertRaises(AttributeError):
+            snapshot.zip_codes.add(2138)
+
+    def test_replaced_with_forecast(self):
+        snapshot = get_zip_code_forecast_snapshot()
+        with override_settings(ZIP_CODE_FORECAST=settings.ZIP_CODE_FORECAST.copy()):
+            self.assertIsNot(get_zip_code_forecast_snapshot(), snapshot)
+        with override_settings(ZIP_RISK_VALUE=-1000):
+            self.assertEqual(get_zip_code_forecast_snapshot().risk_value, -1000)
+            for zip_code in UNDESIRABLE_ZIP_CODES:
+                self.assertFalse(undesirable_zip_code(zip_code))
+
+    @override_settings(ZIP_CODE_FORECAST=None)
+    @mock.patch('inquiry.utils.logger')
+    def test_no_forecast(self, mocked_logger):
+        self.assertIsNone(get_zip_code_forecast_snapshot())
+        self.assertFalse(undesirable_zip_code('02138'))
+        self.assertEqual(undesirable_zip_codes(['02138', '02072']), [False, False])
+        self.assertEqual(mocked_logger.error.call_count, 2)
+
+
+@override_settings(
+    ZIP_CODE_FORECAST=pd.
+    read_csv(settings.PROJECT_PATH + '/apps/inquiry/tests/test_data/test_zip_codes.csv')
+)
+class PrepareZipCodeForecastTests(TestCase):
+    def test_invalid_forecast_fails_startup(self):
+        with mock.patch(
+            'inquiry.utils.clean_zip_code_forecast',
+            side_effect=ForecastValidationError('The forecast has no valid zip codes')
+        ):
+            with self.assertRaises(ImproperlyConfigured):
+                apps.get_app_config('inquiry').ready()
+
+    @mock.patch('inquiry.utils.clean_zip_code_forecast')
+    def test_lookups_dont_clean(self, mocked_clean_zip_code_forecast):
+        self.assertIsNotNone(get_zip_code_forecast())
+        self.assertTrue(undesirable_zip_code(UNDESIRABLE_ZIP_CODES[0]))
+        mocked_clean_zip_code_forecast.assert_not_called()
+
+    def test_cleaned_when_overridden(self):
+        clean = get_zip_code_forecast()
+        with override_settings(ZIP_CODE_FORECAST=settings.ZIP_CODE_FORECAST.copy()):
+            self.assertIsNot(get_zip_code_forecast(), clean)
+            pd.testing.assert_frame_equal(get_zip_code_forecast(), clean)
+
+
+class WriteFileAtomicallyTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_file_atomically(self):
+        path = os.path.join(self.directory, 'file')
+        write_file_atomically(path, b'first')
+        write_file_atomically(path, b'second', mode=0o600)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'second')
+        self.assertEqual(os.listdir(self.directory), ['file'])
+
+    def test_mode(self):
+        path = os.path.join(self.directory, 'file')
+        write_file_atomically(path, b'content', mode=0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+
+
+class GetZip5Tests(TestCase):
+    def test_get_zip5(self):
+        self.assertEqual(get_zip5('02138'), 2138)
+        self.assertEqual(get_zip5('02138-1234'), 2138)
+        self.assertEqual(get_zip5(' 021381234 '), 2138)
+        for zip_code in ['', None, '2138', 'abcde', '02138-12']:
+            self.assertIsNone(get_zip5(zip_code))
@@ -1,11 +1,18 @@
 import copy
+import json
+import threading
+from datetime import timedelta
 from unittest import mock, skipIf
 
 import pandas as pd
 
 from django.conf import settings
-from django.test import TestCase, RequestFactory, Client as Browser, override_settings
+from django.db import connection
+from django.test import (
+    TestCase, TransactionTestCase, RequestFactory, Client as Browser, override_settings
+)
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 
 from core.models import Address
@@ -18,11 +25,14 @@ from custom_auth.tests.test_helpers import (
 )
 from fit_quiz.views import FIT_QUIZ_SESSION_DATA_PREFIX
 from inquiry.forms import InquiryFirstForm, InquiryHomeForm, WizardClientUserCreationForm
-from inquiry.models import Inquiry
-from inquiry.outcomes import INQUIRY_OUTCOME_SLUG_MAP
+from inquiry.models import Inquiry, InquiryRejection, InquirySubmission
+from inquiry.outcomes import INQUIRY_OUTCOME_SLUG_MAP, PASSED_OUTCOME_KEY
 from inquiry.tests.test_forms import FIRST_FORM_EXAMPLE_DATA, HOME_FORM_EXAMPLE_DATA
 from inquiry.tests.test_utils import create_inquiry_example, UNDESIRABLE_ZIP_CODES
-from inquiry.views import InquiryApplyWizard, InquirySubmitted, _get_inquiry_segment_event_data
+from inquiry.views import (
+    InquiryApplyWizard, InquirySubmitted, SUBMISSION_KEY, VALIDATED_STEPS_KEY,
+    _get_inquiry_segment_event_data
+)
 from stages.models import InquiryInReview
 
 FIRST_DATA = {
@@ -57,6 +67,15 @@ HOMEOWNER_DATA = {
     'homeowner-when_interested': '7_to_12_months',
     "submit": "Next",
 }
+SIGNUP_DATA = {
+    "inquiry_apply_wizard-current_step": "signup",
+    "signup-phone_number": "617-399-0604",
+    "signup-password1": "testpassword1",
+    "signup-password2": "testpassword1",
+    "signup-sms_opt_in": "on",
+    "signup-agree_to_terms": "on",
+    "submit": "Finish",
+}
 
 
 def submit_inquiry_forms(
@@ -92,15 +111,7 @@ def submit_inquiry_forms(
     if response.context is not None:
         return response
 
-    signup_data = {
-        "inquiry_apply_wizard-current_step": "signup",
-        "signup-phone_number": "617-399-0604",
-        "signup-password1": "testpassword1",
-        "signup-password2": "testpassword1",
-        "signup-sms_opt_in": "on",
-        "signup-agree_to_terms": "on",
-        "submit": "Finish",
-    }
+    signup_data = copy.deepcopy(SIGNUP_DATA)
     if signup_overrides is not None:
         signup_data.update(signup_overrides)
     response = browser.post('/inquiry/data/signup/', signup_data)
@@ -110,6 +121,19 @@ def submit_inquiry_forms(
     return browser.get('/inquiry/data/done/')
 
 
+def submit_inquiry_steps(test_case, browser, email):
+    """ submits every step without getting the done step """
+    first_data = dict(FIRST_DATA, **{"first-email": email})
+    for step, data in [
+        ('first', first_data),
+        ('home', HOME_DATA),
+        ('homeowner', HOMEOWNER_DATA),
+        ('signup', SIGNUP_DATA),
+    ]:
+        response = browser.post('/inquiry/data/{0}/'.format(step), data)
+        test_case.assertEqual(response.status_code, 302)
+
+
 @skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
 class InquiryTemplateTests(TestCase):
     def test_first_template(self):
@@ -132,6 +156,15 @@ class InquiryTemplateTests(TestCase):
         response = self.client.get('/inquiry/submitted/')
         self.assertRedirects(response, '/auth/login/')
 
+    @override_settings(INQUIRY_FRAGMENT_CACHE_TIMEOUT=60)
+    def test_fragment_cache_timeout(self):
+        response = self.client.get('/inquiry/data/first/')
+        self.assertEqual(response.context['fragment_cache_timeout'], 60)
+        # cached fragments render the same on the second request
+        self.assertContains(response, 'Get Your Hometap Investment Estimate')
+        response = self.client.get('/inquiry/data/first/')
+        self.assertContains(response, 'Get Your Hometap Investment Estimate')
+
 
 @override_settings(
     SEGMENT_ENABLED=True,
@@ -261,7 +294,7 @@ class InquiryApplyWizardTests(TestCase):
             )  # yapf: disable
             cleaned_data = mocked_form.cleaned_data
             mocked_get_state_zip_code_outcome_key.assert_called_once_with(
-                cleaned_data['state'], cleaned_data['zip_code']
+                cleaned_data['state'], cleaned_data['zip_code'], mock.ANY
             )
 
     def test_first_form_other_state(self):
@@ -318,6 +351,38 @@ class InquiryApplyWizardTests(TestCase):
         response = browser.post('/inquiry/data/first/', first_data)
         self.assertEqual(response.status_code, 302)
 
+    def test_vet_based_on_form_records_rejection(self):
+        view = InquiryApplyWizard()
+        view.request = self._get_request()
+        mocked_form = mock.Mock()
+        with mock.patch.object(mocked_form, 'cleaned_data', {'state': 'MA', 'zip_code': '02467'}):
+            view._vet_based_on_form('first', mocked_form)
+        rejection = InquiryRejection.objects.get()
+        self.assertEqual(rejection.outcome_key, '3_undesirable_zip_code')
+        self.assertEqual((rejection.state, rejection.zip_code), ('MA', '02467'))
+        self.assertIsNotNone(rejection.forecast_value)
+        self.assertIsNotNone(rejection.forecast_version)
+        self.assertIsNone(view._vetting_record)
+
+    @skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+    def test_done_records_vetting_outcome(self):
+        browser = Browser()
+        response = submit_inquiry_forms(browser, 'test+client1@hometap.com')
+        self.assertEqual(response.status_code, 302)
+        inquiry = Inquiry.objects.get()
+        self.assertEqual(inquiry.outcome_key, PASSED_OUTCOME_KEY)
+        self.assertIsNotNone(inquiry.forecast_version)
+        self.assertFalse(InquiryRejection.objects.exists())
+
+    @skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+    def test_done_flags_possible_duplicate(self):
+        submit_inquiry_forms(Browser(), 'test+client1@hometap.com')
+        submit_inquiry_forms(Browser(), 'test+client2@hometap.com')
+        first = Inquiry.objects.get(client__user__email='test+client1@hometap.com')
+        second = Inquiry.objects.get(client__user__email='test+client2@hometap.com')
+        self.assertIsNone(first.possible_duplicate_of)
+        self.assertEqual(second.possible_duplicate_of, first)
+
     def test_get_email_no_client_session_or_form(self):
         # no fit quiz and the user messed up on the first step
         view = InquiryApplyWizard()
@@ -365,6 +430,23 @@ class InquiryApplyWizardTests(TestCase):
         view.request = request
         self.assertEqual(view._get_email({}, 'first'), email)
 
+    def test_fit_quiz_initial_read_once_per_request(self):
+        view = InquiryApplyWizard()
+        view.initial_dict = {}
+        request = self._get_request()
+        request.session['fit_email'] = 'fit_quiz@ht.com'
+        request.session.save()
+        view.request = request
+
+        with mock.patch.object(
+            request.session, 'keys', wraps=request.session.keys
+        ) as mocked_keys:  # yapf: disable
+            for step, _ in InquiryApplyWizard.form_list:
+                view.get_form_initial(step)
+            self.assertEqual(view._get_email({}, 'first'), 'fit_quiz@ht.com')
+        # the session is only iterated once for the fit quiz data
+        self.assertEqual(mocked_keys.call_count, 1)
+
     def test_get_wizard_step_event_data_empty(self):
         data = InquiryApplyWizard._get_wizard_step_event_data({}, [], 'first', 'submitted')
         self.assertEqual(data, {'tracking_status': 'first screen submitted'})
@@ -591,6 +673,195 @@ class InquiryApplyWizardTests(TestCase):
         self.assertFalse(SmsConsent.objects.exists())
 
 
+@skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+class InquiryApplyWizardRenderDoneTests(TestCase):
+    """ tests that render_done() reuses the cleaned data of the steps validated before """
+
+    def setUp(self):
+        self.browser = Browser()
+        submit_inquiry_steps(self, self.browser, 'test+client1@hometap.com')
+
+    def test_done_reuses_validated_steps(self):
+        validated_steps = self.browser.session['wizard_inquiry_apply_wizard']['extra_data'][
+            VALIDATED_STEPS_KEY
+        ]  # yapf: disable
+        self.assertEqual(set(validated_steps), {'first', 'home', 'homeowner'})
+
+        with mock.patch.object(InquiryFirstForm, 'clean_email') as mocked_clean_email:
+            response = self.browser.get('/inquiry/data/done/')
+        mocked_clean_email.assert_not_called()
+        self.assertEqual(response.url, '/inquiry/submitted/')
+        self.assertEqual(Inquiry.objects.count(), 1)
+
+    def test_passwords_not_stored(self):
+        password = SIGNUP_DATA['signup-password1']
+        extra_data = self.browser.session['wizard_inquiry_apply_wizard']['extra_data']
+        self.assertNotIn(password, json.dumps(extra_data))
+
+        response = self.browser.get('/inquiry/data/done/')
+        self.assertEqual(response.url, '/inquiry/submitted/')
+        self.assertNotIn(password, json.dumps(dict(self.browser.session.items()), default=str))
+
+    def test_done_revalidates_changed_steps(self):
+        session = self.browser.session
+        session['wizard_inquiry_apply_wizard']['extra_data'][VALIDATED_STEPS_KEY]['first'][
+            'fingerprint'
+        ] = 'changed'  # yapf: disable
+        session.save()
+
+        with mock.patch.object(
+            InquiryFirstForm, 'clean_email', autospec=True,
+            side_effect=lambda form: form.cleaned_data['email']
+        ) as mocked_clean_email:
+            response = self.browser.get('/inquiry/data/done/')
+        self.assertEqual(mocked_clean_email.call_count, 1)
+        self.assertEqual(response.url, '/inquiry/submitted/')
+        self.assertEqual(Inquiry.objects.count(), 1)
+
+
+@skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+class InquiryApplyWizardSubmissionTests(TestCase):
+    """ tests that done() creates the objects once per wizard session """
+
+    def setUp(self):
+        self.browser = Browser()
+        submit_inquiry_steps(self, self.browser, 'test+client1@hometap.com')
+        self.key = self.browser.session['wizard_inquiry_apply_wizard']['extra_data'][
+            SUBMISSION_KEY
+        ]  # yapf: disable
+
+    def test_done_completes_submission(self):
+        response = self.browser.get('/inquiry/data/done/')
+        self.assertEqual(response.url, '/inquiry/submitted/')
+        submission = InquirySubmission.objects.get(key=self.key)
+        self.assertEqual(submission.client, Client.objects.get())
+
+    @mock.patch('inquiry.views.User.objects.create_client')
+    def test_duplicate_done_returns_first_result(self, mocked_create_client):
+        client = create_client_example()
+        InquirySubmission.objects.create(key=self.key, client=client)
+
+        response = self.browser.get('/inquiry/data/done/')
+        self.assertEqual(response.url, '/inquiry/submitted/')
+        mocked_create_client.assert_not_called()
+        self.assertEqual(int(self.browser.session['_auth_user_id']), client.user.pk)
+
+    def test_duplicate_done_of_processing_submission(self):
+        InquirySubmission.objects.create(key=self.key)
+        response = self.browser.get('/inquiry/data/done/')
+        # answered right away with a page refreshing to the submission page
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Refresh'], '2; url=/inquiry/submitted/{0}/'.format(self.key))
+        self.assertFalse(Client.objects.exists())
+        # the wizard storage is left as is
+        self.assertEqual(
+            self.browser.session['wizard_inquiry_apply_wizard']['extra_data'][SUBMISSION_KEY],
+            self.key
+        )
+
+    def test_duplicate_done_of_abandoned_submission(self):
+        InquirySubmission.objects.create(key=self.key)
+        InquirySubmission.objects.update(created_at=timezone.now() - timedelta(seconds=301))
+        response = self.browser.get('/inquiry/data/done/')
+        # submitted again
+        self.assertEqual(response.url, '/inquiry/submitted/')
+        submission = InquirySubmission.objects.get(key=self.key)
+        self.assertEqual(submission.client, Client.objects.get())
+
+    def test_submission_processing(self):
+        InquirySubmission.objects.create(key=self.key)
+        response = Browser().get('/inquiry/submitted/{0}/'.format(self.key))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Refresh'], '2; url=/inquiry/submitted/{0}/'.format(self.key))
+
+    def test_submission_completed(self):
+        client = create_client_example()
+        InquirySubmission.objects.create(key=self.key, client=client)
+        # the wizard session of the duplicate was deleted by the first submission
+        browser = Browser()
+        response = browser.get('/inquiry/submitted/{0}/'.format(self.key))
+        self.assertEqual(response.url, '/inquiry/submitted/')
+        self.assertEqual(int(browser.session['_auth_user_id']), client.user.pk)
+
+    def test_submission_completed_timed_out(self):
+        client = create_client_example()
+        InquirySubmission.objects.create(key=self.key, client=client)
+        InquirySubmission.objects.update(modified_at=timezone.now() - timedelta(seconds=301))
+        browser = Browser()
+        response = browser.get('/inquiry/submitted/{0}/'.format(self.key))
+        self.assertEqual(response.url, '/inquiry/submitted/')
+        self.assertNotIn('_auth_user_id', browser.session)
+
+    def test_submission_abandoned(self):
+        InquirySubmission.objects.create(key=self.key)
+        InquirySubmission.objects.update(created_at=timezone.now() - timedelta(seconds=301))
+        response = self.browser.get('/inquiry/submitted/{0}/'.format(self.key))
+        self.assertEqual(response.url, '/inquiry/data/')
+        self.assertFalse(InquirySubmission.objects.exists())
+
+    def test_submission_failed(self):
+        response = Browser().get('/inquiry/submitted/{0}/'.format(self.key))
+        self.assertEqual(response.status_code, 500)
+
+    @mock.patch('inquiry.views.InquiryApplyWizard._create_inquiry')
+    def test_failed_done_deletes_submission(self, mocked_create_inquiry):
+        mocked_create_inquiry.side_effect = ValidationError('invalid')
+        response = self.browser.get('/inquiry/data/done/')
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(InquirySubmission.objects.exists())
+
+    @mock.patch('inquiry.views.get_request_ip')
+    def test_unexpected_error_deletes_submission(self, mocked_get_request_ip):
+        mocked_get_request_ip.side_effect = RuntimeError('unexpected')
+        with self.assertRaises(RuntimeError):
+            self.browser.get('/inquiry/data/done/')
+        self.assertFalse(InquirySubmission.objects.exists())
+
+
+@skipIf(connection.vendor == 'sqlite', "SQLite doesn't support concurrent writes")
+@skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
+class InquiryApplyWizardConcurrentSubmissionTests(TransactionTestCase):
+    def test_parallel_done(self):
+        browser = Browser()
+        submit_inquiry_steps(self, browser, 'test+client1@hometap.com')
+        session_cookie = browser.cookies[settings.SESSION_COOKIE_NAME].value
+        submission_count = 4
+        barrier = threading.Barrier(submission_count)
+        responses = []
+
+        def submit():
+            parallel_browser = Browser()
+            parallel_browser.cookies[settings.SESSION_COOKIE_NAME] = session_cookie
+            barrier.wait()
+            try:
+                responses.append((parallel_browser, parallel_browser.get('/inquiry/data/done/')))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit) for _ in range(submission_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(responses), submission_count)
+        client = Client.objects.get()
+        # the duplicates are answered with the first result or as still processing, and every
+        # browser ends up logged in on the submitted page
+        for parallel_browser, response in responses:
+            self.assertIn(response.status_code, (302, 202))
+            if response.status_code == 202:
+                refresh_url = response['Refresh'].split('url=', 1)[1]
+                response = parallel_browser.get(refresh_url)
+            self.assertEqual(response.url, '/inquiry/submitted/')
+            response = parallel_browser.get(response.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(int(parallel_browser.session['_auth_user_id']), client.user.pk)
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(Inquiry.objects.count(), 1)
+        self.assertEqual(InquirySubmission.objects.count(), 1)
+
+
 @skipIf(settings.REMOTE_ENVIRONMENT, "Remote environments require an IP address")
 class SubmitInquiryFormsTests(TestCase):
     """ tests the submit_inquiry_forms() helper function """
@@ -1,19 +1,60 @@
 from django.urls import path
 from django.views.generic import RedirectView
 
-from inquiry.views import InquiryApplyWizard, InquirySubmitted, InquiryOutcomeView
+from inquiry.query_budget import query_budget
+from inquiry.recording import record_wizard_requests
+from inquiry.views import (
+    InquiryApplyWizard, InquirySubmitted, InquirySubmissionView, InquiryOutcomeView,
+    InquiryIngestView, InquiryMetricsView
+)
 
 app_name = 'inquiry'
 
-inquiry_wizard = InquiryApplyWizard.as_view(
-    InquiryApplyWizard.form_list, url_name='inquiry:inquiry_step'
+# queries per request, the final wizard step creating the user, client, address and inquiry
+WIZARD_QUERY_BUDGET = 50
+SUBMITTED_QUERY_BUDGET = 10
+SUBMISSION_QUERY_BUDGET = 10
+OUTCOME_QUERY_BUDGET = 2
+# the ingest view has no budget, it creates each lead's client with several queries so its
+# queries grow with the size of the partner file
+
+inquiry_wizard = query_budget(WIZARD_QUERY_BUDGET, name='inquiry:inquiry_step')(
+    record_wizard_requests(
+        InquiryApplyWizard.as_view(InquiryApplyWizard.form_list, url_name='inquiry:inquiry_step')
+    )
 )
 
+
+def _redirect(url):
+    return query_budget(0, name='inquiry:redirect')(RedirectView.as_view(url=url, permanent=True))
+
+
 urlpatterns = [
     path('data/<step>/', inquiry_wizard, name='inquiry_step'),
     path('data/', inquiry_wizard, name='apply'),
-    path('apply/', RedirectView.as_view(url='/inquiry/', permanent=True)),
-    path('results/<slug:slug>/', InquiryOutcomeView.as_view(), name='outcome'),
-    path('submitted/', InquirySubmitted.as_view(), name='submitted'),
-    path('', RedirectView.as_view(url='/inquiry/data/', permanent=True)),
+    path('apply/', _redirect('/inquiry/')),
+    path(
+        'results/<slug:slug>/',
+        query_budget(OUTCOME_QUERY_BUDGET, name='inquiry:outcome')(InquiryOutcomeView.as_view()),
+        name='outcome'
+    ),
+    path(
+        'submitted/',
+        query_budget(SUBMITTED_QUERY_BUDGET, name='inquiry:submitted')(InquirySubmitted.as_view()),
+        name='submitted'
+    ),
+    path(
+        'submitted/<uuid:key>/',
+        query_budget(SUBMISSION_QUERY_BUDGET, name='inquiry:submission')(
+            InquirySubmissionView.as_view()
+        ),
+        name='submission'
+    ),
+    path('ingest/', InquiryIngestView.as_view(), name='ingest'),
+    path(
+        'metrics/',
+        query_budget(0, name='inquiry:metrics')(InquiryMetricsView.as_view()),
+        name='metrics'
+    ),
+    path('', _redirect('/inquiry/data/')),
 ]
@@ -1,9 +1,32 @@
+import hashlib
+import logging as logging_
+import math
+import os
+import re
+from types import MappingProxyType
+
 from django.template.loader import render_to_string
 from django.conf import settings
 
 from formtools.wizard.storage.session import SessionStorage
 
 from core.emails import send_reviewer_email
+from inquiry.forecast import clean_zip_code_forecast
+from inquiry.metrics import FORECAST_LOOKUPS
+
+logger = logging_.getLogger('portals.apps.' + __name__)
+
+# a ddddd zip code, optionally with a ZIP+4 suffix
+ZIP_CODE_RE = re.compile(r'^\s*(\d{5})(?:-?\d{4})?\s*$')
+
+# counted per thread, the lookups are on the hot path of vetting
+FORECAST_HITS = FORECAST_LOOKUPS.local(result='hit')
+FORECAST_MISSES = FORECAST_LOOKUPS.local(result='miss')
+
+# the cleaned settings.ZIP_CODE_FORECAST, see prepare_zip_code_forecast()
+_clean_zip_code_forecast = None
+# ZipCodeForecastSnapshot of the last cleaned forecast
+_zip_code_forecast_snapshot = None
 
 
 def send_new_inquiry_email(first_name, last_name):
@@ -18,6 +41,31 @@ def send_new_inquiry_email(first_name, last_name):
     send_reviewer_email(subject, message)
 
 
+def send_bulk_inquiry_email(count):
+    subject = 'New Hometap Inquiry Submissions'
+    message = render_to_string(
+        'inquiry/bulk_inquiry_email.html', {
+            'domain': settings.DOMAIN,
+            'count': count,
+        }
+    )
+    send_reviewer_email(subject, message)
+
+
+def write_file_atomically(path, content, mode=0o666):
+    """
+    writes the given bytes to a temporary file next to path and renames it to path, so that
+    readers of path and an interrupted write never see a partial file
+
+    mode is the permissions of a new file, before the umask
+    """
+    tmp_path = path + '.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_TRUNC | os.O_CREAT, mode)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
 class CustomFormToolsSessionStorage(SessionStorage):
     """
     This is a formtools wizard SessionStorage subclass. It is used to fix a bug (EN-308) in which
@@ -27,8 +75,29 @@ class CustomFormToolsSessionStorage(SessionStorage):
     temporary files for deletion when there is not a prefix. However, for each use, the file names
     will be the same, so the existing files will be overwritten and they do not need to be deleted.
     https://github.com/Bouke/django-two-factor-auth/pull/135
+
+    It also decodes the data of each step at most once per request.
     """
 
+    def __init__(self, *args, **kwargs):
+        # step data decoded during this request, by step. The storage is created for every request
+        # so the cache doesn't outlive the request.
+        self._step_data_cache = {}
+        super().__init__(*args, **kwargs)
+
+    def get_step_data(self, step):
+        if step not in self._step_data_cache:
+            self._step_data_cache[step] = super().get_step_data(step)
+        return self._step_data_cache[step]
+
+    def set_step_data(self, step, cleaned_data):
+        self._step_data_cache.pop(step, None)
+        super().set_step_data(step, cleaned_data)
+
+    def init_data(self):
+        self._step_data_cache = {}
+        super().init_data()
+
     def reset(self):
         if self.prefix in self.request.session:
             # reset() queues up temporary files created by SessionStorage for deletion before
@@ -39,11 +108,139 @@ class CustomFormToolsSessionStorage(SessionStorage):
             self.init_data()
 
 
+def prepare_zip_code_forecast():
+    """
+    validates and cleans settings.ZIP_CODE_FORECAST for the lookups, raises
+    ForecastValidationError if it is unusable
+
+    it runs once when the app is ready, so that a bad forecast fails the startup, and again when
+    the setting is overridden
+    """
+    global _clean_zip_code_forecast
+    df = settings.ZIP_CODE_FORECAST
+    _clean_zip_code_forecast = None if df is None else clean_zip_code_forecast(df)[0]
+
+
 def get_zip_code_forecast():
     """
-    returns the cached zip code forecast dataframe or None if not yet cached
+    returns the cleaned zip code forecast dataframe or None if there's no forecast, the lookups
+    only deal with typed columns and one row per zip code
+    """
+    return _clean_zip_code_forecast
+
+
+def replace_zip_code_forecast(clean):
+    """
+    replaces the cleaned forecast of the lookups with the given one, e.g. a compacted copy, until
+    settings.ZIP_CODE_FORECAST is prepared again
+    """
+    global _clean_zip_code_forecast
+    _clean_zip_code_forecast = clean
+
+
+class ZipCodeForecastSnapshot:
+    """
+    an immutable view of a cleaned forecast for the lookups: the int zip codes with data, the
+    desirable ddddd zip codes, the forecast values by int zip code and the forecast version, or
+    an empty one without data or version if the forecast is None
+
+    it only holds frozensets, a read-only mapping and strings, so threads can read it without
+    locks, and a new snapshot replaces it when the forecast or the risk value changes
     """
-    return settings.ZIP_CODE_FORECAST
+    __slots__ = ('source', 'risk_value', 'zip_codes', 'desirable_zip_codes', 'values', 'version')
+
+    def __init__(self, df):
+        zip_codes_with_data, desirable_zip_codes, values, version = set(), [], {}, None
+        if df is not None:
+            zip_codes_with_data = {
+                int(value) for value in df[settings.ZIP_CODE_COL].dropna().values
+            }
+            desirable_zip_codes = get_desirable_zip_codes(df)
+            forecast = df[[settings.ZIP_CODE_COL, settings.ZIP_FORECAST_COL]]
+            values = {
+                zip_code: value
+                for zip_code, value in zip(forecast[settings.ZIP_CODE_COL].values.tolist(),
+                                           forecast[settings.ZIP_FORECAST_COL].values.tolist())
+                if not math.isnan(value)
+            }
+            version = getattr(settings, 'ZIP_CODE_FORECAST_VERSION', None)
+            if not version:
+                content = forecast.to_csv(index=False).encode('utf-8')
+                version = hashlib.sha1(content).hexdigest()[:12]
+        for name, value in (
+            ('source', df),
+            ('risk_value', settings.ZIP_RISK_VALUE),
+            ('zip_codes', frozenset(zip_codes_with_data)),
+            ('desirable_zip_codes', frozenset(desirable_zip_codes)),
+            ('values', MappingProxyType(values)),
+            ('version', version),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ZipCodeForecastSnapshot is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('ZipCodeForecastSnapshot is immutable')
+
+    def has_data(self, zip_code):
+        """ returns True if there's data for the given ddddd zip code """
+        try:
+            return int(zip_code) in self.zip_codes
+        except ValueError:
+            return False
+
+    def is_undesirable(self, zip_code):
+        """ returns the undesirable_zip_code() result of the given zip code """
+        return self.has_data(zip_code) and zip_code not in self.desirable_zip_codes
+
+    def get_value(self, zip_code):
+        """ returns the forecast value of the given ddddd zip code or None if there's no data """
+        try:
+            return self.values.get(int(zip_code))
+        except ValueError:
+            return None
+
+
+def get_zip_code_forecast_snapshot():
+    """
+    returns the snapshot of the cached zip code forecast or None if not yet cached, created once
+    per cleaned forecast
+
+    the snapshot is replaced as a whole, so concurrent readers see either the old or the new one
+    """
+    global _zip_code_forecast_snapshot
+    df = get_zip_code_forecast()
+    if df is None:
+        return None
+    snapshot = _zip_code_forecast_snapshot
+    if (snapshot is None or snapshot.source is not df
+            or snapshot.risk_value != settings.ZIP_RISK_VALUE):
+        snapshot = _zip_code_forecast_snapshot = ZipCodeForecastSnapshot(df)
+    return snapshot
+
+
+def get_zip_code_forecast_value(zip_code):
+    """ returns the forecast value of the given ddddd zip code or None if there's no data """
+    snapshot = get_zip_code_forecast_snapshot()
+    return None if snapshot is None else snapshot.get_value(zip_code)
+
+
+def get_zip_code_forecast_version():
+    """ returns the version of the cached forecast or None if not yet cached """
+    snapshot = get_zip_code_forecast_snapshot()
+    return None if snapshot is None else snapshot.version
+
+
+def get_zip5(zip_code):
+    """ returns the 5 digit zip code of the given zip code as an int, or None if it's not valid """
+    match = ZIP_CODE_RE.match(zip_code or '')
+    return int(match.group(1)) if match else None
+
+
+def get_geography(state, zip_code):
+    """ returns the upper case state and the int 5 digit zip code of an address for an Inquiry """
+    return (state.upper() if state else None, get_zip5(zip_code))
 
 
 def get_desirable_zip_codes(df):
@@ -58,7 +255,19 @@ def get_desirable_zip_codes(df):
     return [str(value).zfill(5) for value in df1[settings.ZIP_CODE_COL].values]
 
 
-def undesirable_zip_code(zip_code):
+def get_vetting_snapshot():
+    """
+    returns the forecast snapshot to vet against, an empty one logging an error if there's no
+    forecast
+    """
+    snapshot = get_zip_code_forecast_snapshot()
+    if snapshot is None:
+        logger.error('No zip code forecast, zip codes are vetted as having no data')
+        snapshot = ZipCodeForecastSnapshot(None)
+    return snapshot
+
+
+def undesirable_zip_code(zip_code, snapshot=None):
     """
     return False if there's no data for the zip code
     returns True if there's data and the zip code is not a desirable one
@@ -67,21 +276,25 @@ def undesirable_zip_code(zip_code):
     zip forecast hurdle value in the zip forecast spreadsheet
 
     zip_code is expected to be in ddddd format otherwise it will be treated as no data
-    for the zip code
+    for the zip code, it is looked up in the given forecast snapshot, the current one by default
     """
-    df = get_zip_code_forecast()
-
-    try:
-        zip_as_int = int(zip_code)
-    except ValueError:
-        # treat as no data for this zip code
-        return False
-
-    # select all rows where zip code equals the given zip code, using the default index
-    if not len(df.loc[df[settings.ZIP_CODE_COL] == zip_as_int]):
+    if snapshot is None:
+        snapshot = get_vetting_snapshot()
+    if not snapshot.has_data(zip_code):
         # no data for this zip code
+        FORECAST_MISSES.inc()
         return False
 
     # there is data for this zip code
-    desirable_zip_codes = get_desirable_zip_codes(df)
-    return zip_code not in desirable_zip_codes
+    FORECAST_HITS.inc()
+    return zip_code not in snapshot.desirable_zip_codes
+
+
+def undesirable_zip_codes(zip_codes, snapshot=None):
+    """
+    returns a list with the undesirable_zip_code() result of each of the given zip codes, all
+    looked up in the same forecast snapshot, the current one unless a snapshot is given
+    """
+    if snapshot is None:
+        snapshot = get_vetting_snapshot()
+    return [snapshot.is_undesirable(zip_code) for zip_code in zip_codes]
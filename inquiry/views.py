@@ -1,12 +1,26 @@
+import hashlib
+import hmac
+import json
 import logging as logging_
+import uuid
+from datetime import timedelta
 
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.forms.utils import ErrorDict
 from django.urls import reverse
 from django.shortcuts import redirect
-from django.views.generic import TemplateView
+from django.template.response import TemplateResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.views.generic import TemplateView, View
 from django.contrib.auth import login
 from django.contrib import messages
-from django.http import HttpResponseServerError, Http404
+from django.http import (
+    HttpResponse, HttpResponseServerError, Http404, HttpResponseForbidden, JsonResponse
+)
 
 from formtools.wizard.views import NamedUrlSessionWizardView
 
@@ -17,17 +31,88 @@ from core.views import DataLayerViewMixin, WizardSegmentMixin
 from core.utils import segment_event
 from stages import transitions
 from fit_quiz.views import FIT_QUIZ_SESSION_DATA_PREFIX
+from inquiry.decision_log import log_decision
 from inquiry.forms import (
     InquiryFirstForm, InquiryHomeForm, InquiryHomeownerForm, WizardClientUserCreationForm
 )
-from inquiry.models import Inquiry
+from inquiry.funnel import ACCOUNT_CREATED, DONE_STEP, SUBMITTED, record_funnel_event
+from inquiry.ingest import DEFAULT_CHUNK_SIZE, LEAD_FORMATS, ingest_leads, read_leads_from_bytes
+from inquiry.metrics import (
+    CONTENT_TYPE, DONE_FAILURES, VETTING_OUTCOMES, WIZARD_STEP_SECONDS, get_exposition,
+    get_metrics_dir
+)
+from inquiry.models import Inquiry, InquiryRejection, InquirySubmission
 from inquiry.outcomes import (
     INQUIRY_OUTCOME_SLUG_MAP, INQUIRY_OUTCOME_CONTEXTS, get_outcome_context,
-    get_state_zip_code_outcome_key
+    get_state_zip_code_outcome_key, get_vetting_record
 )
+from inquiry.profiling import profile_request, should_profile
+from inquiry.side_effects import run_side_effect
+from inquiry.utils import get_vetting_snapshot
 
 logger = logging_.getLogger('portals.apps.' + __name__)
 
+# wizard storage extra_data key of {step: {'fingerprint': ..., 'cleaned_data': {...}}} for the
+# steps validated in InquiryApplyWizard.process_step()
+VALIDATED_STEPS_KEY = 'validated_steps'
+# steps whose cleaned data isn't stored in the session, the passwords of the signup step, so
+# render_done() always validates them again
+UNRECORDED_STEPS = {'signup'}
+# cleaned data values that come back unchanged from the session's JSON serialization
+JSON_SAFE_TYPES = (str, bool, int, float, type(None))
+# wizard storage extra_data key of the InquirySubmission key of the wizard session
+SUBMISSION_KEY = 'submission_key'
+SUBMISSION_ERROR = (
+    'Sorry, there was an error creating your account. Please contact support@hometap.com'
+)
+# status of the page answering a final submission while the first one of its wizard session is
+# still processing, and the seconds after which it refreshes
+DUPLICATE_SUBMISSION_STATUS = 202
+DUPLICATE_SUBMISSION_REFRESH = 2
+# seconds after which a submission that never completed is abandoned, e.g. its worker was killed
+# by a timeout, and after which a completed one no longer logs in from its key
+DEFAULT_SUBMISSION_TIMEOUT = 300
+# wizard storage extra_data key of the vetting record of the first step, see get_vetting_record()
+VETTING_RECORD_KEY = 'vetting_record'
+
+
+def _get_submission_cutoff():
+    """ returns the time before which submissions are timed out """
+    timeout = getattr(settings, 'INQUIRY_SUBMISSION_TIMEOUT', DEFAULT_SUBMISSION_TIMEOUT)
+    return timezone.now() - timedelta(seconds=timeout)
+
+
+def delete_abandoned_submission(key):
+    """
+    deletes the submission of the given key if it was started before the timeout and never
+    completed, so that it can be submitted again, returns True if it was deleted
+    """
+    deleted, _ = InquirySubmission.objects.filter(
+        key=key, client=None, created_at__lt=_get_submission_cutoff()
+    ).delete()
+    return deleted > 0
+
+
+def render_submission_processing(request, key):
+    """
+    returns a page refreshing to the submission page of the given key, which finds the submission
+    without the wizard session, the first submission logs its session in and deletes the session
+    of the duplicates
+    """
+    refresh_url = reverse('inquiry:submission', kwargs={'key': key})
+    response = TemplateResponse(
+        request, 'inquiry/submission_processing.html', {'refresh_url': refresh_url},
+        status=DUPLICATE_SUBMISSION_STATUS
+    )
+    response['Refresh'] = '{0}; url={1}'.format(DUPLICATE_SUBMISSION_REFRESH, refresh_url)
+    return response
+
+
+def _get_step_data_fingerprint(data):
+    """ returns a fingerprint of the data of a step as stored by the wizard storage """
+    items = sorted((key, list(values)) for key, values in data.lists())
+    return hashlib.sha256(json.dumps(items).encode('utf-8')).hexdigest()
+
 
 def _get_inquiry_segment_event_data(client):
     """ Returns dict of inquiry and client data for use in segment events E25 and E69 """
@@ -83,12 +168,112 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
         "signup": "inquiry/signup.html"
     }
 
+    # set while render_done() validates the stored steps
+    _reuse_validated_steps = False
+    # vetting record of the first step when it passed vetting in this request
+    _vetting_record = None
+
+    def dispatch(self, request, *args, **kwargs):
+        step = kwargs.get('step')
+        if step not in self.templates and step != self.done_step_name:
+            # keep the label values bounded, the wizard redirects unknown steps
+            step = 'other'
+        method = request.method if request.method in ('GET', 'POST') else 'other'
+        # profiled requests are slower, they would skew the latency
+        if should_profile(request):
+            return profile_request(step, method, super().dispatch, request, *args, **kwargs)
+        with WIZARD_STEP_SECONDS.time(step=step, method=method):
+            return super().dispatch(request, *args, **kwargs)
+
     def get_template_names(self):
         return [self.templates[self.steps.current]]
 
+    def get_context_data(self, form, **kwargs):
+        context = super().get_context_data(form=form, **kwargs)
+        # timeout of the step-invariant fragments cached by base_inquiry.html, keyed by step
+        # and language
+        context['fragment_cache_timeout'] = getattr(
+            settings, 'INQUIRY_FRAGMENT_CACHE_TIMEOUT', 3600
+        )
+        return context
+
     def get_step_url(self, step):
         return reverse(self.url_name, kwargs={'step': step})
 
+    def process_step(self, form):
+        data = super().process_step(form)
+        self._record_validated_step(self.steps.current, data, form.cleaned_data)
+        record_funnel_event(self.steps.current, SUBMITTED)
+        extra_data = self.storage.extra_data
+        if SUBMISSION_KEY not in extra_data:
+            extra_data[SUBMISSION_KEY] = str(uuid.uuid4())
+        if self._vetting_record is not None:
+            # recorded on the inquiry by done()
+            extra_data[VETTING_RECORD_KEY] = self._vetting_record
+        self.storage.extra_data = extra_data
+        return data
+
+    def _record_validated_step(self, step, data, cleaned_data):
+        """
+        stores a fingerprint of the validated step data and its cleaned data so that render_done()
+        doesn't need to validate the step again, unless the cleaned data can't be stored as is or
+        must not be stored
+        """
+        validated_steps = self.storage.extra_data.get(VALIDATED_STEPS_KEY, {})
+        if step not in UNRECORDED_STEPS and all(
+            isinstance(value, JSON_SAFE_TYPES) for value in cleaned_data.values()
+        ):
+            validated_steps[step] = {
+                'fingerprint': _get_step_data_fingerprint(data),
+                'cleaned_data': dict(cleaned_data),
+            }
+        else:
+            validated_steps.pop(step, None)
+        extra_data = self.storage.extra_data
+        extra_data[VALIDATED_STEPS_KEY] = validated_steps
+        self.storage.extra_data = extra_data
+
+    def _get_validated_cleaned_data(self, step, data, files):
+        """ returns the cleaned data recorded for the given step data or None """
+        if data is None or files:
+            return None
+        validated_step = self.storage.extra_data.get(VALIDATED_STEPS_KEY, {}).get(step)
+        if validated_step is None:
+            return None
+        if validated_step['fingerprint'] != _get_step_data_fingerprint(data):
+            # the step data changed after it was validated
+            return None
+        return dict(validated_step['cleaned_data'])
+
+    def get_form(self, step=None, data=None, files=None):
+        form = super().get_form(step, data, files)
+        if self._reuse_validated_steps:
+            cleaned_data = self._get_validated_cleaned_data(step or self.steps.current, data, files)
+            if cleaned_data is not None:
+                # the step data hasn't changed since it was validated, so mark the form as valid
+                # with the recorded cleaned data instead of cleaning it again
+                form.cleaned_data = cleaned_data
+                form._errors = ErrorDict()
+        return form
+
+    def render_done(self, form, **kwargs):
+        # formtools validates every step again before calling done(), which repeats the database
+        # queries and model validation of each step. Reuse the cleaned data of the steps that are
+        # unchanged since they were validated and only validate the others.
+        key = self.storage.extra_data.get(SUBMISSION_KEY)
+        if key is not None and delete_abandoned_submission(key):
+            logger.warning('Abandoned inquiry submission {0} submitted again'.format(key))
+        if key is not None and InquirySubmission.objects.filter(key=key).exists():
+            # a duplicate of a started submission, answered without validating the steps again
+            # or resetting the wizard storage, whose session would overwrite the logged in
+            # session of the first submission
+            return self._render_duplicate_submission(key)
+        self._reuse_validated_steps = True
+        try:
+            return super().render_done(form, **kwargs)
+        finally:
+            self._reuse_validated_steps = False
+
     @staticmethod
     def fill_form_initial(session, initial):
         """
@@ -99,10 +284,20 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
                 remaining = key[len(FIT_QUIZ_SESSION_DATA_PREFIX):]
                 initial.update({remaining: session.get(key)})
 
+    @cached_property
+    def fit_quiz_initial(self):
+        """
+        the fit quiz data in the session, read once per request (the view is instantiated for
+        every request) for every form instantiation and _get_email()
+        """
+        initial = {}
+        InquiryApplyWizard.fill_form_initial(self.request.session, initial)
+        return initial
+
     def get_form_initial(self, step):
         # If fit quiz data is in session, use it to pre-populate some inquiry first form fields
         initial = self.initial_dict.get(step, {})
-        InquiryApplyWizard.fill_form_initial(self.request.session, initial)
+        initial.update(self.fit_quiz_initial)
         return initial
 
     def _get_email(self, form_data, form_current_step):
@@ -154,13 +349,60 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
         inquiry = Inquiry(**inquiry_data)
         inquiry.address = address
         inquiry.full_clean()
+        # flag the inquiry for the reviewers if the same house or person came in before, which
+        # is an index lookup on the fingerprints
+        inquiry.sync_fingerprints()
+        inquiry.possible_duplicate_of = inquiry.find_possible_duplicate()
         inquiry.save()
         return inquiry
 
+    def _start_submission(self):
+        """
+        returns the InquirySubmission of this wizard session or None if it was already started,
+        e.g. by a double-clicked or retried final POST
+        """
+        # sessions started before submission keys were added don't have one
+        key = self.storage.extra_data.get(SUBMISSION_KEY) or str(uuid.uuid4())
+        try:
+            with transaction.atomic():
+                return InquirySubmission.objects.create(key=key)
+        except IntegrityError:
+            return None
+
+    def _render_duplicate_submission(self, key):
+        """
+        returns the result of the first submission of this wizard session if it completed, or a
+        page refreshing to its submission page while it is still processing, without waiting for
+        it on the request thread
+        """
+        submission = InquirySubmission.objects.filter(key=key).select_related(
+            'client__user'
+        ).first()
+        if submission is None:
+            # the first submission failed and reported the error
+            logger.warning('Duplicate inquiry submission {0} not completed'.format(key))
+            return HttpResponseServerError(SUBMISSION_ERROR)
+        if submission.client is not None:
+            login(self.request, submission.client.user)
+            return redirect(reverse('inquiry:submitted'))
+        return render_submission_processing(self.request, key)
+
     def done(self, form_list, form_dict, **kwargs):
-        error_s = (
-            'Sorry, there was an error creating your account. Please contact support@hometap.com'
-        )
+        # the unique submission key makes sure that the objects below are created once per
+        # wizard session
+        submission = self._start_submission()
+        if submission is None:
+            return self._render_duplicate_submission(self.storage.extra_data[SUBMISSION_KEY])
+        try:
+            return self._submit(form_dict, submission)
+        finally:
+            # whatever failed, an incomplete submission would answer every retry of this wizard
+            # session as still processing
+            InquirySubmission.objects.filter(pk=submission.pk, client=None).delete()
+
+    def _submit(self, form_dict, submission):
+        """ creates the user, client, address and inquiry of the submission """
+        error_s = SUBMISSION_ERROR
         ip_address = get_request_ip(self.request)
 
         # separate Inquiry data and Client signup data
@@ -177,6 +419,8 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
         # add the use case from the first step to the inquiry_data
         for field in UseCaseModel._meta.fields:
             inquiry_data[field.name] = first_data.pop(field.name)
+        # add the outcome of vetting the first step
+        inquiry_data.update(self.storage.extra_data.get(VETTING_RECORD_KEY, {}))
 
         # we can't wrap the creation of all objects in a with transaction.atomic context because
         # create_client() is decorated with transaction.atomic, so create the client first
@@ -195,6 +439,7 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
             )
             user = client.user
         except Exception as e:
+            DONE_FAILURES.inc(stage='User+Client save failed')
             logger.error('User+Client save failed {0}'.format(e))
             return HttpResponseServerError(error_s)
 
@@ -209,6 +454,7 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
                 inquiry = self._create_inquiry(inquiry_data, client, ip_address, address)
         except Exception as e:
             user.delete()
+            DONE_FAILURES.inc(stage=logger_error_s)
             logger.error('{0} {1}'.format(logger_error_s, e))
             return HttpResponseServerError(error_s)
 
@@ -221,9 +467,15 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
             user.delete()
             address.delete()
             inquiry.delete()
+            DONE_FAILURES.inc(stage=logger_error_s)
             logger.error('{0} {1}'.format(logger_error_s, e))
             return HttpResponseServerError(error_s)
 
+        # duplicate submissions of this wizard session can now return this result
+        submission.client = client
+        submission.save()
+        record_funnel_event(DONE_STEP, ACCOUNT_CREATED)
+
         # Log in the client, but they won't actually be able to do anything (will
         # not pass our custom auth middleware) until their email is confirmed.
         # 'Secretly' logging them in allows them to be 'fully' logged in
@@ -233,7 +485,9 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
 
         # Segment Event E69 -- Note, we also send a similar datalayer event E25 on page load
         event_d = _get_inquiry_segment_event_data(client)
-        segment_event(client.email, 'investment inquiry - created account - server', event_d)
+        run_side_effect(
+            segment_event, client.email, 'investment inquiry - created account - server', event_d
+        )
 
         return redirect(reverse('inquiry:submitted'))
 
@@ -286,7 +540,7 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
             cleaned_data, exported_fields, form_current_step, outcome
         )
         event_name = 'investment inquiry - {0} screen submitted'.format(form_current_step)
-        segment_event(email, event_name, event_data)
+        run_side_effect(segment_event, email, event_name, event_data)
 
     def _vet_based_on_form(self, form_current_step, form):
         """
@@ -299,11 +553,23 @@ class InquiryApplyWizard(WizardSegmentMixin, NamedUrlSessionWizardView):
 
         # vet first step if not a good inquiry based on state or zip code
         cleaned_data = form.cleaned_data
+        # the outcome and its record come from the same forecast
+        snapshot = get_vetting_snapshot()
         outcome_key, vetted_message = get_state_zip_code_outcome_key(
-            cleaned_data['state'], cleaned_data['zip_code']
+            cleaned_data['state'], cleaned_data['zip_code'], snapshot
         )
+        vetting_record = get_vetting_record(
+            cleaned_data['state'], cleaned_data['zip_code'], outcome_key, snapshot
+        )
+        log_decision(cleaned_data['state'], cleaned_data['zip_code'], vetting_record)
+        VETTING_OUTCOMES.inc(outcome=vetting_record['outcome_key'])
         if outcome_key is not None:
+            InquiryRejection.objects.create(
+                state=cleaned_data['state'], zip_code=cleaned_data['zip_code'], **vetting_record
+            )
+            record_funnel_event(form_current_step, INQUIRY_OUTCOME_SLUG_MAP[outcome_key])
             return (INQUIRY_OUTCOME_SLUG_MAP[outcome_key], 'inquiry:outcome', vetted_message)
+        self._vetting_record = vetting_record
 
         # passed tests
         return (None, '', '')
@@ -355,3 +621,91 @@ class InquirySubmitted(DataLayerViewMixin, TemplateView):
         event_d = _get_inquiry_segment_event_data(self.request.user.client)
         event_d['event'] = 'investment inquiry - created account'
         return event_d
+
+
+class InquirySubmissionView(View):
+    """
+    The page that duplicates of a final submission refresh to while the first one is processing.
+    The first submission logs its browser in and deletes the wizard session the duplicates were
+    sent with, so the submission is found by the key in the URL instead: the duplicate is logged
+    in once it completed, within the submission timeout, or sent to submit again if it was
+    abandoned.
+    """
+    http_method_names = ['get']
+
+    def get(self, request, key, *args, **kwargs):
+        key = str(key)
+        if delete_abandoned_submission(key):
+            logger.warning('Abandoned inquiry submission {0} not completed'.format(key))
+            return redirect(reverse('inquiry:apply'))
+        submission = InquirySubmission.objects.filter(key=key).select_related(
+            'client__user'
+        ).first()
+        if submission is None:
+            # the first submission failed and reported the error
+            return HttpResponseServerError(SUBMISSION_ERROR)
+        if submission.client is None:
+            return render_submission_processing(request, key)
+        if submission.modified_at >= _get_submission_cutoff():
+            login(request, submission.client.user)
+        # the submitted page sends the browsers that aren't logged in to the login page
+        return redirect(reverse('inquiry:submitted'))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class InquiryIngestView(View):
+    """
+    Bulk ingestion endpoint for partner lead feeds. Accepts a CSV or JSONL file of leads (see
+    inquiry.ingest) in the 'file' field or as the request body, and returns the ingestion report
+    as JSON. Partners authenticate with an 'Authorization: Bearer <key>' header holding one of
+    settings.INQUIRY_INGEST_API_KEYS.
+    """
+    http_method_names = ['post']
+
+    def _is_authorized(self, request):
+        scheme, _, key = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() != 'bearer' or not key:
+            return False
+        api_keys = getattr(settings, 'INQUIRY_INGEST_API_KEYS', [])
+        return any(hmac.compare_digest(key, api_key) for api_key in api_keys)
+
+    def post(self, request, *args, **kwargs):
+        if not self._is_authorized(request):
+            return HttpResponseForbidden()
+
+        file_format = request.GET.get('format', 'csv')
+        if file_format not in LEAD_FORMATS:
+            return JsonResponse({'error': 'format must be one of csv, jsonl'}, status=400)
+        upload = request.FILES.get('file')
+        content = upload.read() if upload is not None else request.body
+
+        try:
+            report = ingest_leads(
+                read_leads_from_bytes(content, file_format), chunk_size=DEFAULT_CHUNK_SIZE
+            )
+        except (ValueError, UnicodeDecodeError) as e:
+            # malformed CSV/JSON
+            return JsonResponse({'error': str(e)}, status=400)
+        logger.info(
+            'Ingested {0} leads, created {1} inquiries, {2:.1f} rows per second'.format(
+                report.rows, report.created, report.rows_per_second
+            )
+        )
+        return JsonResponse(report.as_dict())
+
+
+class InquiryMetricsView(View):
+    """
+    Scrape endpoint of the inquiry metrics of every worker process (see inquiry.metrics) in the
+    Prometheus text format, for the addresses in settings.INQUIRY_METRICS_ALLOWED_IPS.
+    """
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        metrics_dir = get_metrics_dir()
+        if not metrics_dir:
+            raise Http404
+        allowed_ips = getattr(settings, 'INQUIRY_METRICS_ALLOWED_IPS', ['127.0.0.1'])
+        if get_request_ip(request) not in allowed_ips:
+            return HttpResponseForbidden()
+        return HttpResponse(get_exposition(metrics_dir), content_type=CONTENT_TYPE)